@@ -0,0 +1,78 @@
+"""毎日の記録ツール - データディレクトリのバックアップ"""
+import argparse
+import sys
+import os
+
+# プロジェクトのルートディレクトリをPythonパスに追加
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from src.utils.backup import BackupManager, BackupInfo, RetentionPolicy
+
+
+def format_backup(backup: BackupInfo) -> str:
+    """スナップショットの情報を1行で表示"""
+    return (f"{backup.name}  {backup.file_count} ファイル  {backup.total_bytes / 1024 / 1024:.1f} MB"
+            f"（新規 {backup.copied_bytes / 1024 / 1024:.1f} MB）")
+
+
+def add_retention_arguments(parser: argparse.ArgumentParser):
+    """保持方針の引数を追加"""
+    parser.add_argument("--keep-last", type=int, default=0, help="新しい方から残す数")
+    parser.add_argument("--keep-daily", type=int, default=0, help="最新のものを残す日数")
+    parser.add_argument("--keep-weekly", type=int, default=0, help="最新のものを残す週数")
+    parser.add_argument("--keep-monthly", type=int, default=0, help="最新のものを残す月数")
+
+
+def retention_policy(args) -> RetentionPolicy:
+    """引数から保持方針を作成"""
+    return RetentionPolicy(args.keep_last, args.keep_daily, args.keep_weekly, args.keep_monthly)
+
+
+def main():
+    """メイン関数"""
+    parser = argparse.ArgumentParser(description="データディレクトリのスナップショットを作成・復元します")
+    parser.add_argument("--data", default="data", help="データディレクトリ（デフォルト: data）")
+    parser.add_argument("--root", default="backups", help="バックアップの保存先（デフォルト: backups）")
+    commands = parser.add_subparsers(dest="command", required=True)
+    commands.add_parser("create", help="スナップショットを作成")
+    commands.add_parser("list", help="スナップショットの一覧を表示")
+    restore_parser = commands.add_parser("restore", help="スナップショットを復元（アプリを終了してから実行）")
+    restore_parser.add_argument("name", help="スナップショット名（latest で最新）")
+    restore_parser.add_argument("--target", help="復元先（デフォルト: データディレクトリを置き換える）")
+    prune_parser = commands.add_parser("prune", help="保持方針に当てはまらないスナップショットを削除")
+    add_retention_arguments(prune_parser)
+    prune_parser.add_argument("--dry-run", action="store_true", help="削除せずに対象だけを表示")
+    schedule_parser = commands.add_parser("schedule", help="一定間隔でスナップショットを作成し続ける")
+    schedule_parser.add_argument("--interval", type=float, default=24.0, help="間隔（時間、デフォルト: 24）")
+    add_retention_arguments(schedule_parser)
+    args = parser.parse_args()
+
+    manager = BackupManager(args.data, args.root)
+    try:
+        if args.command == "create":
+            print(f"作成しました: {format_backup(manager.create_backup())}")
+        elif args.command == "list":
+            for backup in manager.list_backups():
+                print(format_backup(backup))
+        elif args.command == "restore":
+            moved_to = manager.restore(args.name, args.target)
+            print("復元しました" + (f"（元のデータ: {moved_to}）" if moved_to else ""))
+        elif args.command == "prune":
+            for backup in manager.prune(retention_policy(args), args.dry_run):
+                print(f"{'削除対象' if args.dry_run else '削除しました'}: {backup.name}")
+        elif args.command == "schedule":
+            policy = retention_policy(args)
+            manager.run_scheduled(
+                args.interval * 3600,
+                policy if any((policy.keep_last, policy.keep_daily, policy.keep_weekly, policy.keep_monthly)) else None,
+                on_backup=lambda backup: print(f"作成しました: {format_backup(backup)}", flush=True)
+            )
+    except KeyboardInterrupt:
+        pass
+    except Exception as e:
+        print(f"バックアップエラー: {e}")
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1 @@
+"""性能計測用スクリプト"""
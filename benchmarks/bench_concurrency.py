@@ -0,0 +1,105 @@
+"""
+複数プロセスからの同時更新で変更が失われないかの確認（ストレージの種類ごと）
+
+各プロセスが同じ日付のカウンターを expected_updated_at 付きで読み込み・加算・保存し、
+RecordConflictError なら読み込みからやり直す。遅延書き込みモードでは書き込み時の照合で
+破棄された変更が on_write_error に届くため、書き込みを待って確認し、破棄されていればやり直す。
+全てのプロセスの終了後、
+カウンターが加算した回数と一致すれば、変更は1件も失われていない。
+あわせて各プロセスは自分専用の日付にも記録を作成し、それらが全て残っているかも確認する。
+
+使い方:
+    python -m benchmarks.bench_concurrency
+"""
+import multiprocessing
+import os
+import tempfile
+import time
+
+from src.controllers.record_controller import RecordController
+from src.models.storage import RecordConflictError
+
+PROCESS_COUNT = 6
+INCREMENTS = 30
+COUNTER_DATE = "2024-01-01"
+CONFIGURATIONS = [
+    ("json", {}),
+    ("journal", {"use_journal": True}),
+    ("write-behind", {"write_behind": True}),
+    ("write-behind+journal", {"write_behind": True, "use_journal": True}),
+    ("sharded", {"backend": "sharded"}),
+    ("sqlite", {"backend": "sqlite"}),
+]
+
+
+def worker(data_dir: str, options: dict, worker_id: int, conflicts):
+    """カウンターを INCREMENTS 回加算し、自分専用の日付に記録を作成"""
+    write_errors = []
+    if options.get("write_behind"):
+        options = dict(options, on_write_error=write_errors.append)
+    controller = RecordController(data_dir, **options)
+    retries = 0
+    for i in range(INCREMENTS):
+        while True:
+            record = controller.get_record(COUNTER_DATE)
+            try:
+                controller.update_record(
+                    COUNTER_DATE,
+                    text=str(int(record.text) + 1),
+                    expected_updated_at=record.updated_at
+                )
+            except RecordConflictError:
+                retries += 1
+                continue
+            controller.flush()
+            if not any(isinstance(error, RecordConflictError) for error in write_errors):
+                break
+            write_errors.clear()
+            retries += 1
+        controller.create_record(f"2024-{worker_id + 2:02d}-{i + 1:02d}", f"worker {worker_id}")
+    controller.flush()
+    conflicts.put(retries)
+
+
+def run(label: str, options: dict) -> bool:
+    """1つの構成で全てのプロセスを実行し、失われた変更がないか確認"""
+    with tempfile.TemporaryDirectory() as data_dir:
+        setup = RecordController(data_dir, **options)
+        setup.create_record(COUNTER_DATE, "0")
+        setup.flush()
+
+        conflicts = multiprocessing.Queue()
+        processes = [
+            multiprocessing.Process(target=worker, args=(data_dir, options, worker_id, conflicts))
+            for worker_id in range(PROCESS_COUNT)
+        ]
+        start = time.perf_counter()
+        for process in processes:
+            process.start()
+        for process in processes:
+            process.join()
+        elapsed = time.perf_counter() - start
+        retries = sum(conflicts.get() for _ in processes)
+
+        result = RecordController(data_dir, **options)
+        counter = int(result.get_record(COUNTER_DATE).text)
+        expected_dates = {
+            f"2024-{worker_id + 2:02d}-{i + 1:02d}"
+            for worker_id in range(PROCESS_COUNT) for i in range(INCREMENTS)
+        }
+        missing = expected_dates - set(result.get_dates_with_records())
+        total = PROCESS_COUNT * INCREMENTS
+        ok = counter == total and not missing and all(p.exitcode == 0 for p in processes)
+        print(f"  {label:<22} カウンター {counter:>3}/{total}  欠落 {len(missing):>3}件  "
+              f"再試行 {retries:>4}回  {elapsed:>6.2f} s  {'OK' if ok else 'NG'}")
+        return ok
+
+
+def main():
+    print(f"{PROCESS_COUNT}プロセス × {INCREMENTS}回の加算（{os.name}）")
+    results = [run(label, options) for label, options in CONFIGURATIONS]
+    print("変更は失われませんでした" if all(results) else "失われた変更があります")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,78 @@
+"""
+コントローラーとエクスポートの性能計測（メモリ上のストレージとJSONストレージの比較）
+
+メモリ上のストレージでの時間がコントローラー・エクスポート自体のコスト、
+JSONストレージとの差がファイル入出力（JSON層）のコストになる。
+
+使い方:
+    python -m benchmarks.bench_controller
+"""
+import json
+import os
+import tempfile
+import time
+from datetime import date, timedelta
+
+from src.controllers.record_controller import RecordController
+from src.controllers.export_controller import ExportController
+from src.models.query import RecordQuery
+from .synthetic import make_document
+
+RECORD_COUNT = 3 * 365  # 3年分
+UPDATE_COUNT = 200
+
+
+def measure(label: str, func) -> float:
+    """1回の実行時間（ミリ秒）を計測して表示"""
+    start = time.perf_counter()
+    func()
+    elapsed = (time.perf_counter() - start) * 1000
+    print(f"  {label:<24} {elapsed:>9.1f} ms")
+    return elapsed
+
+
+def run(controller: RecordController, export_dir: str) -> float:
+    """一連の操作を実行して合計時間を返す"""
+    exporter = ExportController(controller, export_dir)
+    dates = sorted(controller.get_dates_with_records())
+    total = 0.0
+
+    def create():
+        start = date.fromisoformat(dates[-1]) + timedelta(days=1)
+        with controller.batch():
+            for i in range(UPDATE_COUNT):
+                controller.create_record((start + timedelta(days=i)).isoformat(), "追加した記録", ["追加"])
+
+    def update():
+        for day in dates[:UPDATE_COUNT]:
+            controller.update_record(day, text="更新した本文")
+        controller.flush()
+
+    total += measure("作成（一括）", create)
+    total += measure(f"更新 {UPDATE_COUNT} 件（1件ずつ）", update)
+    total += measure("タグ検索", lambda: list(controller.query(RecordQuery(tags=["読書"]))))
+    total += measure("全文検索", lambda: controller.search("カフェ"))
+    total += measure("全件エクスポート", lambda: exporter.export_query(
+        RecordQuery(), os.path.join(export_dir, "all.md")))
+    print(f"  {'合計':<24} {total:>9.1f} ms")
+    return total
+
+
+def main():
+    document = make_document(RECORD_COUNT)
+    with tempfile.TemporaryDirectory() as work_dir:
+        print(f"メモリ上のストレージ（{RECORD_COUNT}件）")
+        memory_total = run(RecordController(backend="memory", records=document["records"]), work_dir)
+
+        data_dir = os.path.join(work_dir, "data")
+        os.makedirs(data_dir)
+        with open(os.path.join(data_dir, "records.json"), 'w', encoding='utf-8') as f:
+            json.dump(document, f, ensure_ascii=False)
+        print(f"JSONストレージ（{RECORD_COUNT}件）")
+        json_total = run(RecordController(data_dir, backend="json", serialization_profile="compact"), work_dir)
+
+        print(f"JSON層のコスト: {json_total - memory_total:.1f} ms（全体の {100 * (1 - memory_total / json_total):.0f}%）")
+
+
+if __name__ == "__main__":
+    main()
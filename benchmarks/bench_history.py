@@ -0,0 +1,86 @@
+"""
+変更履歴の容量と復元時間の計測（編集の多い合成ワークロード）
+
+1件の長めの記録に小さな編集を繰り返し、履歴ファイルの増加量が
+全文を毎回保存した場合ではなく編集量に比例することを確認する。
+
+使い方:
+    python -m benchmarks.bench_history
+"""
+import json
+import random
+import tempfile
+import time
+
+from src.models.history import RecordHistory
+from .synthetic import SAMPLE_SENTENCES
+
+EDIT_COUNT = 500
+TEXT_SENTENCES = 200  # 約4,000文字の本文
+# 履歴の容量は「編集で変わった文字数 + 1版あたりの固定分」の何倍以内か
+TARGET_RATIO = 3.0
+PER_REVISION_OVERHEAD = 120  # バイト（版番号・更新日時・JSONの区切り）
+TARGET_REBUILD_MS = 20.0
+
+
+def edit_text(text: str, rng: random.Random) -> str:
+    """本文の一部に挿入・削除・置換のいずれかを行う"""
+    position = rng.randrange(len(text))
+    operation = rng.choice(("insert", "delete", "replace"))
+    if operation == "insert":
+        return text[:position] + rng.choice(SAMPLE_SENTENCES) + text[position:]
+    if operation == "delete":
+        return text[:position] + text[position + rng.randint(1, 20):]
+    return text[:position] + rng.choice(SAMPLE_SENTENCES) + text[position + rng.randint(1, 20):]
+
+
+def main():
+    rng = random.Random(0)
+    text = "".join(rng.choice(SAMPLE_SENTENCES) for _ in range(TEXT_SENTENCES))
+    record = {
+        "id": "bench", "date": "2024-01-01", "created_at": "2024-01-01T00:00:00",
+        "updated_at": "2024-01-01T00:00:00", "text": text, "images": [], "tags": ["日記"], "mood": "good"
+    }
+
+    with tempfile.TemporaryDirectory() as history_dir:
+        history = RecordHistory(history_dir)
+        history.record("2024-01-01", dict(record))
+        texts = [text]
+        edited_chars = 0
+        full_copies = len(json.dumps(record, ensure_ascii=False).encode('utf-8'))
+        snapshot_bytes = full_copies
+
+        for i in range(1, EDIT_COUNT + 1):
+            new_text = edit_text(texts[-1], rng)
+            edited_chars += abs(len(new_text) - len(texts[-1])) + 20
+            record = dict(record, text=new_text, updated_at=f"2024-01-01T00:{i // 60:02d}:{i % 60:02d}.{i:06d}")
+            history.record("2024-01-01", record)
+            texts.append(new_text)
+            size = len(json.dumps(record, ensure_ascii=False).encode('utf-8'))
+            full_copies += size
+            if i % history.SNAPSHOT_INTERVAL == 0:
+                snapshot_bytes += size
+
+        history_bytes = history.size_bytes("2024-01-01")
+        delta_bytes = history_bytes - snapshot_bytes
+        budget = TARGET_RATIO * (edited_chars * 3 + PER_REVISION_OVERHEAD * EDIT_COUNT)
+        print(f"版の数: {EDIT_COUNT + 1}（{history.SNAPSHOT_INTERVAL}版ごとに全体を保存）")
+        print(f"全文を毎回保存した場合: {full_copies / 1024:.0f} KB")
+        print(f"履歴ファイル: {history_bytes / 1024:.0f} KB（うち差分 {delta_bytes / 1024:.0f} KB）")
+
+        # 新しいインスタンスで（キャッシュなしで）全ての版を復元して確認
+        history = RecordHistory(history_dir)
+        worst_ms = 0.0
+        for number in range(1, EDIT_COUNT + 2):
+            start = time.perf_counter()
+            restored = history.get_revision("2024-01-01", number)
+            worst_ms = max(worst_ms, (time.perf_counter() - start) * 1000)
+            assert restored["text"] == texts[number - 1], f"版 {number} の復元に失敗"
+        print(f"全ての版を正しく復元（最大 {worst_ms:.1f} ms）")
+
+        ok = delta_bytes <= budget and worst_ms < TARGET_REBUILD_MS
+        print(f"差分の容量 {delta_bytes / 1024:.0f} KB（上限 {budget / 1024:.0f} KB）: {'OK' if ok else 'NG'}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,121 @@
+"""
+Record の復元時間とメモリ使用量の計測（20,000件の合成データ）
+
+変更前と同じ通常のデータクラス（__dict__ あり・文字列を共有しない）の from_dict と、
+現在の __slots__ 版の from_dict / from_dicts を比較する。
+
+使い方:
+    python -m benchmarks.bench_records
+"""
+import gc
+import time
+import tracemalloc
+from dataclasses import dataclass, field
+from typing import List, Optional
+
+from src.models.record import Record
+from .synthetic import make_records
+
+RECORD_COUNT = 20_000
+REPEAT = 5
+
+
+@dataclass
+class LegacyImageAttachment:
+    """変更前の ImageAttachment（比較用）"""
+    id: str
+    filename: str
+    path: str
+    thumbnail_path: str
+    uploaded_at: str
+    size_bytes: int
+    caption: Optional[str] = None
+
+    @staticmethod
+    def from_dict(data: dict) -> 'LegacyImageAttachment':
+        return LegacyImageAttachment(
+            id=data['id'],
+            filename=data['filename'],
+            path=data['path'],
+            thumbnail_path=data['thumbnail_path'],
+            uploaded_at=data['uploaded_at'],
+            size_bytes=data['size_bytes'],
+            caption=data.get('caption')
+        )
+
+
+@dataclass
+class LegacyRecord:
+    """変更前の Record（比較用）"""
+    id: str
+    date: str
+    created_at: str
+    updated_at: str
+    text: str
+    images: List[LegacyImageAttachment] = field(default_factory=list)
+    tags: List[str] = field(default_factory=list)
+    mood: Optional[str] = None
+
+    @staticmethod
+    def from_dict(data: dict) -> 'LegacyRecord':
+        images = [LegacyImageAttachment.from_dict(img) for img in data.get('images', [])]
+        return LegacyRecord(
+            id=data['id'],
+            date=data['date'],
+            created_at=data['created_at'],
+            updated_at=data['updated_at'],
+            text=data['text'],
+            images=images,
+            tags=list(data.get('tags', [])),
+            mood=data.get('mood')
+        )
+
+
+def copy_raw(raw_records: List[dict]) -> List[dict]:
+    """JSONから読み込んだ直後と同じく、タグ・気分の文字列が記録ごとに別のオブジェクトになった辞書を作る"""
+    copies = []
+    for data in raw_records:
+        data = dict(data)
+        data['tags'] = [''.join(list(tag)) for tag in data['tags']]
+        if data['mood'] is not None:
+            data['mood'] = ''.join(list(data['mood']))
+        copies.append(data)
+    return copies
+
+
+def measure(label: str, decode, raw_records: List[dict]):
+    """復元時間（最良値）と、復元した記録が新たに確保したメモリを計測して表示"""
+    best = float('inf')
+    for _ in range(REPEAT):
+        start = time.perf_counter()
+        decode(raw_records)
+        best = min(best, time.perf_counter() - start)
+
+    # 読み込んだ辞書を解放した後も残るメモリ（共有しない場合はタグ・気分の文字列も残る）
+    gc.collect()
+    tracemalloc.start()
+    source = copy_raw(raw_records)
+    records = decode(source)
+    del source
+    gc.collect()
+    retained, _ = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    del records
+    print(f"  {label:<28} {best * 1000:>8.1f} ms  {retained / 1024 / 1024:>7.2f} MB")
+    return best, retained
+
+
+def main():
+    raw_records = copy_raw(list(make_records(RECORD_COUNT).values()))
+    print(f"{RECORD_COUNT}件の記録を復元（時間は{REPEAT}回の最良値、メモリは元の辞書を解放した後に残る量）")
+    legacy_time, legacy_memory = measure(
+        "変更前の from_dict", lambda items: [LegacyRecord.from_dict(d) for d in items], raw_records)
+    slots_time, slots_memory = measure(
+        "__slots__ 版の from_dict", lambda items: [Record.from_dict(d) for d in items], raw_records)
+    bulk_time, bulk_memory = measure("__slots__ 版の from_dicts", Record.from_dicts, raw_records)
+    print(f"from_dict:  時間 {slots_time / legacy_time:.2f} 倍、メモリ {slots_memory / legacy_memory:.2f} 倍")
+    print(f"from_dicts: 時間 {bulk_time / legacy_time:.2f} 倍、メモリ {bulk_memory / legacy_memory:.2f} 倍")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,91 @@
+"""
+全文検索の性能計測（20年分の毎日の記録）
+
+本文は漢字語・カタカナ語・英数字の単語からなる35,000語の語彙（出現頻度はZipf分布）から生成する。
+英数字の前方一致（入力途中の1〜2文字など）は多くの単語に一致するため、最も遅い経路として含める。
+
+使い方:
+    python -m benchmarks.bench_search
+"""
+import json
+import os
+import tempfile
+import time
+
+from src.models.storage import Storage
+from .synthetic import make_vocabulary_document
+
+RECORD_COUNT = 20 * 365 + 5  # 20年分
+TARGET_MS = 50.0
+
+
+def make_queries(vocabulary: list) -> list:
+    """語彙から検索語を作成（頻出語・まれな語・複合条件・英数字の前方一致）"""
+    japanese = [word for word in vocabulary if not word.isascii()]
+    ascii_words = [word for word in vocabulary if word.isascii() and word.isalpha()]
+    frequent, common, rare = japanese[0], japanese[50], japanese[-1]
+    return [
+        frequent,                               # 頻出語
+        rare,                                   # まれな語
+        frequent[0],                            # 1文字
+        f"{frequent} {common}",                 # AND
+        f"{common} OR {rare}",                  # OR
+        f"\"{common}の{frequent}\"",            # フレーズ
+        ascii_words[0],                         # 英単語
+        "a",                                    # 英数字1文字の前方一致
+        "st",                                   # 英数字2文字の前方一致
+        f"{ascii_words[0][:3]} {frequent}",     # 前方一致と日本語のAND
+        "存在しない語",
+    ]
+
+
+def best_ms(func, repeat: int = 5) -> float:
+    """最良の実行時間（ミリ秒）を計測"""
+    times = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        func()
+        times.append(time.perf_counter() - start)
+    return min(times) * 1000
+
+
+def main():
+    with tempfile.TemporaryDirectory() as data_dir:
+        document, vocabulary = make_vocabulary_document(RECORD_COUNT)
+        with open(os.path.join(data_dir, "records.json"), 'w', encoding='utf-8') as f:
+            json.dump(document, f, ensure_ascii=False)
+        total_chars = sum(len(record["text"]) for record in document["records"].values())
+        print(f"{RECORD_COUNT}件の記録、本文 {total_chars:,}文字、語彙 {len(vocabulary):,}語")
+
+        storage = Storage(data_dir)
+        start = time.perf_counter()
+        storage.search_records("猫")
+        print(f"索引の構築: {(time.perf_counter() - start) * 1000:.0f} ms（{RECORD_COUNT}件）")
+        start = time.perf_counter()
+        storage.flush()
+        index_size = os.path.getsize(os.path.join(data_dir, "records.search.json"))
+        print(f"索引の保存: {(time.perf_counter() - start) * 1000:.0f} ms（{index_size / 1024 / 1024:.1f} MB、"
+              f"records.json {os.path.getsize(os.path.join(data_dir, 'records.json')) / 1024 / 1024:.1f} MB）")
+
+        storage = Storage(data_dir)
+        storage.get_metadata()
+        start = time.perf_counter()
+        storage.search_records("猫")
+        print(f"保存済み索引の読み込み: {(time.perf_counter() - start) * 1000:.0f} ms")
+
+        print(f"英数字の単語: {len(storage.search_index._ascii_words):,}語")
+        print(f"{'query':<16} {'hits':>6} {'all(ms)':>8} {'top50(ms)':>10}")
+        slowest = 0.0
+        for query in make_queries(vocabulary):
+            hits = len(storage.search_records(query))
+            all_ms = best_ms(lambda: storage.search_records(query))
+            top_ms = best_ms(lambda: storage.search_records(query, limit=50))
+            slowest = max(slowest, all_ms, top_ms)
+            print(f"{query:<16} {hits:>6} {all_ms:>8.1f} {top_ms:>10.1f}")
+
+        status = "OK" if slowest < TARGET_MS else "NG"
+        print(f"最大 {slowest:.1f} ms（目標 {TARGET_MS:.0f} ms 未満）: {status}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,49 @@
+"""
+records.json のシリアライズ形式ごとの性能計測
+
+使い方:
+    python -m benchmarks.bench_serialization
+"""
+import time
+
+from src.models import serialization
+from .synthetic import make_document
+
+SIZES = (1_000, 10_000, 50_000)
+
+
+def measure(document: dict, profile: str, repeat: int = 3) -> dict:
+    """エンコード・デコード時間（最良値）と出力サイズを計測"""
+    encode_times = []
+    decode_times = []
+    content = b""
+    for _ in range(repeat):
+        start = time.perf_counter()
+        content = serialization.dumps(document, profile)
+        encode_times.append(time.perf_counter() - start)
+
+        start = time.perf_counter()
+        serialization.loads(content)
+        decode_times.append(time.perf_counter() - start)
+
+    return {
+        "encode_ms": min(encode_times) * 1000,
+        "decode_ms": min(decode_times) * 1000,
+        "bytes": len(content)
+    }
+
+
+def main():
+    backend = "orjson" if serialization.orjson is not None else "json（orjson未インストール）"
+    print(f"デコーダ: {backend}")
+    print(f"{'records':>8} {'profile':>8} {'encode(ms)':>11} {'decode(ms)':>11} {'size(KB)':>10}")
+    for size in SIZES:
+        document = make_document(size)
+        for profile in serialization.PROFILES:
+            result = measure(document, profile)
+            print(f"{size:>8} {profile:>8} {result['encode_ms']:>11.1f} "
+                  f"{result['decode_ms']:>11.1f} {result['bytes'] / 1024:>10.0f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,60 @@
+"""
+差分同期の時間計測（10年分の記録のうち1週間分だけが異なる2つのデータディレクトリ）
+
+同じ内容から始めて一方で直近1週間を編集し、同期にかかる時間を計測する。
+画像ファイルのコピー時間は含まない（合成データの画像ファイルは存在しない）。
+
+使い方:
+    python -m benchmarks.bench_sync
+"""
+import json
+import os
+import tempfile
+import time
+
+from src.controllers.record_controller import RecordController
+from src.controllers.sync_controller import SyncController
+from .synthetic import make_document
+
+RECORD_COUNT = 10 * 365  # 10年分
+CHANGED_DAYS = 7
+TARGET_MS = 1000.0
+
+
+def measure(label: str, func):
+    """1回の実行時間（ミリ秒）を計測して表示し、結果を返す"""
+    start = time.perf_counter()
+    result = func()
+    elapsed = (time.perf_counter() - start) * 1000
+    print(f"  {label:<24} {elapsed:>9.1f} ms")
+    return result, elapsed
+
+
+def main():
+    document = make_document(RECORD_COUNT)
+    with tempfile.TemporaryDirectory() as work_dir:
+        local_dir = os.path.join(work_dir, "laptop")
+        remote_dir = os.path.join(work_dir, "desktop")
+        for data_dir in (local_dir, remote_dir):
+            os.makedirs(data_dir)
+            with open(os.path.join(data_dir, "records.json"), 'w', encoding='utf-8') as f:
+                json.dump(document, f, ensure_ascii=False)
+
+        print(f"{RECORD_COUNT}件の記録（うち{CHANGED_DAYS}日分が異なる）")
+        measure("初回の同期（一致を確認）", lambda: SyncController(local_dir, remote_dir).sync())
+
+        remote = RecordController(remote_dir)
+        for date in sorted(remote.get_dates_with_records())[-CHANGED_DAYS:]:
+            remote.update_record(date, text="別の端末で編集した本文")
+        remote.flush()
+
+        summary, elapsed = measure("差分の同期", lambda: SyncController(local_dir, remote_dir).sync())
+        measure("変更なしの同期", lambda: SyncController(local_dir, remote_dir).sync())
+        print(summary.describe())
+        assert len(summary.to_local) == CHANGED_DAYS and not summary.to_remote
+        status = "OK" if elapsed < TARGET_MS else "NG"
+        print(f"差分の同期: {elapsed:.1f} ms（目標 {TARGET_MS:.0f} ms 未満）{status}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,69 @@
+"""
+遅延書き込みモードでの保存の応答時間（20年分の記録）
+
+エディタの保存と同じく update_record（expected_updated_at 付き）と create_record を続けて呼び、
+1回ごとの応答時間の中央値と最大値を通常の書き込みと比べる。
+遅延書き込みモードでは、書き込みスレッドがファイルを書き込んでいる間も保存はすぐに戻る。
+
+使い方:
+    python -m benchmarks.bench_write_behind
+"""
+import os
+import statistics
+import tempfile
+import time
+from datetime import date, timedelta
+
+from src.controllers.record_controller import RecordController
+from src.models import serialization
+from .synthetic import make_document
+
+RECORD_COUNT = 7305  # 20年分
+OPERATIONS = 200
+CONFIGURATIONS = [
+    ("通常", {}),
+    ("遅延書き込み", {"write_behind": True}),
+    ("遅延書き込み+ジャーナル", {"write_behind": True, "use_journal": True}),
+]
+
+
+def measure(label: str, options: dict):
+    """1つの構成で更新・作成の応答時間を計測"""
+    with tempfile.TemporaryDirectory() as data_dir:
+        document = make_document(RECORD_COUNT)
+        serialization.dump_file(os.path.join(data_dir, "records.json"), document)
+        controller = RecordController(data_dir, **options)
+        # アプリと同じく検索索引・統計を読み込んだ状態で計測する
+        controller.search("日記")
+        controller.get_statistics()
+
+        dates = sorted(document["records"])
+        update_times, create_times = [], []
+        first_new = date.fromisoformat(dates[-1]) + timedelta(days=1)
+        for i in range(OPERATIONS):
+            record = controller.get_record(dates[i * 31 % len(dates)])
+            start = time.perf_counter()
+            controller.update_record(record.date, text=record.text + "追記", expected_updated_at=record.updated_at)
+            update_times.append((time.perf_counter() - start) * 1000)
+
+            start = time.perf_counter()
+            controller.create_record((first_new + timedelta(days=i)).isoformat(), "新しい記録")
+            create_times.append((time.perf_counter() - start) * 1000)
+
+        start = time.perf_counter()
+        controller.flush()
+        flush_ms = (time.perf_counter() - start) * 1000
+
+        print(f"  {label:<24} update 中央値 {statistics.median(update_times):>7.1f} ms  最大 {max(update_times):>7.1f} ms  "
+              f"create 中央値 {statistics.median(create_times):>7.1f} ms  最大 {max(create_times):>7.1f} ms  "
+              f"flush {flush_ms:>7.1f} ms")
+
+
+def main():
+    print(f"{RECORD_COUNT}件の記録に update_record / create_record を各{OPERATIONS}回")
+    for label, options in CONFIGURATIONS:
+        measure(label, options)
+
+
+if __name__ == "__main__":
+    main()
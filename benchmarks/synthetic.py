@@ -0,0 +1,135 @@
+"""ベンチマーク用の合成データ生成"""
+import random
+import uuid
+from datetime import date, timedelta
+from typing import Dict, List, Tuple
+
+SAMPLE_SENTENCES = [
+    "今日は朝から雨が降っていた。",
+    "散歩の途中で新しいカフェを見つけた。",
+    "お花の絵を描いた。",
+    "仕事が忙しくて少し疲れた。",
+    "友達と久しぶりに電話で話した。",
+    "夕飯はカレーを作った。",
+    "Pythonの勉強を1時間した。",
+    "読書: 吾輩は猫である",
+    "ジョギング5km、いいペースだった。",
+    "部屋の掃除をしてすっきりした。",
+]
+SAMPLE_TAGS = ["日記", "仕事", "趣味", "運動", "読書", "料理", "旅行", "勉強", "家族", "絵"]
+MOODS = ["good", "neutral", "bad", None]
+
+
+def make_record_dict(day: date, rng: random.Random) -> dict:
+    """1日分の記録の辞書を生成"""
+    date_str = day.isoformat()
+    timestamp = f"{date_str}T21:00:00.000000"
+    images = []
+    if rng.random() < 0.2:
+        for _ in range(rng.randint(1, 3)):
+            image_id = str(uuid.UUID(int=rng.getrandbits(128)))
+            images.append({
+                "id": image_id,
+                "filename": f"photo_{rng.randint(1, 9999)}.jpg",
+                "path": f"data/images/{day.year:04d}/{day.month:02d}/{image_id}.jpg",
+                "thumbnail_path": f"data/images/{day.year:04d}/{day.month:02d}/{image_id}_thumb.jpg",
+                "uploaded_at": timestamp,
+                "size_bytes": rng.randint(50_000, 5_000_000),
+                "caption": rng.choice([None, "景色", "ごはん", "猫"])
+            })
+    return {
+        "id": str(uuid.UUID(int=rng.getrandbits(128))),
+        "date": date_str,
+        "created_at": timestamp,
+        "updated_at": timestamp,
+        "text": "".join(rng.choice(SAMPLE_SENTENCES) for _ in range(rng.randint(1, 8))),
+        "images": images,
+        "tags": rng.sample(SAMPLE_TAGS, rng.randint(0, 3)),
+        "mood": rng.choice(MOODS)
+    }
+
+
+def make_records(count: int, start: date = date(2000, 1, 1), seed: int = 0) -> Dict[str, dict]:
+    """連続した日付の記録をcount件生成"""
+    rng = random.Random(seed)
+    records = {}
+    for offset in range(count):
+        day = start + timedelta(days=offset)
+        records[day.isoformat()] = make_record_dict(day, rng)
+    return records
+
+
+def make_document(count: int, seed: int = 0) -> dict:
+    """records.json と同じ構造のデータを生成"""
+    records = make_records(count, seed=seed)
+    return {
+        "version": "1.0",
+        "records": records,
+        "metadata": {
+            "total_records": len(records),
+            "first_record_date": min(records) if records else None,
+            "last_updated": "2026-01-01T00:00:00.000000"
+        }
+    }
+
+
+# 現実的な語彙の本文（検索の計測用）: 語の出現頻度はZipf分布に従う
+PARTICLES = ["は", "を", "に", "で", "が", "と", "の", "から", "まで", "も"]
+SENTENCE_ENDINGS = ["。", "た。", "ました。", "だった。", "したい。", "！"]
+
+
+def make_vocabulary(rng: random.Random, japanese_words: int = 12_000, katakana_words: int = 3_000,
+                    ascii_words: int = 20_000) -> List[str]:
+    """漢字語・カタカナ語・英数字の単語からなる語彙を生成（出現頻度の高い順）"""
+    kanji = [chr(code) for code in rng.sample(range(0x4E00, 0x9FA0), 2_500)]
+    hiragana = [chr(code) for code in range(0x3041, 0x3094)]
+    katakana = [chr(code) for code in range(0x30A1, 0x30F5)]
+    letters = "abcdefghijklmnopqrstuvwxyz"
+
+    words = set()
+    while len(words) < japanese_words:
+        word = "".join(rng.choices(kanji, k=rng.randint(1, 3)))
+        if rng.random() < 0.3:
+            word += "".join(rng.choices(hiragana, k=rng.randint(1, 2)))
+        words.add(word)
+    while len(words) < japanese_words + katakana_words:
+        words.add("".join(rng.choices(katakana, k=rng.randint(2, 6))))
+    ascii_set = set()
+    while len(ascii_set) < ascii_words:
+        word = "".join(rng.choices(letters, k=rng.randint(2, 10)))
+        if rng.random() < 0.05:
+            word = f"{rng.randint(1, 2030)}{rng.choice(['km', 'kg', 'h', ''])}"
+        ascii_set.add(word)
+
+    vocabulary = sorted(words) + sorted(ascii_set)
+    rng.shuffle(vocabulary)
+    return vocabulary
+
+
+def make_vocabulary_document(count: int, seed: int = 0) -> Tuple[dict, List[str]]:
+    """
+    現実的な語彙の本文を持つ、records.json と同じ構造のデータを生成
+
+    Returns:
+        (データ, 語彙（出現頻度の高い順）)
+    """
+    rng = random.Random(seed)
+    vocabulary = make_vocabulary(rng)
+    weights = [1 / rank for rank in range(1, len(vocabulary) + 1)]
+    cumulative = []
+    total = 0.0
+    for weight in weights:
+        total += weight
+        cumulative.append(total)
+
+    document = make_document(count, seed=seed)
+    for record_data in document["records"].values():
+        sentences = []
+        for _ in range(rng.randint(3, 12)):
+            words = rng.choices(vocabulary, cum_weights=cumulative, k=rng.randint(3, 9))
+            sentence = "".join(
+                word + (" " if word.isascii() else rng.choice(PARTICLES)) for word in words[:-1]
+            )
+            sentences.append(sentence + words[-1] + rng.choice(SENTENCE_ENDINGS))
+        record_data["text"] = "".join(sentences)
+    return document, vocabulary
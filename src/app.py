@@ -3,6 +3,7 @@ import tkinter as tk
 from tkinter import messagebox
 import os
 from .controllers.record_controller import RecordController
+from .models.storage import RecordConflictError
 from .views.main_window import MainWindow
 from .views.styles import AppStyles
 
@@ -21,8 +22,13 @@ class App:
         # ディレクトリ構造を初期化
         self._initialize_directories()
 
-        # コントローラーの初期化
-        self.record_controller = RecordController()
+        # コントローラーの初期化（保存は書き込みスレッドで行い、UIを止めない）
+        self.record_controller = RecordController(
+            write_behind=True,
+            on_write_error=self._on_write_error
+        )
+        # 変更イベントはどのスレッドで発行されてもメインループで通知する
+        self.record_controller.set_event_dispatcher(lambda deliver: self.root.after(0, deliver))
 
         # メインウィンドウの作成
         self.main_window = MainWindow(self.root, self.record_controller)
@@ -40,9 +46,29 @@ class App:
         for directory in directories:
             os.makedirs(directory, exist_ok=True)
 
+    def _on_write_error(self, error: Exception):
+        """保存に失敗した時（書き込みスレッドから呼ばれるため、表示はメインループで行う）"""
+        if isinstance(error, RecordConflictError):
+            self.root.after(0, lambda: messagebox.showwarning(
+                "保存の競合",
+                f"{error.date} の記録は別の処理で更新されていたため、この変更は保存せずに別の処理の内容を残しました"
+            ))
+            return
+        self.root.after(0, lambda: messagebox.showerror(
+            "保存エラー",
+            f"記録の保存に失敗しました。次回の保存時に再試行します:\n{error}"
+        ))
+
     def _on_closing(self):
         """アプリケーション終了時の処理"""
         if messagebox.askokcancel("終了", "アプリケーションを終了しますか？"):
+            # 未書き込みの変更を書き込んでから終了
+            if not self.record_controller.flush():
+                if not messagebox.askokcancel(
+                    "保存エラー",
+                    "一部の変更を保存できませんでした。保存せずに終了しますか？"
+                ):
+                    return
             self.root.destroy()
 
     def run(self):
@@ -1,5 +1,7 @@
 """エクスポート機能の制御"""
 from typing import Optional, List
+from ..models.record import Record
+from ..models.query import RecordQuery, QueryPlanner
 from ..utils.markdown_exporter import MarkdownExporter
 from .record_controller import RecordController
 
@@ -11,6 +13,19 @@ class ExportController:
         self.record_controller = record_controller
         self.exporter = MarkdownExporter(export_dir)
 
+    def _query(self, query: RecordQuery) -> List[Record]:
+        """
+        検索条件に一致する記録を取得
+
+        期間・タグ・気分で絞り込める場合はストレージの索引と部分読み込みを使う。
+        全件を走査する場合だけスナップショットから取得し、書き出し中に画面で編集されても
+        開始時点の内容がまとめて書き出されるようにする。
+        """
+        plan = self.record_controller.explain_query(query)
+        if plan.access_path != "scan":
+            return list(self.record_controller.query_planner.execute(query, plan))
+        return list(QueryPlanner(self.record_controller.snapshot()).execute(query))
+
     def export_single_record(self, date: str, output_path: Optional[str] = None) -> tuple[bool, str, str]:
         """
         単一の記録をエクスポート
@@ -29,6 +44,24 @@ class ExportController:
 
         return self.exporter.export_record(record, output_path)
 
+    def export_query(self, query: RecordQuery, output_path: Optional[str] = None) -> tuple[bool, str, str]:
+        """
+        検索条件に一致する記録をエクスポート
+
+        Args:
+            query: 検索条件
+            output_path: 出力先パス（Noneの場合は自動生成）
+
+        Returns:
+            (成功フラグ, メッセージ, 出力ファイルパス)
+        """
+        records = self._query(query)
+
+        if not records:
+            return False, f"条件（{query.describe()}）に一致する記録がありません", ""
+
+        return self.exporter.export_query(records, query, output_path)
+
     def export_all_records(self, output_path: Optional[str] = None) -> tuple[bool, str, str]:
         """
         全ての記録をエクスポート
@@ -39,12 +72,11 @@ class ExportController:
         Returns:
             (成功フラグ, メッセージ, 出力ファイルパス)
         """
-        records_dict = self.record_controller.get_all_records()
+        records_list = self._query(RecordQuery())
 
-        if not records_dict:
+        if not records_list:
             return False, "エクスポートする記録がありません", ""
 
-        records_list = list(records_dict.values())
         return self.exporter.export_records(records_list, output_path)
 
     def export_month(self, year: int, month: int) -> tuple[bool, str, str]:
@@ -58,12 +90,11 @@ class ExportController:
         Returns:
             (成功フラグ, メッセージ, 出力ファイルパス)
         """
-        records_dict = self.record_controller.get_records_by_month(year, month)
+        records_list = self._query(RecordQuery.for_month(year, month))
 
-        if not records_dict:
+        if not records_list:
             return False, f"{year}年{month}月の記録がありません", ""
 
-        records_list = list(records_dict.values())
         return self.exporter.export_month(records_list, year, month)
 
     def export_date_range(self, start_date: str, end_date: str, output_path: Optional[str] = None) -> tuple[bool, str, str]:
@@ -78,13 +109,7 @@ class ExportController:
         Returns:
             (成功フラグ, メッセージ, 出力ファイルパス)
         """
-        all_records = self.record_controller.get_all_records()
-
-        # 日付範囲でフィルタリング
-        filtered_records = [
-            record for date, record in all_records.items()
-            if start_date <= date <= end_date
-        ]
+        filtered_records = self._query(RecordQuery(start_date=start_date, end_date=end_date))
 
         if not filtered_records:
             return False, f"{start_date}から{end_date}の範囲に記録がありません", ""
@@ -102,13 +127,7 @@ class ExportController:
         Returns:
             (成功フラグ, メッセージ, 出力ファイルパス)
         """
-        all_records = self.record_controller.get_all_records()
-
-        # タグでフィルタリング
-        filtered_records = [
-            record for record in all_records.values()
-            if tag in record.tags
-        ]
+        filtered_records = self._query(RecordQuery(tags=[tag]))
 
         if not filtered_records:
             return False, f"タグ '{tag}' を持つ記録がありません", ""
@@ -126,13 +145,7 @@ class ExportController:
         Returns:
             (成功フラグ, メッセージ, 出力ファイルパス)
         """
-        all_records = self.record_controller.get_all_records()
-
-        # 気分でフィルタリング
-        filtered_records = [
-            record for record in all_records.values()
-            if record.mood == mood
-        ]
+        filtered_records = self._query(RecordQuery(mood=mood))
 
         if not filtered_records:
             return False, f"気分 '{mood}' の記録がありません", ""
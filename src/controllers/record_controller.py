@@ -1,29 +1,308 @@
 """記録のCRUD操作と画像管理を統括"""
-from typing import Optional, List, Dict
-from ..models.record import Record, ImageAttachment
+import os
+from datetime import datetime
+from typing import Callable, Optional, List, Dict, Mapping, Iterator, Iterable
+from ..models.record import Record, ImageAttachment, MOODS
 from ..models.storage import Storage
+from ..models.sqlite_storage import SQLiteStorage
+from ..models.sharded_storage import ShardedStorage
+from ..models.memory_storage import MemoryStorage
+from ..models.backend import StorageBackend
+from ..models.query import RecordQuery, QueryPlan, QueryPlanner
+from ..models.search_index import SearchResult
+from ..models.events import ChangeEvent, IMAGE_ADDED, IMAGE_REMOVED, RECORD_CREATED, RECORD_UPDATED, RECORD_DELETED
+from ..models.history import RecordHistory, RecordRevision
+from ..models.snapshot import RecordSnapshot
+from ..models.record_table import RecordTable
+from ..models.statistics import RecordStatistics
 from ..utils.image_handler import ImageHandler
+from ..utils.image_store import ImageStore, MemoryImageStore, ImageDeletionWorker
 
 
 class RecordController:
     """記録の作成・読取・更新・削除を管理"""
 
-    def __init__(self, data_dir: str = "data"):
-        self.storage = Storage(data_dir)
-        self.image_handler = ImageHandler()
+    def __init__(self, data_dir: str = "data", backend: str = "json",
+                 storage: Optional[StorageBackend] = None, image_store: Optional[ImageStore] = None,
+                 **storage_options):
+        """
+        Args:
+            data_dir: データディレクトリ（画像は data_dir/images、変更履歴は data_dir/history に保存）
+            backend: ストレージ形式（"json", "sqlite", "sharded" または "memory"）
+            storage: 使用するストレージ（指定した場合は backend と storage_options は使わない）
+            image_store: 画像の保存先（Noneなら data_dir/images。"memory" ではメモリ上）
+            storage_options: ストレージクラスに渡す追加オプション
+        """
+        if storage is not None:
+            self.storage = storage
+        elif backend == "memory":
+            self.storage = MemoryStorage(**storage_options)
+        elif backend == "json":
+            self.storage = Storage(data_dir, **storage_options)
+        elif backend == "sqlite":
+            self.storage = SQLiteStorage(data_dir, **storage_options)
+        elif backend == "sharded":
+            self.storage = ShardedStorage(data_dir, **storage_options)
+        else:
+            raise ValueError(f"不明なストレージ形式です: {backend}")
+        # メモリ上のストレージでは画像・変更履歴もファイルに書き込まない
+        in_memory = isinstance(self.storage, MemoryStorage)
+        if image_store is None:
+            image_store = MemoryImageStore() if in_memory else ImageHandler(os.path.join(data_dir, "images"))
+        self.image_store = image_store
+        # 削除した記録の画像ファイルは、削除が確定してからバックグラウンドで消す
+        self.image_deleter = ImageDeletionWorker(image_store)
+        self._pending_image_deletions: Dict[str, List[ImageAttachment]] = {}
+        # 集計用の記録テーブル（初めて使う時に作成）
+        self._record_table: Optional[RecordTable] = None
+        # 継続の統計（初めて使う時に読み込み、保存した時点から変更があれば作り直す）
+        self.statistics = RecordStatistics(None if in_memory else os.path.join(data_dir, "statistics.json"))
+        self._statistics_ready = False
+        self.query_planner = QueryPlanner(self.storage)
+        # 記録・画像の変更イベント（ストレージの通知と共通）
+        self.events = self.storage.events
+
+        # 変更履歴: 変更が確定するたびに（トランザクションは確定時に1版として）記録する
+        self.history = RecordHistory(None if in_memory else os.path.join(data_dir, "history"))
+        self.events.subscribe(
+            self._record_revision,
+            kinds=(RECORD_CREATED, RECORD_UPDATED, RECORD_DELETED),
+            sync=True
+        )
+        self.events.subscribe(
+            self._release_image_deletions,
+            kinds=(RECORD_CREATED, RECORD_UPDATED, RECORD_DELETED),
+            sync=True
+        )
+
+    def batch(self):
+        """
+        複数の操作を1回の書き込みにまとめるコンテキストマネージャ
+
+        例:
+            with controller.batch():
+                controller.update_record(...)
+                controller.update_record(...)
+        """
+        return self.storage.transaction()
+
+    def subscribe(self, callback: Callable[[ChangeEvent], None],
+                  kinds: Optional[Iterable[str]] = None) -> Callable[[], None]:
+        """
+        記録・画像の変更イベントを購読
+
+        Args:
+            callback: イベントを受け取る関数
+            kinds: 受け取るイベントの種類（Noneなら全て）
+
+        Returns:
+            購読を解除する関数
+        """
+        return self.events.subscribe(callback, kinds)
+
+    def set_event_dispatcher(self, dispatcher: Optional[Callable[[Callable[[], None]], None]]):
+        """イベントの通知を実行する関数を設定（UIスレッドへ渡す場合に使用）"""
+        self.events.set_dispatcher(dispatcher)
+
+    def _record_revision(self, event: ChangeEvent):
+        """確定した変更を履歴に追加"""
+        if event.kind == RECORD_DELETED:
+            self.history.record(event.date, None)
+            return
+        record = self.storage.get_record(event.date)
+        self.history.record(event.date, record.to_dict() if record else None)
+
+    def _release_image_deletions(self, event: ChangeEvent):
+        """記録の変更が確定したら、その日の記録が参照しなくなった画像の削除を予約"""
+        images = self._pending_image_deletions.pop(event.date, None)
+        if not images:
+            return
+        # トランザクションが取り消されて記録が残っていれば、その画像は消さない
+        record = self.storage.get_record(event.date) if event.kind != RECORD_DELETED else None
+        kept_ids = {image.id for image in record.images} if record else set()
+        for image in images:
+            if image.id not in kept_ids:
+                self.image_deleter.enqueue(image.path, image.thumbnail_path)
+
+    def get_record_table(self) -> RecordTable:
+        """
+        集計用の記録テーブルを取得（初回にストレージから作成し、以降は変更が確定するたびに更新）
+
+        他のプロセスが記録を変更していれば、その変更は差分として届かないため作り直す。
+        """
+        if self._record_table is None:
+            generation = self.storage.get_metadata().get("generation")
+            self._record_table = RecordTable.from_records(
+                self.storage.snapshot().iter_raw_records(), generation=generation
+            )
+            self.events.subscribe(
+                self._update_record_table,
+                kinds=(RECORD_CREATED, RECORD_UPDATED, RECORD_DELETED),
+                sync=True
+            )
+        else:
+            self._revalidate_record_table()
+        return self._record_table
+
+    def _revalidate_record_table(self):
+        """記録テーブルの世代番号を現在のものに進める（他のプロセスの書き込みがあれば作り直す）"""
+        table = self._record_table
+        generation = self.storage.get_metadata().get("generation")
+        if generation == table.generation:
+            return
+        if self._written_here(table.generation, generation):
+            table.generation = generation
+        else:
+            table.rebuild(self.storage.snapshot().iter_raw_records(), generation)
+
+    def _update_record_table(self, event: ChangeEvent):
+        """確定した変更を記録テーブルに反映"""
+        record = self.storage.get_record(event.date) if event.kind != RECORD_DELETED else None
+        self._record_table.apply(event.date, record.to_dict() if record else None)
+
+    def get_statistics(self) -> RecordStatistics:
+        """
+        継続の統計を取得（以降は変更が確定するたびに差分だけを反映）
+
+        他のプロセスが記録を変更していれば、その変更は差分として届かないため作り直す。
+        """
+        if not self._statistics_ready:
+            generation = self.storage.get_metadata().get("generation")
+            if not self.statistics.load(generation):
+                self.statistics.rebuild(self.storage.snapshot().iter_raw_records(), generation)
+            self.events.subscribe(
+                self._update_statistics,
+                kinds=(RECORD_CREATED, RECORD_UPDATED, RECORD_DELETED),
+                sync=True
+            )
+            self._statistics_ready = True
+        else:
+            self._revalidate_statistics()
+        return self.statistics
+
+    def _revalidate_statistics(self) -> Optional[int]:
+        """
+        統計が反映している世代番号を現在のものに進める（他のプロセスの書き込みがあれば作り直す）
+
+        統計の世代番号から現在までの書き込みが全てこのプロセスのものなら、
+        その変更は全て差分として反映済みなので、統計は現在の記録と一致している。
+
+        Returns:
+            現在の世代番号
+        """
+        generation = self.storage.get_metadata().get("generation")
+        base = self.statistics.generation
+        if generation == base:
+            return generation
+        if self._written_here(base, generation):
+            self.statistics.generation = generation
+        else:
+            self.statistics.rebuild(self.storage.snapshot().iter_raw_records(), generation)
+        return generation
+
+    def _written_here(self, base: Optional[int], generation: Optional[int]) -> bool:
+        """世代番号 base の後から generation までの書き込みが全てこのプロセスのものか"""
+        return generation is not None and base is not None and all(
+            number in self.storage.written_generations for number in range(base + 1, generation + 1)
+        )
+
+    def _update_statistics(self, event: ChangeEvent):
+        """確定した変更を統計に反映"""
+        record = self.storage.get_record(event.date) if event.kind != RECORD_DELETED else None
+        self.statistics.apply(event.date, record.to_dict() if record else None)
+
+    def rebuild_statistics(self) -> List[str]:
+        """
+        統計を全ての記録から作り直す（差分の反映が正しかったかの確認を兼ねる）
+
+        Returns:
+            作り直す前の集計と一致しなかった項目の名前
+        """
+        statistics = self.get_statistics()
+        snapshot = self.storage.snapshot()
+        mismatches = statistics.verify(snapshot.iter_raw_records())
+        statistics.rebuild(snapshot.iter_raw_records(), statistics.generation)
+        return mismatches
+
+    def get_history(self, date: str) -> List[RecordRevision]:
+        """記録の版の一覧を取得（古い順）"""
+        return self.history.get_history(date)
+
+    def get_revision(self, date: str, n: int) -> Optional[Record]:
+        """
+        記録の指定した版を取得
+
+        Args:
+            n: 版番号（1から。負の数なら最新から数える: -1 が最新）
+
+        Returns:
+            その版の記録（存在しない版や削除された版ならNone）
+        """
+        record_data = self.history.get_revision(date, n)
+        return Record.from_dict(record_data) if record_data else None
 
     def get_record(self, date: str) -> Optional[Record]:
         """指定日の記録を取得"""
         return self.storage.get_record(date)
 
-    def get_all_records(self) -> Dict[str, Record]:
+    def get_all_records(self) -> Mapping[str, Record]:
         """全ての記録を取得"""
         return self.storage.get_all_records()
 
-    def get_records_by_month(self, year: int, month: int) -> Dict[str, Record]:
+    def iter_records(self, start: Optional[str] = None, end: Optional[str] = None,
+                     reverse: bool = False) -> Iterator[Record]:
+        """記録を日付順に1件ずつ取得（start/endは両端を含む）"""
+        return self.storage.iter_records(start, end, reverse)
+
+    def query(self, query: RecordQuery) -> Iterator[Record]:
+        """検索条件に一致する記録を日付順に1件ずつ取得"""
+        return self.query_planner.execute(query)
+
+    def explain_query(self, query: RecordQuery) -> QueryPlan:
+        """検索条件の実行計画を取得"""
+        return self.query_planner.plan(query)
+
+    def get_records_by_month(self, year: int, month: int) -> Mapping[str, Record]:
         """指定月の記録を取得"""
         return self.storage.get_records_by_month(year, month)
 
+    def get_records_in_range(self, start_date: str, end_date: str) -> Mapping[str, Record]:
+        """日付範囲（両端を含む）の記録を取得"""
+        return self.storage.get_records_in_range(start_date, end_date)
+
+    def get_records_by_tag(self, tag: str) -> Mapping[str, Record]:
+        """指定タグを持つ記録を取得"""
+        return self.storage.get_records_by_tag(tag)
+
+    def get_records_by_mood(self, mood: str) -> Mapping[str, Record]:
+        """指定した気分の記録を取得"""
+        return self.storage.get_records_by_mood(mood)
+
+    def get_dates_by_tag(self, tag: str) -> List[str]:
+        """指定タグを持つ記録の日付を取得（昇順）"""
+        return self.storage.get_dates_by_tag(tag)
+
+    def get_dates_by_mood(self, mood: str) -> List[str]:
+        """指定した気分の記録の日付を取得（昇順）"""
+        return self.storage.get_dates_by_mood(mood)
+
+    def get_tag_counts(self) -> Dict[str, int]:
+        """タグごとの記録数を取得"""
+        return self.storage.get_tag_counts()
+
+    def search(self, query: str, limit: Optional[int] = None) -> List[SearchResult]:
+        """
+        本文・タグ・画像キャプションを全文検索
+
+        Args:
+            query: 検索文字列（空白区切りでAND、OR でOR、"..." でフレーズ）
+            limit: 最大件数（Noneなら全件）
+
+        Returns:
+            スコアの高い順の検索結果
+        """
+        return self.storage.search_records(query, limit)
+
     def get_dates_with_records(self) -> List[str]:
         """記録が存在する日付のリストを取得"""
         return self.storage.get_dates_with_records()
@@ -34,27 +313,165 @@ class RecordController:
         self.storage.save_record(record)
         return record
 
-    def update_record(self, date: str, text: Optional[str] = None, tags: Optional[List[str]] = None, mood: Optional[str] = None) -> Optional[Record]:
-        """記録を更新"""
-        record = self.storage.get_record(date)
-        if record:
-            record.update(text, tags, mood)
-            self.storage.save_record(record)
-            return record
+    def update_record(self, date: str, text: Optional[str] = None, tags: Optional[List[str]] = None,
+                      mood: Optional[str] = None, expected_updated_at: Optional[str] = None) -> Optional[Record]:
+        """
+        記録を更新（読み込みから保存までを1つのトランザクションで行う）
+
+        Args:
+            expected_updated_at: 編集を始めた時点の記録の更新日時。指定した場合、
+                その後に別の処理で更新されていれば RecordConflictError を送出する
+        """
+        with self.batch():
+            record = self.storage.get_record(date)
+            if record:
+                if not self.history.has_history(date):
+                    # 履歴を取り始める前からある記録は、編集前の内容を最初の版にする
+                    self.history.record(date, record.to_dict())
+                base_updated_at = expected_updated_at or record.updated_at
+                record.update(text, tags, mood)
+                self.storage.save_record(record, expected_updated_at=base_updated_at)
+                return record
         return None
 
+    def put_record(self, record: Record):
+        """
+        記録を内容のまま保存（同期・取り込み用、updated_at は変更しない）
+
+        既存の記録を置き換える場合は、編集と同じく置き換える前の内容も履歴に残す。
+        """
+        with self.batch():
+            if not self.history.has_history(record.date):
+                existing = self.storage.get_record(record.date)
+                if existing:
+                    self.history.record(record.date, existing.to_dict())
+            self.storage.save_record(record)
+
     def delete_record(self, date: str) -> bool:
-        """記録を削除（関連画像も削除）"""
+        """記録を削除（関連画像は削除の確定後にバックグラウンドで削除）"""
         record = self.storage.get_record(date)
         if record:
-            # 画像ファイルを削除
-            for image in record.images:
-                self.image_handler.delete_image(image.path, image.thumbnail_path)
-
-            # 記録を削除
+            if record.images:
+                self._pending_image_deletions.setdefault(date, []).extend(record.images)
             return self.storage.delete_record(date)
         return False
 
+    def _bulk_update(self, dates: Iterable[str], edit: Callable[[Record], bool]) -> int:
+        """
+        指定した日付の記録を edit で変更し、1つのトランザクションで保存
+
+        Args:
+            dates: 対象の日付（記録がない日付は無視する）
+            edit: 記録を変更する関数。変更しなかった場合はFalseを返す
+
+        Returns:
+            変更した記録の数
+        """
+        count = 0
+        with self.batch():
+            now = datetime.now().isoformat()
+            for record in self.storage.get_records_by_dates(list(dates)).values():
+                original = record.to_dict()
+                if not edit(record):
+                    continue
+                if not self.history.has_history(record.date):
+                    # 履歴を取り始める前からある記録は、変更前の内容を最初の版にする
+                    self.history.record(record.date, original)
+                record.updated_at = now
+                self.storage.save_record(record)
+                count += 1
+        return count
+
+    def merge_tags(self, source_tags: Iterable[str], target_tag: str) -> int:
+        """
+        全ての記録で source_tags のタグを target_tag に置き換える（1つのトランザクション）
+
+        記録内のタグの位置は保ち、すでに target_tag があれば重複させない。
+
+        Returns:
+            変更した記録の数
+        """
+        target_tag = target_tag.strip()
+        if not target_tag:
+            raise ValueError("タグが空です")
+        sources = {tag for tag in source_tags if tag != target_tag}
+        if not sources:
+            return 0
+
+        def edit(record: Record) -> bool:
+            tags = []
+            for tag in record.tags:
+                tag = target_tag if tag in sources else tag
+                if tag not in tags:
+                    tags.append(tag)
+            if tags == record.tags:
+                return False
+            record.tags = tags
+            return True
+
+        dates = set()
+        for tag in sources:
+            dates.update(self.storage.get_dates_by_tag(tag))
+        return self._bulk_update(sorted(dates), edit)
+
+    def rename_tag(self, old_tag: str, new_tag: str) -> int:
+        """全ての記録でタグの名前を変更（new_tag がすでにあれば統合）し、変更した記録の数を返す"""
+        return self.merge_tags([old_tag], new_tag)
+
+    def add_tag_in_range(self, start_date: str, end_date: str, tag: str) -> int:
+        """日付範囲（両端を含む）の記録にタグを追加し、変更した記録の数を返す"""
+        tag = tag.strip()
+        if not tag:
+            raise ValueError("タグが空です")
+
+        def edit(record: Record) -> bool:
+            if tag in record.tags:
+                return False
+            record.tags.append(tag)
+            return True
+
+        return self._bulk_update(self.storage.get_dates_in_range(start_date, end_date), edit)
+
+    def remove_tag_in_range(self, start_date: str, end_date: str, tag: str) -> int:
+        """日付範囲（両端を含む）の記録からタグを外し、変更した記録の数を返す"""
+        def edit(record: Record) -> bool:
+            if tag not in record.tags:
+                return False
+            record.tags = [t for t in record.tags if t != tag]
+            return True
+
+        dates = [date for date in self.storage.get_dates_by_tag(tag) if start_date <= date <= end_date]
+        return self._bulk_update(dates, edit)
+
+    def set_mood_in_range(self, start_date: str, end_date: str, mood: Optional[str]) -> int:
+        """日付範囲（両端を含む）の記録の気分を設定（Noneなら解除）し、変更した記録の数を返す"""
+        if mood is not None and mood not in MOODS:
+            raise ValueError(f"不明な気分です: {mood}")
+
+        def edit(record: Record) -> bool:
+            if record.mood == mood:
+                return False
+            record.mood = mood
+            return True
+
+        return self._bulk_update(self.storage.get_dates_in_range(start_date, end_date), edit)
+
+    def delete_range(self, start_date: str, end_date: str) -> int:
+        """
+        日付範囲（両端を含む）の記録を1つのトランザクションで削除
+
+        画像ファイルは削除の確定後にバックグラウンドで削除する。
+
+        Returns:
+            削除した記録の数
+        """
+        count = 0
+        with self.batch():
+            for date in self.storage.get_dates_in_range(start_date, end_date):
+                if self.delete_record(date):
+                    count += 1
+        return count
+
     def record_exists(self, date: str) -> bool:
         """記録が存在するか確認"""
         return self.storage.record_exists(date)
@@ -66,30 +483,32 @@ class RecordController:
         Returns:
             (成功フラグ, メッセージ, ImageAttachment)
         """
-        # 記録を取得（存在しない場合は作成）
-        record = self.storage.get_record(date)
-        if not record:
-            record = self.create_record(date)
-
-        # 画像を保存
-        saved_path, thumb_path, file_size, error = self.image_handler.save_image(image_path, date)
-        if error:
-            return False, error, None
-
-        # ImageAttachmentを作成
-        import os
-        filename = os.path.basename(image_path)
-        image_attachment = ImageAttachment.create(
-            filename=filename,
-            path=saved_path,
-            thumbnail_path=thumb_path,
-            size_bytes=file_size,
-            caption=caption
-        )
+        with self.batch():
+            # 記録を取得（存在しない場合は作成）
+            record = self.storage.get_record(date)
+            if not record:
+                record = self.create_record(date)
 
-        # 記録に追加
-        record.add_image(image_attachment)
-        self.storage.save_record(record)
+            # 画像を保存
+            saved_path, thumb_path, file_size, error = self.image_store.save_image(image_path, date)
+            if error:
+                return False, error, None
+
+            # ImageAttachmentを作成
+            import os
+            filename = os.path.basename(image_path)
+            image_attachment = ImageAttachment.create(
+                filename=filename,
+                path=saved_path,
+                thumbnail_path=thumb_path,
+                size_bytes=file_size,
+                caption=caption
+            )
+
+            # 記録に追加
+            record.add_image(image_attachment)
+            self.storage.save_record(record)
+            self.events.publish(ChangeEvent(IMAGE_ADDED, date, image_attachment.id))
 
         return True, "画像を追加しました", image_attachment
 
@@ -109,11 +528,10 @@ class RecordController:
         if not removed_image:
             return False, "画像が見つかりません"
 
-        # ファイルを削除
-        self.image_handler.delete_image(removed_image.path, removed_image.thumbnail_path)
-
-        # 記録を保存
+        # 記録を保存し、ファイルは保存の確定後に削除
+        self._pending_image_deletions.setdefault(date, []).append(removed_image)
         self.storage.save_record(record)
+        self.events.publish(ChangeEvent(IMAGE_REMOVED, date, image_id))
 
         return True, "画像を削除しました"
 
@@ -137,6 +555,25 @@ class RecordController:
 
         return False, "画像が見つかりません"
 
+    def flush(self, timeout: Optional[float] = None) -> bool:
+        """
+        未書き込みの変更をファイルに書き込み、予約済みの画像の削除が終わるまで待つ（終了前に呼ぶ）
+
+        Returns:
+            全て書き込めたか
+        """
+        written = self.storage.flush(timeout)
+        if self._statistics_ready and written:
+            # 他のプロセスの変更を反映していない統計を、現在の世代番号で保存しないように照合する
+            generation = self._revalidate_statistics()
+            if self.statistics.dirty:
+                self.statistics.save(generation)
+        return self.image_deleter.flush(timeout) and written
+
     def get_metadata(self) -> dict:
         """メタデータを取得"""
         return self.storage.get_metadata()
+
+    def snapshot(self) -> RecordSnapshot:
+        """現時点の記録の読み取り専用ビューを取得（別スレッドでのエクスポート・集計用）"""
+        return self.storage.snapshot()
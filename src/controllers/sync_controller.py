@@ -0,0 +1,307 @@
+"""2つのデータディレクトリの差分同期"""
+import hashlib
+import json
+import os
+import shutil
+import uuid
+from dataclasses import dataclass, field
+from datetime import datetime
+from typing import Dict, List, Optional
+from ..models.record import Record
+from ..models.snapshot import RecordSnapshot
+from ..models import serialization
+from .record_controller import RecordController
+
+# 競合（同じ日を両方で編集）の解決方法
+SYNC_POLICIES = ("newest", "keep-both")
+STATE_FILENAME = "sync_state.json"
+# keep-both で古い方の本文をつなげる時の区切り
+KEEP_BOTH_SEPARATOR = "\n\n---\n\n"
+
+
+def content_hash(record_data: dict) -> str:
+    """記録の内容のハッシュ（更新日時・画像の保存先など端末ごとに異なりうる項目は含めない）"""
+    images = [
+        [image["id"], image["filename"], image.get("caption"), image["size_bytes"]]
+        for image in record_data.get("images", [])
+    ]
+    payload = [record_data.get("text", ""), record_data.get("tags", []), record_data.get("mood"), images]
+    return hashlib.sha256(json.dumps(payload, ensure_ascii=False).encode("utf-8")).hexdigest()
+
+
+def image_relative_path(path: str) -> str:
+    """画像の保存先パスから images ディレクトリ以下の相対パス（YYYY/MM/ファイル名）を取得"""
+    return "/".join(path.replace("\\", "/").split("/")[-3:])
+
+
+@dataclass
+class SyncSummary:
+    """同期の結果"""
+    policy: str
+    dry_run: bool = False
+    to_local: List[str] = field(default_factory=list)  # リモートからローカルへ書き込んだ日付
+    to_remote: List[str] = field(default_factory=list)  # ローカルからリモートへ書き込んだ日付
+    deleted_local: List[str] = field(default_factory=list)
+    deleted_remote: List[str] = field(default_factory=list)
+    conflicts: List[str] = field(default_factory=list)
+    unchanged: int = 0
+    images_copied: int = 0
+    image_bytes: int = 0
+    missing_images: List[str] = field(default_factory=list)
+
+    @property
+    def changed(self) -> bool:
+        """どちらかのディレクトリを変更するか"""
+        return bool(self.to_local or self.to_remote or self.deleted_local or self.deleted_remote)
+
+    def describe(self) -> str:
+        """結果を表示用の文字列にする"""
+        lines = [
+            f"同期{'（確認のみ）' if self.dry_run else ''}: 変更なし {self.unchanged} 件",
+            f"  リモート → ローカル: 書き込み {len(self.to_local)} 件、削除 {len(self.deleted_local)} 件",
+            f"  ローカル → リモート: 書き込み {len(self.to_remote)} 件、削除 {len(self.deleted_remote)} 件",
+            f"  画像: {self.images_copied} ファイル（{self.image_bytes / 1024:.1f} KB）",
+        ]
+        if self.conflicts:
+            lines.append(f"  競合 {len(self.conflicts)} 件（{self.policy}）: {', '.join(self.conflicts)}")
+        if self.missing_images:
+            lines.append(f"  見つからない画像 {len(self.missing_images)} 件: {', '.join(self.missing_images)}")
+        return "\n".join(lines)
+
+
+class SyncController:
+    """
+    2つのデータディレクトリ（ローカルとリモート）の記録・画像を差分だけ同期
+
+    前回の同期時点の各記録の更新日時を両方の sync_state.json に保存しておき、
+    それと比べて片方だけ変わった記録はもう一方へ書き込み、両方で変わった記録は競合として
+    policy に従って解決する。前回の同期がなければ、片方にしかない記録は削除せずにコピーする。
+    更新日時が異なる記録だけ内容のハッシュを比べるため、差分が小さければ件数によらず速い。
+    """
+
+    def __init__(self, local_dir: str, remote_dir: str, backend: str = "json", **storage_options):
+        """
+        Args:
+            local_dir: ローカルのデータディレクトリ
+            remote_dir: リモートのデータディレクトリ
+            backend: ストレージ形式（両方で同じもの）
+            storage_options: ストレージクラスに渡す追加オプション
+        """
+        self.local_dir = local_dir
+        self.remote_dir = remote_dir
+        self.local = RecordController(local_dir, backend, **storage_options)
+        self.remote = RecordController(remote_dir, backend, **storage_options)
+
+    @staticmethod
+    def _load_state(data_dir: str) -> dict:
+        """同期状態を読み込み（なければ新しいIDで作成）"""
+        try:
+            state = serialization.load_file(os.path.join(data_dir, STATE_FILENAME))
+        except FileNotFoundError:
+            state = {}
+        except Exception as e:
+            print(f"同期状態読み込みエラー: {e}")
+            state = {}
+        state.setdefault("id", str(uuid.uuid4()))
+        state.setdefault("peers", {})
+        return state
+
+    @staticmethod
+    def _save_state(data_dir: str, state: dict):
+        """同期状態をアトミックに書き込み"""
+        serialization.dump_file(os.path.join(data_dir, STATE_FILENAME), state, atomic=True)
+
+    @staticmethod
+    def _common_base(local_state: dict, remote_state: dict) -> Optional[Dict[str, str]]:
+        """前回の同期時点の {日付: updated_at}（両方の記録が一致しなければNone）"""
+        local_peer = local_state["peers"].get(remote_state["id"])
+        remote_peer = remote_state["peers"].get(local_state["id"])
+        if not local_peer or not remote_peer or local_peer.get("synced_at") != remote_peer.get("synced_at"):
+            return None
+        return local_peer.get("versions", {})
+
+    def sync(self, policy: str = "newest", dry_run: bool = False) -> SyncSummary:
+        """
+        同期を実行
+
+        Args:
+            policy: 競合の解決方法。"newest" は更新日時の新しい方を残し、
+                "keep-both" は新しい方に古い方の本文・タグ・画像を加えた記録を両方に書き込む
+            dry_run: Trueなら何も書き込まずに結果だけを返す
+
+        Returns:
+            同期の結果
+        """
+        if policy not in SYNC_POLICIES:
+            raise ValueError(f"不明な競合の解決方法です: {policy}")
+
+        local_state = self._load_state(self.local_dir)
+        remote_state = self._load_state(self.remote_dir)
+        base = self._common_base(local_state, remote_state)
+        local_snapshot = self.local.snapshot()
+        remote_snapshot = self.remote.snapshot()
+        local_versions = local_snapshot.get_versions()
+        remote_versions = remote_snapshot.get_versions()
+
+        summary = SyncSummary(policy, dry_run)
+        to_local: Dict[str, Record] = {}
+        to_remote: Dict[str, Record] = {}
+        for date in sorted(local_versions.keys() | remote_versions.keys()):
+            local_version = local_versions.get(date)
+            remote_version = remote_versions.get(date)
+            if local_version == remote_version:
+                summary.unchanged += 1
+                continue
+
+            base_version = base.get(date) if base is not None else None
+            if base is not None and remote_version == base_version:
+                # ローカルだけが変更・削除した
+                if local_version is None:
+                    summary.deleted_remote.append(date)
+                else:
+                    to_remote[date] = local_snapshot.get_record(date)
+            elif base is not None and local_version == base_version:
+                if remote_version is None:
+                    summary.deleted_local.append(date)
+                else:
+                    to_local[date] = remote_snapshot.get_record(date)
+            else:
+                self._resolve(date, local_snapshot, remote_snapshot, base is not None,
+                              policy, to_local, to_remote, summary)
+
+        summary.to_local = sorted(to_local)
+        summary.to_remote = sorted(to_remote)
+        if dry_run or not summary.changed:
+            if not dry_run and base is None:
+                # 初めから一致していた場合も、次回から削除を同期できるように状態を保存する
+                self._record_sync(local_state, remote_state, local_versions)
+            return summary
+
+        self._apply(self.local, self.local_dir, to_local, summary.deleted_local, summary)
+        self._apply(self.remote, self.remote_dir, to_remote, summary.deleted_remote, summary)
+        self.local.flush()
+        self.remote.flush()
+
+        versions = dict(local_versions)
+        for date, record in to_local.items():
+            versions[date] = record.updated_at
+        for date in summary.deleted_local:
+            versions.pop(date, None)
+        self._record_sync(local_state, remote_state, versions)
+        return summary
+
+    def _resolve(self, date: str, local_snapshot: RecordSnapshot, remote_snapshot: RecordSnapshot,
+                 has_base: bool, policy: str, to_local: Dict[str, Record], to_remote: Dict[str, Record],
+                 summary: SyncSummary):
+        """両方で変更された（または前回の同期がない）記録の扱いを決める"""
+        local_record = local_snapshot.get_record(date)
+        remote_record = remote_snapshot.get_record(date)
+        if local_record is None or remote_record is None:
+            # 片方にしかない: 初回の同期なら単にコピー、削除と編集が重なった場合は編集を残す
+            if local_record is None:
+                to_local[date] = remote_record
+            else:
+                to_remote[date] = local_record
+            if has_base:
+                summary.conflicts.append(date)
+            return
+
+        local_newer = local_record.updated_at >= remote_record.updated_at
+        if content_hash(local_record.to_dict()) == content_hash(remote_record.to_dict()):
+            # 内容は同じなので、更新日時だけ新しい方に揃える
+            if local_newer:
+                to_remote[date] = local_record
+            else:
+                to_local[date] = remote_record
+            return
+
+        summary.conflicts.append(date)
+        if policy == "keep-both":
+            merged = self._merge(local_record, remote_record)
+            to_local[date] = merged
+            to_remote[date] = merged
+        elif local_newer:
+            to_remote[date] = local_record
+        else:
+            to_local[date] = remote_record
+
+    @staticmethod
+    def _merge(local_record: Record, remote_record: Record) -> Record:
+        """新しい方の記録に、古い方の本文・タグ・画像を加えた記録を作成"""
+        if local_record.updated_at >= remote_record.updated_at:
+            newer, older = local_record, remote_record
+        else:
+            newer, older = remote_record, local_record
+        merged = Record.from_dict(newer.to_dict())
+        if older.text and older.text not in merged.text:
+            merged.text = f"{merged.text}{KEEP_BOTH_SEPARATOR}{older.text}" if merged.text else older.text
+        merged.tags += [tag for tag in older.tags if tag not in merged.tags]
+        image_ids = {image.id for image in merged.images}
+        merged.images += [image for image in older.images if image.id not in image_ids]
+        merged.mood = merged.mood or older.mood
+        merged.updated_at = datetime.now().isoformat()
+        return merged
+
+    def _apply(self, target: RecordController, target_dir: str, records: Dict[str, Record],
+               deletions: List[str], summary: SyncSummary):
+        """記録の書き込み・削除を1つのトランザクションで適用（画像は足りないものだけコピー）"""
+        images_dir = os.path.join(target_dir, "images")
+        with target.batch():
+            for date in sorted(records):
+                target.put_record(self._with_images(records[date], images_dir, summary))
+            for date in deletions:
+                target.delete_record(date)
+
+    def _with_images(self, record: Record, images_dir: str, summary: SyncSummary) -> Record:
+        """記録の画像を書き込み先へコピーし、画像のパスを書き込み先のものにした記録を返す"""
+        record = Record.from_dict(record.to_dict())
+        for image in record.images:
+            for attr in ("path", "thumbnail_path"):
+                path = getattr(image, attr)
+                relative_path = image_relative_path(path)
+                target_path = os.path.join(images_dir, *relative_path.split("/"))
+                copied = self._copy_image(relative_path, target_path)
+                if copied is None:
+                    summary.missing_images.append(relative_path)
+                elif copied:
+                    summary.images_copied += 1
+                    summary.image_bytes += copied
+                # 相対パスはアプリの作業ディレクトリ基準なので、どちらの端末でもそのまま使える
+                if os.path.isabs(path):
+                    setattr(image, attr, target_path)
+        return record
+
+    def _copy_image(self, relative_path: str, target_path: str) -> Optional[int]:
+        """
+        画像ファイルが書き込み先になければコピー
+
+        画像のファイル名はIDなので、同じ名前で同じサイズのファイルがあれば同じ画像とみなす。
+
+        Returns:
+            コピーしたバイト数（コピー不要なら0、どちらのディレクトリにもなければNone）
+        """
+        sources = [
+            os.path.join(data_dir, "images", *relative_path.split("/"))
+            for data_dir in (self.local_dir, self.remote_dir)
+        ]
+        sources = [path for path in sources if os.path.exists(path) and path != target_path]
+        if not sources:
+            return 0 if os.path.exists(target_path) else None
+        source_size = os.path.getsize(sources[0])
+        if os.path.exists(target_path) and os.path.getsize(target_path) == source_size:
+            return 0
+        try:
+            os.makedirs(os.path.dirname(target_path), exist_ok=True)
+            shutil.copy2(sources[0], target_path)
+        except OSError as e:
+            print(f"画像コピーエラー: {e}")
+            return None
+        return source_size
+
+    def _record_sync(self, local_state: dict, remote_state: dict, versions: Dict[str, str]):
+        """同期した時点の更新日時を両方の同期状態に保存"""
+        entry = {"synced_at": datetime.now().isoformat(), "versions": versions}
+        local_state["peers"][remote_state["id"]] = entry
+        remote_state["peers"][local_state["id"]] = entry
+        self._save_state(self.local_dir, local_state)
+        self._save_state(self.remote_dir, remote_state)
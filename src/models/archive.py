@@ -0,0 +1,51 @@
+"""過去の年の記録の圧縮アーカイブ"""
+import gzip
+import lzma
+import os
+from typing import Dict
+from . import serialization
+
+
+# 形式名 → (拡張子, 圧縮モジュール)
+ARCHIVE_FORMATS = {
+    "xz": (".json.xz", lzma),
+    "gz": (".json.gz", gzip),
+}
+
+
+def validate_format(archive_format: str) -> str:
+    """アーカイブ形式を検証"""
+    if archive_format not in ARCHIVE_FORMATS:
+        raise ValueError(f"不明なアーカイブ形式です: {archive_format}（{', '.join(ARCHIVE_FORMATS)} のいずれか）")
+    return archive_format
+
+
+def archive_filename(year: str, archive_format: str) -> str:
+    """アーカイブのファイル名を取得（例: 2019.json.xz）"""
+    return year + ARCHIVE_FORMATS[archive_format][0]
+
+
+def _module_for(path: str):
+    """ファイル名から圧縮モジュールを判定"""
+    for extension, module in ARCHIVE_FORMATS.values():
+        if path.endswith(extension):
+            return module
+    raise ValueError(f"アーカイブ形式を判別できません: {path}")
+
+
+def write_archive(path: str, records: Dict[str, dict]):
+    """1年分の記録を圧縮してアトミックに書き込み"""
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    content = serialization.dumps({"records": records}, "compact")
+    tmp_path = path + ".tmp"
+    with _module_for(path).open(tmp_path, 'wb') as f:
+        f.write(content)
+    with open(tmp_path, 'rb') as f:
+        os.fsync(f.fileno())
+    os.replace(tmp_path, path)
+
+
+def read_archive(path: str) -> Dict[str, dict]:
+    """アーカイブから1年分の記録を読み込み"""
+    with _module_for(path).open(path, 'rb') as f:
+        return serialization.loads(f.read()).get("records", {})
@@ -0,0 +1,104 @@
+"""ストレージのインターフェース"""
+from typing import ContextManager, Dict, Iterator, List, Mapping, Optional, Protocol, Set
+from .record import Record
+from .search_index import SearchResult
+from .events import ChangeEventBus
+from .snapshot import RecordSnapshot
+
+
+class StorageBackend(Protocol):
+    """
+    記録の保存先が実装するインターフェース
+
+    Storage（JSON）、SQLiteStorage、ShardedStorage、MemoryStorage が実装し、
+    RecordController・QueryPlanner・エクスポートはこのメソッドだけを使う。
+    """
+
+    events: ChangeEventBus
+    # このインスタンスが書き込んだ世代番号（get_metadata()["generation"] のうち自分の書き込みによるもの）
+    written_generations: Set[int]
+
+    def transaction(self) -> ContextManager:
+        """複数の変更を1回の書き込みにまとめるトランザクション"""
+        ...
+
+    def get_record(self, date: str) -> Optional[Record]:
+        """指定日の記録を取得"""
+        ...
+
+    def get_all_records(self) -> Mapping[str, Record]:
+        """全ての記録を取得"""
+        ...
+
+    def iter_records(self, start: Optional[str] = None, end: Optional[str] = None,
+                     reverse: bool = False) -> Iterator[Record]:
+        """記録を日付順に1件ずつ取得（start/endは両端を含む）"""
+        ...
+
+    def get_dates_in_range(self, start_date: Optional[str] = None, end_date: Optional[str] = None) -> List[str]:
+        """日付範囲（両端を含む）にある記録の日付を取得（昇順）"""
+        ...
+
+    def get_records_by_dates(self, dates: List[str]) -> Mapping[str, Record]:
+        """指定した日付の記録をまとめて取得"""
+        ...
+
+    def get_records_by_month(self, year: int, month: int) -> Mapping[str, Record]:
+        """指定月の記録を取得"""
+        ...
+
+    def get_records_in_range(self, start_date: str, end_date: str) -> Mapping[str, Record]:
+        """日付範囲（両端を含む）の記録を取得"""
+        ...
+
+    def get_records_by_tag(self, tag: str) -> Mapping[str, Record]:
+        """指定タグを持つ記録を取得"""
+        ...
+
+    def get_records_by_mood(self, mood: str) -> Mapping[str, Record]:
+        """指定した気分の記録を取得"""
+        ...
+
+    def get_dates_by_tag(self, tag: str) -> List[str]:
+        """指定タグを持つ記録の日付を取得（昇順）"""
+        ...
+
+    def get_dates_by_mood(self, mood: str) -> List[str]:
+        """指定した気分の記録の日付を取得（昇順）"""
+        ...
+
+    def get_tag_counts(self) -> Dict[str, int]:
+        """タグごとの記録数を取得"""
+        ...
+
+    def search_records(self, query: str, limit: Optional[int] = None) -> List[SearchResult]:
+        """本文・タグ・画像キャプションを全文検索（スコアの高い順）"""
+        ...
+
+    def get_dates_with_records(self) -> List[str]:
+        """記録が存在する日付のリストを取得"""
+        ...
+
+    def save_record(self, record: Record, expected_updated_at: Optional[str] = None):
+        """記録を保存（新規作成または更新）"""
+        ...
+
+    def delete_record(self, date: str) -> bool:
+        """記録を削除"""
+        ...
+
+    def record_exists(self, date: str) -> bool:
+        """指定日に記録が存在するか確認"""
+        ...
+
+    def flush(self, timeout: Optional[float] = None) -> bool:
+        """未書き込みの変更を書き込むまで待つ"""
+        ...
+
+    def get_metadata(self) -> dict:
+        """メタデータを取得"""
+        ...
+
+    def snapshot(self) -> RecordSnapshot:
+        """現時点の記録の読み取り専用ビューを取得（その後の変更の影響を受けない）"""
+        ...
@@ -0,0 +1,112 @@
+"""記録の変更イベントの通知"""
+import threading
+from contextlib import contextmanager
+from dataclasses import dataclass
+from typing import Callable, Iterable, List, Optional, Tuple
+
+# イベントの種類
+RECORD_CREATED = "record_created"
+RECORD_UPDATED = "record_updated"
+RECORD_DELETED = "record_deleted"
+IMAGE_ADDED = "image_added"
+IMAGE_REMOVED = "image_removed"
+
+
+@dataclass(frozen=True)
+class ChangeEvent:
+    """記録の変更イベント"""
+    kind: str  # RECORD_CREATED, RECORD_UPDATED, RECORD_DELETED, IMAGE_ADDED, IMAGE_REMOVED
+    date: str  # 変更のあった記録の日付（YYYY-MM-DD）
+    image_id: Optional[str] = None  # 画像の追加・削除の場合のみ
+
+
+class ChangeEventBus:
+    """
+    変更イベントを購読者へ通知
+
+    どのスレッドからも発行できる。dispatcher を設定すると通知はそれを経由して行う
+    （Tkinterでは root.after でメインスレッドに渡す）。sync=True で購読した関数は
+    dispatcher を経由せず、変更を確定したスレッドでその場で呼ばれる（履歴の記録など）。
+    hold() の間に発行したイベントはブロックの終了時にまとめて通知し、例外で終了した場合は破棄する。
+    """
+
+    def __init__(self):
+        self._subscribers: List[Tuple[Callable[[ChangeEvent], None], Optional[frozenset], bool]] = []
+        self._lock = threading.Lock()
+        self._dispatcher: Optional[Callable[[Callable[[], None]], None]] = None
+        # hold() 中のスレッドごとの保留イベント
+        self._local = threading.local()
+
+    def set_dispatcher(self, dispatcher: Optional[Callable[[Callable[[], None]], None]]):
+        """通知を実行する関数を設定（例: lambda deliver: root.after(0, deliver)。Noneなら発行したスレッドで通知）"""
+        self._dispatcher = dispatcher
+
+    def subscribe(self, callback: Callable[[ChangeEvent], None],
+                  kinds: Optional[Iterable[str]] = None, sync: bool = False) -> Callable[[], None]:
+        """
+        イベントを購読
+
+        Args:
+            callback: イベントを受け取る関数
+            kinds: 受け取るイベントの種類（Noneなら全て）
+            sync: Trueなら dispatcher を経由せず、発行したスレッドで呼ぶ
+
+        Returns:
+            購読を解除する関数
+        """
+        entry = (callback, frozenset(kinds) if kinds is not None else None, sync)
+        with self._lock:
+            self._subscribers.append(entry)
+
+        def unsubscribe():
+            with self._lock:
+                if entry in self._subscribers:
+                    self._subscribers.remove(entry)
+        return unsubscribe
+
+    def publish(self, event: ChangeEvent):
+        """イベントを発行（hold() 中なら保留）"""
+        held = getattr(self._local, "events", None)
+        if held is not None:
+            held.append(event)
+            return
+        self._dispatch([event])
+
+    @contextmanager
+    def hold(self):
+        """ブロック内で発行したイベントを、正常終了時にまとめて通知する（入れ子にした場合は最も外側で通知）"""
+        if getattr(self._local, "events", None) is not None:
+            yield
+            return
+
+        self._local.events = []
+        try:
+            yield
+        except BaseException:
+            self._local.events = None
+            raise
+        events, self._local.events = self._local.events, None
+        if events:
+            # 同じ記録への同じ種類の変更は1回だけ通知する
+            self._dispatch(list(dict.fromkeys(events)))
+
+    def _dispatch(self, events: List[ChangeEvent]):
+        """同期の購読者にはその場で通知し、残りは dispatcher に渡す（未設定ならそのまま通知）"""
+        if self._dispatcher is None:
+            self._deliver(events)
+            return
+        self._deliver(events, sync=True)
+        self._dispatcher(lambda: self._deliver(events, sync=False))
+
+    def _deliver(self, events: List[ChangeEvent], sync: Optional[bool] = None):
+        """購読者にイベントを通知（sync を指定した場合はその種類の購読者のみ）"""
+        with self._lock:
+            subscribers = [entry for entry in self._subscribers if sync is None or entry[2] == sync]
+        for event in events:
+            for callback, kinds, _ in subscribers:
+                if kinds is not None and event.kind not in kinds:
+                    continue
+                try:
+                    callback(event)
+                except Exception as e:
+                    print(f"イベント通知エラー: {e}")
@@ -0,0 +1,131 @@
+"""タグ・気分の転置索引"""
+from typing import Dict, List, Optional, Set
+from . import serialization
+
+
+class RecordFieldIndex:
+    """
+    タグ → 日付, 気分 → 日付 の転置索引
+
+    記録の保存・削除のたびに差分だけを反映し、必要に応じてファイルに保存する。
+    保存時の記録ファイルの識別情報（signature）を一緒に記録し、読み込み時に照合する。
+    index_file がNoneならファイルには保存せず、メモリ上だけで使う。
+    """
+
+    def __init__(self, index_file: Optional[str]):
+        self.index_file = index_file
+        self._tags: Dict[str, Set[str]] = {}
+        self._moods: Dict[str, Set[str]] = {}
+        # 索引が対応している記録辞書（メモリ上）とファイルの識別情報
+        self._source: Optional[dict] = None
+        self._signature: Optional[list] = None
+        self._built = False
+
+    @classmethod
+    def _normalize_signature(cls, signature):
+        """識別情報（タプルの入れ子）をJSONで保存した時と同じリスト形式に変換"""
+        if isinstance(signature, (tuple, list)):
+            return [cls._normalize_signature(item) for item in signature]
+        return signature
+
+    def is_built_for(self, records: dict) -> bool:
+        """指定した記録辞書に対応した索引か確認"""
+        return self._built and self._source is records
+
+    def rebuild(self, records: dict):
+        """記録辞書から索引を作り直す"""
+        self._tags = {}
+        self._moods = {}
+        for date, record_data in records.items():
+            self._add(date, record_data)
+        self._source = records
+        self._signature = None
+        self._built = True
+
+    def attach(self, records: dict, signature):
+        """ファイルから読み込んだ記録辞書が索引の元データと一致すれば対応付ける"""
+        if self._built and self._signature is not None and self._signature == self._normalize_signature(signature):
+            self._source = records
+
+    def rebind(self, records: dict):
+        """差分を反映済みの新しい記録辞書に対応付け直す"""
+        self._source = records
+
+    def apply(self, date: str, old_data: Optional[dict], new_data: Optional[dict]):
+        """記録の変更（old_data → new_data、Noneは存在しない）を索引に反映"""
+        if old_data is not None:
+            self._remove(date, old_data)
+        if new_data is not None:
+            self._add(date, new_data)
+        self._signature = None
+
+    def _add(self, date: str, record_data: dict):
+        """索引に記録を追加"""
+        for tag in record_data.get("tags", []):
+            self._tags.setdefault(tag, set()).add(date)
+        mood = record_data.get("mood")
+        if mood:
+            self._moods.setdefault(mood, set()).add(date)
+
+    def _remove(self, date: str, record_data: dict):
+        """索引から記録を削除"""
+        for tag in record_data.get("tags", []):
+            dates = self._tags.get(tag)
+            if dates is not None:
+                dates.discard(date)
+                if not dates:
+                    del self._tags[tag]
+        mood = record_data.get("mood")
+        if mood and mood in self._moods:
+            self._moods[mood].discard(date)
+            if not self._moods[mood]:
+                del self._moods[mood]
+
+    def save(self, signature):
+        """索引をファイルに保存"""
+        if not self._built or self.index_file is None:
+            return
+        self._signature = self._normalize_signature(signature)
+        try:
+            serialization.dump_file(self.index_file, {
+                "signature": self._signature,
+                "tags": {tag: sorted(dates) for tag, dates in self._tags.items()},
+                "moods": {mood: sorted(dates) for mood, dates in self._moods.items()}
+            }, "compact", atomic=True)
+        except OSError as e:
+            print(f"索引書き込み警告: {e}")
+
+    def load_if_current(self, signature) -> bool:
+        """保存済みの索引が指定した識別情報と一致すれば読み込む"""
+        signature = self._normalize_signature(signature)
+        if signature is None:
+            return False
+        if self._built and self._signature == signature:
+            return True
+        if self.index_file is None:
+            return False
+        try:
+            stored = serialization.load_file(self.index_file)
+        except (OSError, ValueError):
+            return False
+        if stored.get("signature") != signature:
+            return False
+
+        self._tags = {tag: set(dates) for tag, dates in stored.get("tags", {}).items()}
+        self._moods = {mood: set(dates) for mood, dates in stored.get("moods", {}).items()}
+        self._source = None
+        self._signature = signature
+        self._built = True
+        return True
+
+    def get_dates_by_tag(self, tag: str) -> List[str]:
+        """指定タグを持つ記録の日付を取得（昇順）"""
+        return sorted(self._tags.get(tag, ()))
+
+    def get_dates_by_mood(self, mood: str) -> List[str]:
+        """指定した気分の記録の日付を取得（昇順）"""
+        return sorted(self._moods.get(mood, ()))
+
+    def get_tag_counts(self) -> Dict[str, int]:
+        """タグごとの記録数を取得"""
+        return {tag: len(dates) for tag, dates in self._tags.items()}
@@ -0,0 +1,123 @@
+"""データディレクトリのプロセス間ロック"""
+import os
+import threading
+from contextlib import contextmanager
+from typing import Optional
+
+try:
+    import fcntl
+except ImportError:
+    fcntl = None
+
+try:
+    import msvcrt
+except ImportError:
+    msvcrt = None
+
+
+def _lock_file(f, shared: bool):
+    """ファイルをロック（取得できるまで待つ）"""
+    if fcntl is not None:
+        fcntl.flock(f.fileno(), fcntl.LOCK_SH if shared else fcntl.LOCK_EX)
+    elif msvcrt is not None:
+        # Windowsには共有ロックがないため常に排他ロック
+        f.seek(0)
+        while True:
+            try:
+                msvcrt.locking(f.fileno(), msvcrt.LK_LOCK, 1)
+                return
+            except OSError:
+                # LK_LOCK は約10秒で諦めるので取得できるまで繰り返す
+                continue
+
+
+def _unlock_file(f):
+    """ファイルのロックを解除"""
+    if fcntl is not None:
+        fcntl.flock(f.fileno(), fcntl.LOCK_UN)
+    elif msvcrt is not None:
+        f.seek(0)
+        msvcrt.locking(f.fileno(), msvcrt.LK_UNLCK, 1)
+
+
+class InterProcessLock:
+    """
+    ロックファイルによるアドバイザリロック（Linux/macOSはfcntl、Windowsはmsvcrt）
+
+    同じプロセス内では再入可能で、スレッド間の排他も兼ねる。
+    共有ロック中に排他ロックを要求した場合は排他ロックに切り替え、最も外側の解放まで保持する。
+    """
+
+    def __init__(self, path: str):
+        self.path = path
+        self._thread_lock = threading.RLock()
+        self._file = None
+        self._depth = 0
+        self._shared = False
+
+    def acquire(self, shared: bool = False):
+        """ロックを取得"""
+        self._thread_lock.acquire()
+        try:
+            if self._depth == 0:
+                self._file = open(self.path, 'a+b')
+                try:
+                    _lock_file(self._file, shared)
+                except BaseException:
+                    self._file.close()
+                    self._file = None
+                    raise
+                self._shared = shared
+            elif self._shared and not shared:
+                _lock_file(self._file, False)
+                self._shared = False
+        except BaseException:
+            self._thread_lock.release()
+            raise
+        self._depth += 1
+
+    def release(self):
+        """ロックを解放"""
+        self._depth -= 1
+        if self._depth == 0:
+            try:
+                _unlock_file(self._file)
+            finally:
+                self._file.close()
+                self._file = None
+        self._thread_lock.release()
+
+    @contextmanager
+    def exclusive(self):
+        """排他ロック（読み込み・変更・書き込みの一連の処理用）"""
+        self.acquire(shared=False)
+        try:
+            yield
+        finally:
+            self.release()
+
+    @contextmanager
+    def shared(self):
+        """共有ロック（ファイルの読み込み用）"""
+        self.acquire(shared=True)
+        try:
+            yield
+        finally:
+            self.release()
+
+
+def read_generation(path: str) -> Optional[int]:
+    """世代番号ファイルを読み込み（なければNone）"""
+    try:
+        with open(path, 'rb') as f:
+            return int(f.read() or 0)
+    except (OSError, ValueError):
+        return None
+
+
+def write_generation(path: str, generation: int):
+    """世代番号ファイルをアトミックに書き込み"""
+    tmp_path = path + ".tmp"
+    with open(tmp_path, 'wb') as f:
+        f.write(str(generation).encode('ascii'))
+    os.replace(tmp_path, path)
@@ -0,0 +1,276 @@
+"""記録の変更履歴（差分保存）"""
+import json
+import os
+import threading
+from collections import OrderedDict
+from contextlib import contextmanager
+from dataclasses import dataclass
+from datetime import datetime
+from difflib import SequenceMatcher
+from typing import Dict, List, Optional, Tuple
+from .file_lock import InterProcessLock
+
+# 本文以外で、変更があった時だけ履歴に保存する項目
+_FIELDS = ("id", "date", "created_at", "tags", "mood", "images")
+
+
+def text_delta(old: str, new: str) -> List[list]:
+    """
+    本文の差分を作成
+
+    共通の先頭・末尾を除いた部分を文字単位で比較する（1日の記録の編集は局所的なため）。
+
+    Returns:
+        [開始位置, 終了位置, 置き換える文字列] のリスト（変更前の本文の位置、昇順）
+    """
+    prefix = 0
+    limit = min(len(old), len(new))
+    while prefix < limit and old[prefix] == new[prefix]:
+        prefix += 1
+    suffix = 0
+    while suffix < limit - prefix and old[-1 - suffix] == new[-1 - suffix]:
+        suffix += 1
+
+    old_mid = old[prefix:len(old) - suffix]
+    new_mid = new[prefix:len(new) - suffix]
+    if not old_mid and not new_mid:
+        return []
+    if not old_mid or not new_mid:
+        return [[prefix, prefix + len(old_mid), new_mid]]
+
+    ops = []
+    matcher = SequenceMatcher(None, old_mid, new_mid, autojunk=False)
+    for tag, i1, i2, j1, j2 in matcher.get_opcodes():
+        if tag != "equal":
+            ops.append([prefix + i1, prefix + i2, new_mid[j1:j2]])
+    return ops
+
+
+def apply_text_delta(old: str, ops: List[list]) -> str:
+    """本文の差分を適用"""
+    parts = []
+    position = 0
+    for start, end, replacement in ops:
+        parts.append(old[position:start])
+        parts.append(replacement)
+        position = end
+    parts.append(old[position:])
+    return "".join(parts)
+
+
+@dataclass
+class RecordRevision:
+    """記録の版の情報"""
+    number: int  # 1から始まる版番号
+    timestamp: str  # その版の更新日時（削除の場合は削除日時）
+    deleted: bool = False  # 削除された版か
+    snapshot: bool = False  # 全体を保存した版か（Falseなら前の版との差分）
+
+
+class RecordHistory:
+    """
+    記録ごとの変更履歴
+
+    data/history/YYYY/YYYY-MM-DD.jsonl に1版1行で追記する。
+    通常は前の版との差分（本文は文字単位、その他は変わった項目のみ）を保存し、
+    SNAPSHOT_INTERVAL 版ごとに全体を保存して、復元時に適用する差分の数を抑える。
+    複数のプロセスが同じ履歴に追記する場合に備え、追記は history.lock の排他ロック中に行い、
+    キャッシュした最新の版の後に他のプロセスが追記していれば読み直して全体を保存する。
+    history_dir がNoneならファイルには書き込まず、メモリ上だけに保持する。
+    """
+
+    SNAPSHOT_INTERVAL = 20
+    # 最新の版を保持しておく記録の数（差分作成のたびにファイルを読まないため）
+    CACHE_SIZE = 64
+
+    def __init__(self, history_dir: Optional[str]):
+        self.history_dir = history_dir
+        self._lock = threading.RLock()
+        # メモリ上の履歴（history_dir がNoneの場合）: 日付 → 1版1行の文字列のリスト
+        self._memory: Optional[Dict[str, List[str]]] = {} if history_dir is None else None
+        # 日付 → (最新の版番号, 最新の版の内容。削除済みならNone, その時点の履歴ファイルのサイズ)
+        self._latest: "OrderedDict[str, Tuple[int, Optional[dict], int]]" = OrderedDict()
+        self._process_lock = InterProcessLock(os.path.join(history_dir, "history.lock")) if history_dir else None
+
+    def _path(self, date: str) -> str:
+        """履歴ファイルのパス"""
+        return os.path.join(self.history_dir, date[:4], f"{date}.jsonl")
+
+    @contextmanager
+    def _file_lock(self, shared: bool = False):
+        """他のプロセスと履歴ファイルの読み書きが重ならないようロック（メモリ上の履歴では何もしない）"""
+        if self._process_lock is None:
+            yield
+            return
+        os.makedirs(self.history_dir, exist_ok=True)
+        with (self._process_lock.shared() if shared else self._process_lock.exclusive()):
+            yield
+
+    def _size(self, date: str) -> int:
+        """履歴の大きさ（ファイルならバイト数、メモリ上なら行数）"""
+        if self._memory is not None:
+            return len(self._memory.get(date, []))
+        try:
+            return os.path.getsize(self._path(date))
+        except OSError:
+            return 0
+
+    def _read_entries(self, date: str) -> List[dict]:
+        """履歴ファイルの全エントリを読み込み（末尾の書きかけの行は切り詰める）"""
+        if self._memory is not None:
+            return [json.loads(line) for line in self._memory.get(date, [])]
+        path = self._path(date)
+        try:
+            with open(path, 'rb') as f:
+                content = f.read()
+        except FileNotFoundError:
+            return []
+
+        complete = content.rfind(b"\n") + 1
+        if complete < len(content):
+            # クラッシュで途中まで書かれた行は、次の追記と繋がらないよう削除する
+            print(f"履歴末尾の不完全な行を破棄します: {path}")
+            with open(path, 'r+b') as f:
+                f.truncate(complete)
+        return [json.loads(line) for line in content[:complete].decode('utf-8').splitlines() if line.strip()]
+
+    @staticmethod
+    def _rebuild(entries: List[dict], number: int) -> Optional[dict]:
+        """直前の全体保存から差分を順に適用して、指定した版の内容を復元"""
+        start = number - 1
+        while start > 0 and "full" not in entries[start] and not entries[start].get("deleted"):
+            start -= 1
+
+        state: Optional[dict] = None
+        for entry in entries[start:number]:
+            if entry.get("deleted"):
+                state = None
+            elif "full" in entry:
+                state = dict(entry["full"])
+            elif state is not None:
+                state = dict(state)
+                state.update(entry.get("set", {}))
+                state["text"] = apply_text_delta(state.get("text", ""), entry.get("text", []))
+                state["updated_at"] = entry["at"]
+        return state
+
+    def _get_latest(self, date: str) -> Tuple[int, Optional[dict], bool]:
+        """
+        最新の版番号と内容を取得（ロック中に呼ぶ）
+
+        Returns:
+            (版番号, 内容, キャッシュした後に他のプロセスが追記していたか)
+        """
+        cached = self._latest.get(date)
+        if cached is not None and cached[2] == self._size(date):
+            self._latest.move_to_end(date)
+            return cached[0], cached[1], False
+        entries = self._read_entries(date)
+        latest = (len(entries), self._rebuild(entries, len(entries)) if entries else None)
+        self._remember(date, latest)
+        return latest[0], latest[1], cached is not None
+
+    def _remember(self, date: str, latest: Tuple[int, Optional[dict]]):
+        """最新の版をキャッシュ（履歴ファイルの現在のサイズと合わせて保持する）"""
+        self._latest[date] = (latest[0], latest[1], self._size(date))
+        self._latest.move_to_end(date)
+        while len(self._latest) > self.CACHE_SIZE:
+            self._latest.popitem(last=False)
+
+    def record(self, date: str, record_data: Optional[dict]) -> Optional[int]:
+        """
+        新しい版を追加
+
+        Args:
+            date: 記録の日付
+            record_data: 保存された記録の辞書（削除された場合はNone）
+
+        Returns:
+            追加した版の番号（最新の版と同じ内容なら追加せずNone）
+        """
+        with self._lock, self._file_lock():
+            number, previous, appended_elsewhere = self._get_latest(date)
+            if record_data is None:
+                if previous is None:
+                    return None
+                entry = {"n": number + 1, "at": datetime.now().isoformat(), "deleted": True}
+            elif previous is not None and previous.get("updated_at") == record_data.get("updated_at"):
+                return None
+            elif previous is None or number % self.SNAPSHOT_INTERVAL == 0 or appended_elsewhere:
+                # 他のプロセスが追記していた場合は、この版だけで復元できるよう全体を保存する
+                entry = {"n": number + 1, "at": record_data.get("updated_at"), "full": record_data}
+            else:
+                entry = {"n": number + 1, "at": record_data.get("updated_at")}
+                ops = text_delta(previous.get("text", ""), record_data.get("text", ""))
+                if ops:
+                    entry["text"] = ops
+                changed = {key: record_data.get(key) for key in _FIELDS if previous.get(key) != record_data.get(key)}
+                if changed:
+                    entry["set"] = changed
+
+            line = json.dumps(entry, ensure_ascii=False, separators=(",", ":")) + "\n"
+            try:
+                if self._memory is not None:
+                    self._memory.setdefault(date, []).append(line)
+                else:
+                    path = self._path(date)
+                    os.makedirs(os.path.dirname(path), exist_ok=True)
+                    with open(path, 'a', encoding='utf-8') as f:
+                        f.write(line)
+            except OSError as e:
+                print(f"履歴書き込みエラー: {e}")
+                self._latest.pop(date, None)
+                return None
+            self._remember(date, (number + 1, dict(record_data) if record_data is not None else None))
+            return number + 1
+
+    def has_history(self, date: str) -> bool:
+        """履歴が存在するか確認"""
+        with self._lock:
+            latest = self._latest.get(date)
+            if latest is not None:
+                return latest[0] > 0
+            if self._memory is not None:
+                return date in self._memory
+            return os.path.exists(self._path(date))
+
+    def get_history(self, date: str) -> List[RecordRevision]:
+        """版の一覧を取得（古い順）"""
+        with self._lock, self._file_lock(shared=True):
+            entries = self._read_entries(date)
+        return [
+            RecordRevision(
+                number=i + 1,
+                timestamp=entry.get("at") or "",
+                deleted=bool(entry.get("deleted")),
+                snapshot="full" in entry
+            )
+            for i, entry in enumerate(entries)
+        ]
+
+    def get_revision(self, date: str, number: int) -> Optional[dict]:
+        """
+        指定した版の内容を復元
+
+        Args:
+            number: 版番号（1から。負の数なら最新から数える: -1 が最新）
+
+        Returns:
+            記録の辞書（存在しない版や削除された版ならNone）
+        """
+        with self._lock, self._file_lock(shared=True):
+            entries = self._read_entries(date)
+        if number < 0:
+            number += len(entries) + 1
+        if not 1 <= number <= len(entries):
+            return None
+        return self._rebuild(entries, number)
+
+    def size_bytes(self, date: str) -> int:
+        """履歴ファイルのサイズを取得"""
+        if self._memory is not None:
+            return sum(len(line.encode('utf-8')) for line in self._memory.get(date, []))
+        try:
+            return os.path.getsize(self._path(date))
+        except OSError:
+            return 0
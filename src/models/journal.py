@@ -0,0 +1,125 @@
+"""追記型ジャーナル（先行書き込みログ）"""
+import json
+import os
+from typing import Optional
+
+
+class RecordJournal:
+    """記録の変更を1行1エントリのJSONとして追記するジャーナル"""
+
+    def __init__(self, path: str):
+        self.path = path
+        self.rotated_path = path + ".old"
+        self.entry_count = 0
+
+    def size_bytes(self) -> int:
+        """ジャーナルファイルのサイズを取得"""
+        try:
+            return os.path.getsize(self.path)
+        except OSError:
+            return 0
+
+    def exists(self) -> bool:
+        """未反映のジャーナルが存在するか確認"""
+        return os.path.exists(self.path) or os.path.exists(self.rotated_path)
+
+    def append(self, *entries: dict):
+        """エントリを1件1行で追記し、まとめてディスクに同期"""
+        lines = "".join(
+            json.dumps(entry, ensure_ascii=False, separators=(",", ":")) + "\n"
+            for entry in entries
+        )
+        with open(self.path, 'a', encoding='utf-8') as f:
+            f.write(lines)
+            f.flush()
+            os.fsync(f.fileno())
+        self.entry_count += len(entries)
+
+    def replay(self, data: dict) -> Optional[str]:
+        """
+        ジャーナルをスナップショットに適用
+
+        Args:
+            data: records.json から読み込んだデータ（直接更新される）
+
+        Returns:
+            最後に適用したエントリの時刻（エントリがなければNone）
+        """
+        last_timestamp = None
+        self.entry_count = 0
+        # 圧縮途中で残った旧ジャーナル → 現行ジャーナルの順に適用
+        for path in (self.rotated_path, self.path):
+            for entry in self._read_entries(path):
+                self.apply_entry(data, entry)
+                last_timestamp = entry.get("ts", last_timestamp)
+                if path == self.path:
+                    self.entry_count += 1
+        return last_timestamp
+
+    def _read_entries(self, path: str):
+        """ジャーナルファイルからエントリを順に読み出す（末尾の書きかけ行は切り詰める）"""
+        if not os.path.exists(path):
+            return
+
+        with open(path, 'rb') as f:
+            content = f.read()
+
+        offset = 0
+        while offset < len(content):
+            end = content.find(b"\n", offset)
+            if end == -1:
+                # 改行で終わっていない末尾行はクラッシュによる書きかけ
+                print(f"ジャーナル末尾の不完全な行を破棄します: {path}")
+                self._truncate(path, offset)
+                return
+            line = content[offset:end]
+            offset = end + 1
+            if not line.strip():
+                continue
+            try:
+                yield json.loads(line.decode('utf-8'))
+            except (json.JSONDecodeError, UnicodeDecodeError) as e:
+                if offset >= len(content):
+                    print(f"ジャーナル末尾の破損した行を破棄します: {path}")
+                    self._truncate(path, end - len(line))
+                    return
+                print(f"ジャーナルの破損した行をスキップします: {e}")
+
+    def _truncate(self, path: str, size: int):
+        """ジャーナルファイルを指定サイズに切り詰める"""
+        try:
+            with open(path, 'r+b') as f:
+                f.truncate(size)
+        except OSError as e:
+            print(f"ジャーナル切り詰めエラー: {e}")
+
+    @staticmethod
+    def apply_entry(data: dict, entry: dict):
+        """単一エントリをデータに適用"""
+        records = data.setdefault("records", {})
+        op = entry.get("op")
+        date = entry.get("date")
+        if op == "save":
+            records[date] = entry["record"]
+        elif op == "delete":
+            records.pop(date, None)
+
+    def rotate(self) -> bool:
+        """圧縮のため現行ジャーナルを退避（以降の追記は新しいファイルへ）"""
+        if os.path.exists(self.rotated_path) or not os.path.exists(self.path):
+            return False
+        os.replace(self.path, self.rotated_path)
+        self.entry_count = 0
+        return True
+
+    def discard_rotated(self):
+        """スナップショットに反映済みの旧ジャーナルを削除"""
+        if os.path.exists(self.rotated_path):
+            os.remove(self.rotated_path)
+
+    def clear(self):
+        """全てのジャーナルを削除"""
+        self.discard_rotated()
+        if os.path.exists(self.path):
+            os.remove(self.path)
+        self.entry_count = 0
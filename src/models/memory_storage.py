@@ -0,0 +1,256 @@
+"""メモリ上のストレージ（テスト・ベンチマーク用）"""
+import threading
+from bisect import bisect_left, bisect_right
+from contextlib import contextmanager
+from datetime import datetime
+from typing import Dict, Iterator, List, Mapping, Optional, Set
+from .record import Record
+from .record_map import LazyRecordMap
+from .field_index import RecordFieldIndex
+from .search_index import RecordSearchIndex, SearchResult
+from .events import ChangeEvent, ChangeEventBus, RECORD_CREATED, RECORD_UPDATED, RECORD_DELETED
+from .storage import RecordConflictError
+from .snapshot import RecordSnapshot
+
+
+class MemoryStorage:
+    """
+    記録をメモリ上だけで管理（Storageと同じインターフェース）
+
+    ファイルには一切書き込まないため、コントローラーやエクスポートを
+    ファイル入出力の影響なしにテスト・計測できる。記録は保存形式の辞書で保持する。
+    """
+
+    def __init__(self, records: Optional[Mapping[str, dict]] = None):
+        """
+        Args:
+            records: 初期データ {日付: 記録の辞書}（records.json の "records" と同じ形式）
+        """
+        self._records: Dict[str, dict] = dict(records or {})
+        self._lock = threading.RLock()
+        # トランザクション中の作業用の記録辞書（確定時に置き換える）
+        self._working: Optional[Dict[str, dict]] = None
+        # スナップショットと共有中の記録辞書（次の変更の前に複製する）
+        self._shared: Optional[Dict[str, dict]] = None
+        self._last_updated = datetime.now().isoformat()
+        self._generation = 0
+
+        self.field_index = RecordFieldIndex(None)
+        self.field_index.rebuild(self._records)
+        self.search_index = RecordSearchIndex(None)
+        self.events = ChangeEventBus()
+        # このインスタンスが書き込んだ世代番号（他のプロセスの書き込みと区別するため）
+        self.written_generations: Set[int] = set()
+
+        self._sorted_dates: List[str] = []
+        self._sorted_dates_source: Optional[dict] = None
+        self._sorted_dates_version = -1
+        self._change_count = 0
+
+    def _current(self) -> Dict[str, dict]:
+        """読み込み・変更の対象の記録辞書（トランザクション中は作業用）"""
+        return self._working if self._working is not None else self._records
+
+    def _writable(self) -> Dict[str, dict]:
+        """変更してよい記録辞書を取得（スナップショットと共有していれば複製して置き換える）"""
+        records = self._current()
+        if records is not self._shared:
+            return records
+        copied = dict(records)
+        if self._working is not None:
+            self._working = copied
+        else:
+            self._records = copied
+        self._shared = None
+        return copied
+
+    def snapshot(self) -> RecordSnapshot:
+        """現時点の記録の読み取り専用ビューを取得（記録辞書は複製せずに共有する）"""
+        with self._lock:
+            self._shared = self._current()
+            return RecordSnapshot(self._shared, {"last_updated": self._last_updated, "generation": self._generation})
+
+    @contextmanager
+    def transaction(self):
+        """
+        複数の変更をまとめるトランザクション
+
+        例外が発生した場合は全ての変更を破棄する。入れ子にした場合は最も外側でのみ確定する。
+        """
+        with self._lock, self.events.hold():
+            if self._working is not None:
+                yield self
+                return
+
+            self._working = dict(self._records)
+            changes_before = self._change_count
+            try:
+                yield self
+            except BaseException:
+                # 索引には変更を反映済みなので作り直す（全文検索索引は次回の検索時に同期される）
+                self._working = None
+                self.field_index.rebuild(self._records)
+                self._change_count += 1
+                raise
+            self._records, self._working = self._working, None
+            if self._change_count != changes_before:
+                self._touch()
+
+    def _touch(self):
+        """変更を確定したことを記録"""
+        self._change_count += 1
+        if self._working is None:
+            self._last_updated = datetime.now().isoformat()
+            self._generation += 1
+            self.written_generations.add(self._generation)
+
+    def get_record(self, date: str) -> Optional[Record]:
+        """指定日の記録を取得"""
+        with self._lock:
+            record_data = self._current().get(date)
+        return Record.from_dict(record_data) if record_data else None
+
+    def get_all_records(self) -> Mapping[str, Record]:
+        """全ての記録を取得（Recordはアクセス時に生成）"""
+        with self._lock:
+            return LazyRecordMap(dict(self._current()))
+
+    def _dates_between(self, start_date: Optional[str], end_date: Optional[str]) -> List[str]:
+        """ソート済み日付リストを二分探索して範囲内（両端を含む）の日付を取得"""
+        records = self._current()
+        if self._sorted_dates_source is not records or self._sorted_dates_version != self._change_count:
+            self._sorted_dates = sorted(records)
+            self._sorted_dates_source = records
+            self._sorted_dates_version = self._change_count
+
+        dates = self._sorted_dates
+        lo = bisect_left(dates, start_date) if start_date else 0
+        hi = bisect_right(dates, end_date) if end_date else len(dates)
+        return dates[lo:hi]
+
+    def iter_records(self, start: Optional[str] = None, end: Optional[str] = None,
+                     reverse: bool = False) -> Iterator[Record]:
+        """記録を日付順に1件ずつ取得（start/endは両端を含む）"""
+        with self._lock:
+            records = self._current()
+            dates = self._dates_between(start, end)
+        if reverse:
+            dates.reverse()
+        for date in dates:
+            record_data = records.get(date)
+            if record_data is not None:
+                yield Record.from_dict(record_data)
+
+    def get_dates_in_range(self, start_date: Optional[str] = None, end_date: Optional[str] = None) -> List[str]:
+        """日付範囲（両端を含む）にある記録の日付を取得（昇順）"""
+        with self._lock:
+            return self._dates_between(start_date, end_date)
+
+    def get_records_by_dates(self, dates: List[str]) -> Mapping[str, Record]:
+        """指定した日付の記録をまとめて取得（存在しない日付は含まれない）"""
+        with self._lock:
+            records = self._current()
+            return LazyRecordMap({date: records[date] for date in dates if date in records})
+
+    def get_records_by_month(self, year: int, month: int) -> Mapping[str, Record]:
+        """指定月の記録を取得（Recordはアクセス時に生成）"""
+        month_prefix = f"{year:04d}-{month:02d}"
+        return self.get_records_in_range(f"{month_prefix}-00", f"{month_prefix}-99")
+
+    def get_records_in_range(self, start_date: str, end_date: str) -> Mapping[str, Record]:
+        """日付範囲（両端を含む）の記録を取得（Recordはアクセス時に生成）"""
+        with self._lock:
+            return self.get_records_by_dates(self._dates_between(start_date, end_date))
+
+    def get_records_by_tag(self, tag: str) -> Mapping[str, Record]:
+        """指定タグを持つ記録を取得（索引を使用、Recordはアクセス時に生成）"""
+        return self.get_records_by_dates(self.get_dates_by_tag(tag))
+
+    def get_records_by_mood(self, mood: str) -> Mapping[str, Record]:
+        """指定した気分の記録を取得（索引を使用、Recordはアクセス時に生成）"""
+        return self.get_records_by_dates(self.get_dates_by_mood(mood))
+
+    def get_dates_by_tag(self, tag: str) -> List[str]:
+        """指定タグを持つ記録の日付を取得（昇順）"""
+        with self._lock:
+            return self.field_index.get_dates_by_tag(tag)
+
+    def get_dates_by_mood(self, mood: str) -> List[str]:
+        """指定した気分の記録の日付を取得（昇順）"""
+        with self._lock:
+            return self.field_index.get_dates_by_mood(mood)
+
+    def get_tag_counts(self) -> Dict[str, int]:
+        """タグごとの記録数を取得"""
+        with self._lock:
+            return self.field_index.get_tag_counts()
+
+    def search_records(self, query: str, limit: Optional[int] = None) -> List[SearchResult]:
+        """本文・タグ・画像キャプションを全文検索（スコアの高い順）"""
+        with self._lock:
+            records = self._current()
+            self.search_index.sync(
+                {date: record_data.get("updated_at") for date, record_data in records.items()},
+                lambda dates: {date: records[date] for date in dates if date in records}
+            )
+            return self.search_index.search(query, limit)
+
+    def get_dates_with_records(self) -> List[str]:
+        """記録が存在する日付のリストを取得"""
+        with self._lock:
+            return list(self._current())
+
+    def save_record(self, record: Record, expected_updated_at: Optional[str] = None):
+        """
+        記録を保存（新規作成または更新）
+
+        Args:
+            record: 保存する記録
+            expected_updated_at: 指定した場合、保存済みの記録の更新日時がこれと異なれば
+                RecordConflictError を送出する
+        """
+        with self._lock:
+            records = self._writable()
+            old_data = records.get(record.date)
+            if expected_updated_at is not None and (old_data or {}).get("updated_at") != expected_updated_at:
+                raise RecordConflictError(record.date)
+            record_data = record.to_dict()
+            records[record.date] = record_data
+            self.field_index.apply(record.date, old_data, record_data)
+            self.search_index.apply(record.date, record_data)
+            self._touch()
+            self.events.publish(ChangeEvent(RECORD_CREATED if old_data is None else RECORD_UPDATED, record.date))
+
+    def delete_record(self, date: str) -> bool:
+        """記録を削除"""
+        with self._lock:
+            records = self._current()
+            if date not in records:
+                return False
+            records = self._writable()
+            old_data = records.pop(date)
+            self.field_index.apply(date, old_data, None)
+            self.search_index.apply(date, None)
+            self._touch()
+            self.events.publish(ChangeEvent(RECORD_DELETED, date))
+            return True
+
+    def record_exists(self, date: str) -> bool:
+        """指定日に記録が存在するか確認"""
+        with self._lock:
+            return date in self._current()
+
+    def flush(self, timeout: Optional[float] = None) -> bool:
+        """書き込むものはないので常にTrue"""
+        return True
+
+    def get_metadata(self) -> dict:
+        """メタデータを取得"""
+        with self._lock:
+            records = self._current()
+            return {
+                "total_records": len(records),
+                "first_record_date": min(records) if records else None,
+                "last_updated": self._last_updated,
+                "generation": self._generation
+            }
@@ -0,0 +1,138 @@
+"""記録の検索条件と実行計画"""
+import calendar
+from dataclasses import dataclass, field
+from typing import Iterator, List, Optional
+from .record import Record
+from .record_map import LazyRecordMap
+
+
+@dataclass
+class RecordQuery:
+    """記録の検索条件（指定した条件は全てAND）"""
+    start_date: Optional[str] = None  # YYYY-MM-DD（含む）
+    end_date: Optional[str] = None  # YYYY-MM-DD（含む）
+    tags: List[str] = field(default_factory=list)
+    match_all_tags: bool = False  # Trueなら全てのタグを持つ記録、Falseならいずれか
+    mood: Optional[str] = None  # good, neutral, bad
+    has_images: Optional[bool] = None  # True: 画像あり, False: 画像なし, None: 問わない
+    reverse: bool = False  # Trueなら新しい順
+
+    @staticmethod
+    def for_month(year: int, month: int, **conditions) -> 'RecordQuery':
+        """指定月の記録を対象とする検索条件を作成"""
+        last_day = calendar.monthrange(year, month)[1]
+        return RecordQuery(
+            start_date=f"{year:04d}-{month:02d}-01",
+            end_date=f"{year:04d}-{month:02d}-{last_day:02d}",
+            **conditions
+        )
+
+    def matches(self, record: Record) -> bool:
+        """記録が条件に一致するか確認"""
+        if self.start_date and record.date < self.start_date:
+            return False
+        if self.end_date and record.date > self.end_date:
+            return False
+        if self.tags:
+            if self.match_all_tags:
+                if not all(tag in record.tags for tag in self.tags):
+                    return False
+            elif not any(tag in record.tags for tag in self.tags):
+                return False
+        if self.mood is not None and record.mood != self.mood:
+            return False
+        if self.has_images is not None and bool(record.images) != self.has_images:
+            return False
+        return True
+
+    def describe(self) -> str:
+        """検索条件を人が読める文字列に変換"""
+        parts = []
+        if self.start_date or self.end_date:
+            parts.append(f"期間: {self.start_date or '最初'} 〜 {self.end_date or '最後'}")
+        if self.tags:
+            joiner = " かつ " if self.match_all_tags else " または "
+            parts.append(f"タグ: {joiner.join(self.tags)}")
+        if self.mood is not None:
+            parts.append(f"気分: {self.mood}")
+        if self.has_images is not None:
+            parts.append("画像あり" if self.has_images else "画像なし")
+        return "、".join(parts) if parts else "全ての記録"
+
+
+@dataclass
+class QueryPlan:
+    """検索の実行計画"""
+    access_path: str  # "tag", "mood", "range", "scan"
+    candidate_dates: Optional[List[str]] = None  # 索引から絞り込んだ候補日（range/scanではNone）
+    estimated_rows: int = 0
+
+
+class QueryPlanner:
+    """
+    検索条件から最も絞り込みの効くアクセス方法を選んで実行
+
+    タグ・気分の索引から候補日を求め、日付範囲内の記録数と比べて少ない方を使う。
+    残りの条件は取得した記録に対して判定する。
+    """
+
+    FETCH_CHUNK_SIZE = 200
+
+    def __init__(self, storage):
+        self.storage = storage
+
+    def plan(self, query: RecordQuery) -> QueryPlan:
+        """実行計画を作成"""
+        candidates = None
+        access_path = None
+
+        if query.tags:
+            tag_sets = [set(self.storage.get_dates_by_tag(tag)) for tag in query.tags]
+            if query.match_all_tags:
+                candidates = set.intersection(*tag_sets)
+            else:
+                candidates = set().union(*tag_sets)
+            access_path = "tag"
+
+        if query.mood is not None:
+            mood_dates = set(self.storage.get_dates_by_mood(query.mood))
+            if candidates is None or len(mood_dates) < len(candidates):
+                access_path = "mood"
+            candidates = mood_dates if candidates is None else candidates & mood_dates
+
+        if query.start_date or query.end_date:
+            range_count = len(self.storage.get_dates_in_range(query.start_date, query.end_date))
+            if candidates is None or range_count < len(candidates):
+                return QueryPlan("range", None, range_count)
+
+        if candidates is None:
+            return QueryPlan("scan", None, self.storage.get_metadata().get("total_records", 0))
+
+        dates = sorted(
+            date for date in candidates
+            if (not query.start_date or date >= query.start_date)
+            and (not query.end_date or date <= query.end_date)
+        )
+        return QueryPlan(access_path, dates, len(dates))
+
+    def execute(self, query: RecordQuery, plan: Optional[QueryPlan] = None) -> Iterator[Record]:
+        """検索を実行し、一致する記録を日付順に1件ずつ返す"""
+        if plan is None:
+            plan = self.plan(query)
+
+        if plan.candidate_dates is None:
+            for record in self.storage.iter_records(query.start_date, query.end_date, query.reverse):
+                if query.matches(record):
+                    yield record
+            return
+
+        dates = list(reversed(plan.candidate_dates)) if query.reverse else plan.candidate_dates
+        for i in range(0, len(dates), self.FETCH_CHUNK_SIZE):
+            chunk = dates[i:i + self.FETCH_CHUNK_SIZE]
+            records = self.storage.get_records_by_dates(chunk)
+            if isinstance(records, LazyRecordMap):
+                records.build_all()
+            for date in chunk:
+                record = records.get(date)
+                if record is not None and query.matches(record):
+                    yield record
@@ -1,11 +1,29 @@
 """データモデル定義"""
+import sys
 from dataclasses import dataclass, field
-from typing import List, Optional
+from typing import Iterable, List, Optional
 from datetime import datetime
 import uuid
 
+# 記録の気分として使える値
+MOODS = ("good", "neutral", "bad")
 
-@dataclass
+# 記録は数万件をメモリ上に持つことがあるため __dict__ を持たせない（Python 3.10未満では通常のクラス）
+_SLOTS = {"slots": True} if sys.version_info >= (3, 10) else {}
+_intern = sys.intern
+
+
+def _intern_tags(tags: Iterable[str]) -> List[str]:
+    """タグを共有の文字列にしたリスト（同じタグは全ての記録で同じオブジェクトになる）"""
+    return [_intern(tag) for tag in tags]
+
+
+def _intern_mood(mood: Optional[str]) -> Optional[str]:
+    """気分を共有の文字列にする"""
+    return _intern(mood) if mood is not None else None
+
+
+@dataclass(**_SLOTS)
 class ImageAttachment:
     """画像添付ファイルのデータモデル"""
     id: str
@@ -55,7 +73,7 @@ class ImageAttachment:
         )
 
 
-@dataclass
+@dataclass(**_SLOTS)
 class Record:
     """記録のデータモデル"""
     id: str
@@ -78,8 +96,8 @@ class Record:
             updated_at=now,
             text=text,
             images=[],
-            tags=tags or [],
-            mood=mood
+            tags=_intern_tags(tags or []),
+            mood=_intern_mood(mood)
         )
 
     def update(self, text: Optional[str] = None, tags: Optional[List[str]] = None, mood: Optional[str] = None):
@@ -87,9 +105,9 @@ class Record:
         if text is not None:
             self.text = text
         if tags is not None:
-            self.tags = tags
+            self.tags = _intern_tags(tags)
         if mood is not None:
-            self.mood = mood
+            self.mood = _intern_mood(mood)
         self.updated_at = datetime.now().isoformat()
 
     def add_image(self, image: ImageAttachment):
@@ -115,7 +133,7 @@ class Record:
             'updated_at': self.updated_at,
             'text': self.text,
             'images': [img.to_dict() for img in self.images],
-            'tags': self.tags,
+            'tags': list(self.tags),
             'mood': self.mood
         }
 
@@ -130,6 +148,37 @@ class Record:
             updated_at=data['updated_at'],
             text=data['text'],
             images=images,
-            tags=data.get('tags', []),
-            mood=data.get('mood')
+            tags=[_intern(tag) for tag in data.get('tags', ())],
+            mood=_intern_mood(data.get('mood'))
         )
+
+    @staticmethod
+    def from_dicts(items: Iterable[dict]) -> List['Record']:
+        """
+        辞書からまとめて復元（from_dict と同じ結果で、多数の記録を速く復元する）
+
+        引数をキーワードではなく位置で渡し、画像のない記録が多いことを前提に空の画像リストの処理を省く。
+        """
+        intern = _intern
+        image_type = ImageAttachment
+        record_type = Record
+        records = []
+        append = records.append
+        for data in items:
+            images = data.get('images')
+            if images:
+                images = [
+                    image_type(img['id'], img['filename'], img['path'], img['thumbnail_path'],
+                               img['uploaded_at'], img['size_bytes'], img.get('caption'))
+                    for img in images
+                ]
+            else:
+                images = []
+            tags = data.get('tags')
+            mood = data.get('mood')
+            append(record_type(
+                data['id'], data['date'], data['created_at'], data['updated_at'], data['text'], images,
+                [intern(tag) for tag in tags] if tags else [],
+                intern(mood) if mood is not None else None
+            ))
+        return records
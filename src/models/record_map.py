@@ -0,0 +1,47 @@
+"""記録の遅延生成マッピング"""
+from typing import Dict, Iterator, Mapping
+from .record import Record
+
+
+class LazyRecordMap(Mapping):
+    """
+    日付 → Record の読み取り専用マッピング
+
+    保存形式の辞書をそのまま保持し、Recordは初めてアクセスされた時に生成してキャッシュする。
+    dictと同じように items()/values()/get()/in/len() で扱える。
+    """
+
+    __slots__ = ("_raw", "_built")
+
+    def __init__(self, raw_records: Dict[str, dict]):
+        self._raw = raw_records
+        self._built: Dict[str, Record] = {}
+
+    def __getitem__(self, date: str) -> Record:
+        record = self._built.get(date)
+        if record is None:
+            record = Record.from_dict(self._raw[date])
+            self._built[date] = record
+        return record
+
+    def __contains__(self, date) -> bool:
+        return date in self._raw
+
+    def __iter__(self) -> Iterator[str]:
+        return iter(self._raw)
+
+    def __len__(self) -> int:
+        return len(self._raw)
+
+    def __repr__(self) -> str:
+        return f"LazyRecordMap({len(self._raw)} records)"
+
+    def build_all(self):
+        """まだ生成していないRecordをまとめて生成（1件ずつより速い）"""
+        dates = [date for date in self._raw if date not in self._built]
+        if dates:
+            self._built.update(zip(dates, Record.from_dicts(self._raw[date] for date in dates)))
+
+    def raw(self, date: str) -> dict:
+        """保存形式の辞書を取得（Recordを生成しない。変更しないこと）"""
+        return self._raw[date]
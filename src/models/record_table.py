@@ -0,0 +1,346 @@
+"""集計用の列指向の記録テーブル"""
+import threading
+from array import array
+from datetime import date as Date
+from typing import Dict, Iterable, List, Optional, Tuple
+from .record import MOODS
+
+try:
+    import numpy as np
+except ImportError:
+    np = None
+
+# 気分のコード（MOODS の位置、気分なしは -1）
+NO_MOOD = -1
+MOOD_CODES = {mood: code for code, mood in enumerate(MOODS)}
+# 絞り込みで気分なしの記録を指定する値
+NO_MOOD_FILTER = "none"
+# 1970-01-01 の通日（NumPy の datetime64 との変換用）
+_EPOCH_ORDINAL = Date(1970, 1, 1).toordinal()
+
+
+class RecordTable:
+    """
+    記録を集計用の列（array）に展開したテーブル
+
+    1行が1日の記録で、日付の通日(int32)・気分のコード(int8)・画像の数・本文の文字数と、
+    タグ辞書のIDを列として持つ。各行のタグは tag_rows / tag_ids の連続した区間に入る。
+    更新は行の上書き（タグは区間を付け直す）、削除は行を無効にするだけで行い、
+    無効な行・タグが有効なものより多くなったら詰め直す。
+    集計は NumPy があれば使い、なければ Python だけで行う（結果は同じ）。
+    """
+
+    def __init__(self, use_numpy: Optional[bool] = None):
+        """
+        Args:
+            use_numpy: NumPy で集計するか（Noneならインストールされていれば使う）
+        """
+        if use_numpy and np is None:
+            raise ValueError("NumPy がインストールされていません")
+        self.use_numpy = np is not None if use_numpy is None else use_numpy
+        self._lock = threading.RLock()
+        self._clear()
+        # 作成した時点のストレージの世代番号（他のプロセスの書き込みの検出用）
+        self.generation: Optional[int] = None
+
+    def _clear(self):
+        """全ての列を空にする"""
+        self.ordinals = array('i')
+        self.moods = array('b')
+        self.image_counts = array('i')
+        self.text_lengths = array('i')
+        self.live = array('b')
+        self.tag_offsets = array('i')
+        self.tag_lengths = array('i')
+        # タグの区間（無効になった区間は tag_rows を -1 にする）
+        self.tag_rows = array('i')
+        self.tag_ids = array('i')
+        self.tag_names: List[str] = []
+        self._tag_lookup: Dict[str, int] = {}
+        self._rows: Dict[str, int] = {}
+        self._dead_tags = 0
+
+    def __len__(self) -> int:
+        return len(self._rows)
+
+    @classmethod
+    def from_records(cls, raw_records: Iterable[Tuple[str, dict]], use_numpy: Optional[bool] = None,
+                     generation: Optional[int] = None) -> 'RecordTable':
+        """保存形式の記録 (日付, 辞書) を1回走査してテーブルを作成"""
+        table = cls(use_numpy)
+        table.rebuild(raw_records, generation)
+        return table
+
+    def rebuild(self, raw_records: Iterable[Tuple[str, dict]], generation: Optional[int] = None):
+        """保存形式の記録 (日付, 辞書) から全ての行を作り直す"""
+        with self._lock:
+            self._clear()
+            for date, record_data in raw_records:
+                self._append(date, record_data)
+            self.generation = generation
+
+    def _tag_id(self, tag: str) -> int:
+        """タグ辞書のIDを取得（なければ追加）"""
+        tag_id = self._tag_lookup.get(tag)
+        if tag_id is None:
+            tag_id = len(self.tag_names)
+            self.tag_names.append(tag)
+            self._tag_lookup[tag] = tag_id
+        return tag_id
+
+    def _append_tags(self, row: int, tags: Iterable[str]):
+        """行のタグの区間を末尾に追加"""
+        start = len(self.tag_ids)
+        for tag in tags:
+            self.tag_rows.append(row)
+            self.tag_ids.append(self._tag_id(tag))
+        self.tag_offsets[row] = start
+        self.tag_lengths[row] = len(self.tag_ids) - start
+
+    def _drop_tags(self, row: int):
+        """行のタグの区間を無効にする"""
+        start = self.tag_offsets[row]
+        count = self.tag_lengths[row]
+        for position in range(start, start + count):
+            self.tag_rows[position] = -1
+        self._dead_tags += count
+        self.tag_lengths[row] = 0
+
+    def _append(self, date: str, record_data: dict):
+        """行を末尾に追加"""
+        row = len(self.ordinals)
+        self._rows[date] = row
+        self.ordinals.append(Date.fromisoformat(date).toordinal())
+        self.moods.append(MOOD_CODES.get(record_data.get("mood"), NO_MOOD))
+        self.image_counts.append(len(record_data.get("images", ())))
+        self.text_lengths.append(len(record_data.get("text", "")))
+        self.live.append(1)
+        self.tag_offsets.append(0)
+        self.tag_lengths.append(0)
+        self._append_tags(row, record_data.get("tags", ()))
+
+    def apply(self, date: str, record_data: Optional[dict]):
+        """
+        1件の記録の変更を反映
+
+        Args:
+            date: 記録の日付
+            record_data: 保存形式の辞書（Noneなら削除）
+        """
+        with self._lock:
+            row = self._rows.get(date)
+            if record_data is None:
+                if row is not None:
+                    del self._rows[date]
+                    self.live[row] = 0
+                    self._drop_tags(row)
+            elif row is None:
+                self._append(date, record_data)
+            else:
+                self.moods[row] = MOOD_CODES.get(record_data.get("mood"), NO_MOOD)
+                self.image_counts[row] = len(record_data.get("images", ()))
+                self.text_lengths[row] = len(record_data.get("text", ""))
+                self._drop_tags(row)
+                self._append_tags(row, record_data.get("tags", ()))
+            self._compact_if_sparse()
+
+    def _compact_if_sparse(self):
+        """無効な行・タグが有効なものより多ければ詰め直す"""
+        dead_rows = len(self.ordinals) - len(self._rows)
+        if dead_rows <= len(self._rows) and self._dead_tags <= len(self.tag_ids) - self._dead_tags:
+            return
+        ordinals, moods, image_counts, text_lengths = self.ordinals, self.moods, self.image_counts, self.text_lengths
+        tag_offsets, tag_lengths, tag_ids = self.tag_offsets, self.tag_lengths, self.tag_ids
+        rows = sorted(self._rows.items(), key=lambda item: item[1])
+        tag_names = self.tag_names
+        self._clear()
+        for date, row in rows:
+            new_row = len(self.ordinals)
+            self._rows[date] = new_row
+            self.ordinals.append(ordinals[row])
+            self.moods.append(moods[row])
+            self.image_counts.append(image_counts[row])
+            self.text_lengths.append(text_lengths[row])
+            self.live.append(1)
+            self.tag_offsets.append(0)
+            self.tag_lengths.append(0)
+            start = tag_offsets[row]
+            self._append_tags(new_row, (tag_names[tag_id] for tag_id in tag_ids[start:start + tag_lengths[row]]))
+
+    # --- 集計 ---
+
+    def _selected_rows(self, start_date: Optional[str], end_date: Optional[str], mood: Optional[str],
+                       tag: Optional[str], has_images: Optional[bool]):
+        """
+        条件に一致する有効な行（NumPy なら行番号の配列、なければ行番号のリスト）
+
+        Args:
+            start_date / end_date: 日付範囲（両端を含む）
+            mood: 気分（"none" なら気分なし。どちらでもない値は ValueError）
+            tag: タグ
+            has_images: 画像の有無
+        """
+        start = Date.fromisoformat(start_date).toordinal() if start_date else None
+        end = Date.fromisoformat(end_date).toordinal() if end_date else None
+        if mood is None:
+            mood_code = None
+        elif mood == NO_MOOD_FILTER:
+            mood_code = NO_MOOD
+        elif mood in MOOD_CODES:
+            mood_code = MOOD_CODES[mood]
+        else:
+            raise ValueError(f"不明な気分です: {mood}")
+        tag_id = None if tag is None else self._tag_lookup.get(tag, -1)
+
+        if self.use_numpy:
+            mask = np.frombuffer(self.live, dtype=np.int8) == 1
+            ordinals = np.frombuffer(self.ordinals, dtype=np.int32)
+            if start is not None:
+                mask &= ordinals >= start
+            if end is not None:
+                mask &= ordinals <= end
+            if mood_code is not None:
+                mask &= np.frombuffer(self.moods, dtype=np.int8) == mood_code
+            if has_images is not None:
+                mask &= (np.frombuffer(self.image_counts, dtype=np.int32) > 0) == has_images
+            if tag_id is not None:
+                tag_rows = np.frombuffer(self.tag_rows, dtype=np.int32)
+                tagged = np.zeros(len(mask), dtype=bool)
+                tagged[tag_rows[(np.frombuffer(self.tag_ids, dtype=np.int32) == tag_id) & (tag_rows >= 0)]] = True
+                mask &= tagged
+            return np.flatnonzero(mask)
+
+        if tag_id is not None:
+            candidates = sorted(
+                self.tag_rows[position] for position in range(len(self.tag_ids))
+                if self.tag_ids[position] == tag_id and self.tag_rows[position] >= 0
+            )
+        else:
+            candidates = range(len(self.ordinals))
+        ordinals, moods, image_counts, live = self.ordinals, self.moods, self.image_counts, self.live
+        return [
+            row for row in candidates
+            if live[row]
+            and (start is None or ordinals[row] >= start)
+            and (end is None or ordinals[row] <= end)
+            and (mood_code is None or moods[row] == mood_code)
+            and (has_images is None or (image_counts[row] > 0) == has_images)
+        ]
+
+    def count(self, start_date: Optional[str] = None, end_date: Optional[str] = None, mood: Optional[str] = None,
+              tag: Optional[str] = None, has_images: Optional[bool] = None) -> int:
+        """条件に一致する記録の数（条件は全ての集計で共通）"""
+        with self._lock:
+            return len(self._selected_rows(start_date, end_date, mood, tag, has_images))
+
+    def count_by_month(self, start_date: Optional[str] = None, end_date: Optional[str] = None,
+                       mood: Optional[str] = None, tag: Optional[str] = None,
+                       has_images: Optional[bool] = None) -> Dict[str, int]:
+        """月ごとの記録の数 {"YYYY-MM": 件数}（記録のない月は含まない、昇順）"""
+        with self._lock:
+            rows = self._selected_rows(start_date, end_date, mood, tag, has_images)
+            return self._group_by_month(rows)
+
+    def _group_by_month(self, rows) -> Dict[str, int]:
+        """行を月ごとに数える"""
+        if self.use_numpy:
+            ordinals = np.frombuffer(self.ordinals, dtype=np.int32)[rows]
+            months = (ordinals - _EPOCH_ORDINAL).astype('datetime64[D]').astype('datetime64[M]')
+            keys, counts = np.unique(months, return_counts=True)
+            return {str(key): int(count) for key, count in zip(keys, counts)}
+
+        # 同じ日の行をまとめてから月に振り分ける
+        by_ordinal: Dict[int, int] = {}
+        ordinals = self.ordinals
+        for row in rows:
+            ordinal = ordinals[row]
+            by_ordinal[ordinal] = by_ordinal.get(ordinal, 0) + 1
+        counts: Dict[Tuple[int, int], int] = {}
+        fromordinal = Date.fromordinal
+        for ordinal, count in by_ordinal.items():
+            day = fromordinal(ordinal)
+            month = (day.year, day.month)
+            counts[month] = counts.get(month, 0) + count
+        return {f"{year:04d}-{month:02d}": count for (year, month), count in sorted(counts.items())}
+
+    def count_by_weekday(self, start_date: Optional[str] = None, end_date: Optional[str] = None,
+                         mood: Optional[str] = None, tag: Optional[str] = None,
+                         has_images: Optional[bool] = None) -> List[int]:
+        """曜日ごとの記録の数（月曜から日曜の順）"""
+        with self._lock:
+            rows = self._selected_rows(start_date, end_date, mood, tag, has_images)
+            if self.use_numpy:
+                weekdays = (np.frombuffer(self.ordinals, dtype=np.int32)[rows] - 1) % 7
+                return [int(count) for count in np.bincount(weekdays, minlength=7)]
+            counts = [0] * 7
+            ordinals = self.ordinals
+            for row in rows:
+                counts[(ordinals[row] - 1) % 7] += 1
+            return counts
+
+    def mood_counts(self, start_date: Optional[str] = None, end_date: Optional[str] = None,
+                    tag: Optional[str] = None, has_images: Optional[bool] = None) -> Dict[Optional[str], int]:
+        """気分ごとの記録の数（気分なしはキーNone）"""
+        with self._lock:
+            rows = self._selected_rows(start_date, end_date, None, tag, has_images)
+            if self.use_numpy:
+                codes = np.frombuffer(self.moods, dtype=np.int8)[rows].astype(np.int64) + 1
+                counts = [int(count) for count in np.bincount(codes, minlength=len(MOODS) + 1)]
+            else:
+                counts = [0] * (len(MOODS) + 1)
+                moods = self.moods
+                for row in rows:
+                    counts[moods[row] + 1] += 1
+            result: Dict[Optional[str], int] = {mood: counts[code + 1] for code, mood in enumerate(MOODS)}
+            result[None] = counts[0]
+            return result
+
+    def mood_by_month(self, start_date: Optional[str] = None, end_date: Optional[str] = None,
+                      tag: Optional[str] = None) -> Dict[str, Dict[Optional[str], int]]:
+        """月ごとの気分の内訳 {"YYYY-MM": {気分: 件数}}"""
+        with self._lock:
+            result: Dict[str, Dict[Optional[str], int]] = {}
+            for mood in MOODS + (NO_MOOD_FILTER,):
+                rows = self._selected_rows(start_date, end_date, mood, tag, None)
+                for month, count in self._group_by_month(rows).items():
+                    result.setdefault(month, {})[None if mood == NO_MOOD_FILTER else mood] = count
+            return dict(sorted(result.items()))
+
+    def tag_counts(self, start_date: Optional[str] = None, end_date: Optional[str] = None,
+                   mood: Optional[str] = None, has_images: Optional[bool] = None) -> Dict[str, int]:
+        """タグごとの記録の数（多い順）"""
+        with self._lock:
+            rows = self._selected_rows(start_date, end_date, mood, None, has_images)
+            if self.use_numpy:
+                selected = np.zeros(len(self.ordinals), dtype=bool)
+                selected[rows] = True
+                tag_rows = np.frombuffer(self.tag_rows, dtype=np.int32)
+                valid = tag_rows >= 0
+                valid[valid] = selected[tag_rows[valid]]
+                ids = np.frombuffer(self.tag_ids, dtype=np.int32)[valid]
+                counts = np.bincount(ids, minlength=len(self.tag_names))
+                pairs = [(self.tag_names[tag_id], int(count)) for tag_id, count in enumerate(counts) if count]
+            else:
+                totals = [0] * len(self.tag_names)
+                tag_offsets, tag_lengths, tag_ids = self.tag_offsets, self.tag_lengths, self.tag_ids
+                for row in rows:
+                    start = tag_offsets[row]
+                    for position in range(start, start + tag_lengths[row]):
+                        totals[tag_ids[position]] += 1
+                pairs = [(self.tag_names[tag_id], count) for tag_id, count in enumerate(totals) if count]
+            return dict(sorted(pairs, key=lambda pair: (-pair[1], pair[0])))
+
+    def tag_usage_by_month(self, tag: str, start_date: Optional[str] = None,
+                           end_date: Optional[str] = None) -> Dict[str, int]:
+        """指定タグを使った記録の数の月ごとの推移"""
+        return self.count_by_month(start_date, end_date, tag=tag)
+
+    def text_length_total(self, start_date: Optional[str] = None, end_date: Optional[str] = None,
+                          mood: Optional[str] = None, tag: Optional[str] = None) -> int:
+        """本文の文字数の合計"""
+        with self._lock:
+            rows = self._selected_rows(start_date, end_date, mood, tag, None)
+            if self.use_numpy:
+                return int(np.frombuffer(self.text_lengths, dtype=np.int32)[rows].sum())
+            text_lengths = self.text_lengths
+            return sum(text_lengths[row] for row in rows)
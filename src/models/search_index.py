@@ -0,0 +1,365 @@
+"""記録の全文検索索引（日本語は文字バイグラム）"""
+import heapq
+import math
+import re
+from bisect import bisect_left, insort
+import unicodedata
+from dataclasses import dataclass, field
+from itertools import accumulate
+from typing import Callable, Dict, List, Mapping, Optional, Set
+from . import serialization
+
+
+_WHITESPACE = re.compile(r'\s+')
+_ASCII_WORD = re.compile(r'[a-z0-9_]+')
+# 英数字以外の単語文字（漢字・かな・カナなど）の連続
+_CJK_RUN = re.compile(r'(?:(?![a-z0-9_])\w)+')
+_QUERY_TERM = re.compile(r'"([^"]*)"|(\S+)')
+_OR_OPERATORS = ("OR", "|")
+
+
+def normalize_text(text: str) -> str:
+    """表示用に正規化（NFKCで全角英数字を半角にし、空白をまとめる）"""
+    return _WHITESPACE.sub(" ", unicodedata.normalize("NFKC", text)).strip()
+
+
+def tokenize(text: str) -> Set[str]:
+    """
+    正規化・小文字化済みの文字列をトークンに分割
+
+    英数字は単語単位、それ以外の文字の連続は1文字と2文字（バイグラム）に分割する。
+    """
+    tokens = set(_ASCII_WORD.findall(text))
+    for run in _CJK_RUN.findall(text):
+        tokens.update(run)
+        tokens.update(run[i:i + 2] for i in range(len(run) - 1))
+    return tokens
+
+
+def _query_tokens(term: str) -> List[str]:
+    """検索語の候補絞り込みに使うトークン（日本語は連続するバイグラム、1文字ならその文字）"""
+    tokens = _ASCII_WORD.findall(term)
+    for run in _CJK_RUN.findall(term):
+        if len(run) == 1:
+            tokens.append(run)
+        else:
+            tokens.extend(run[i:i + 2] for i in range(len(run) - 1))
+    return tokens
+
+
+def record_document(record_data: dict) -> str:
+    """検索対象の文字列（本文・タグ・画像キャプション）を作成"""
+    parts = [record_data.get("text") or ""]
+    parts.extend(record_data.get("tags", []))
+    parts.extend(image.get("caption") or "" for image in record_data.get("images", []))
+    return normalize_text(" ".join(part for part in parts if part))
+
+
+def parse_query(query: str) -> List[List[str]]:
+    """
+    検索文字列を解析
+
+    空白区切りの語はAND、語の間に OR（または |）を置くとOR、"..." で囲むと空白を含むフレーズになる。
+
+    Returns:
+        ORでまとめた語のグループのリスト（グループ同士はAND）。語は正規化・小文字化済み
+    """
+    groups: List[List[str]] = []
+    join_next = False
+    for match in _QUERY_TERM.finditer(query):
+        phrase, word = match.groups()
+        if phrase is None and word in _OR_OPERATORS:
+            join_next = bool(groups)
+            continue
+        term = normalize_text(phrase if phrase is not None else word).lower()
+        if not term:
+            continue
+        if join_next:
+            groups[-1].append(term)
+        else:
+            groups.append([term])
+        join_next = False
+    return groups
+
+
+@dataclass
+class SearchResult:
+    """全文検索の結果（抜粋は最初に参照した時に作成するため、上位だけを表示すれば残りの分は作らない）"""
+    date: str
+    score: float
+    _text: str = field(repr=False, compare=False)
+    _folded: str = field(repr=False, compare=False)
+    _terms: List[str] = field(repr=False, compare=False)
+    _snippet: Optional[str] = field(default=None, repr=False, compare=False)
+
+    @property
+    def snippet(self) -> str:
+        """一致した検索語の前後の抜粋"""
+        if self._snippet is None:
+            self._snippet = RecordSearchIndex._snippet(self._text, self._folded, self._terms)
+        return self._snippet
+
+
+class RecordSearchIndex:
+    """
+    本文・タグ・画像キャプションの全文検索索引
+
+    トークン → 日付 の転置索引で候補を絞り込み、正規化した本文の部分一致で確定する。
+    記録ごとに updated_at を保持し、保存済みの索引とストレージの差分だけを反映する。
+    ファイルには updated_at と転置索引だけを保存し（本文は記録と重複するため保存しない）、
+    照合用の本文は読み込み時にストレージの記録から作り直す。
+    変更は save() を呼ぶまでメモリ上だけに反映する（ストレージの flush() で保存される）。
+    index_file がNoneならファイルには保存せず、メモリ上だけで使う。
+    """
+
+    SNIPPET_RADIUS = 30
+    # BM25のパラメータ
+    BM25_K1 = 1.2
+    BM25_B = 0.75
+
+    def __init__(self, index_file: Optional[str]):
+        self.index_file = index_file
+        self._postings: Dict[str, Set[str]] = {}
+        # 英数字の単語の昇順リスト（前方一致の単語を二分探索で求める）
+        self._ascii_words: List[str] = []
+        self._versions: Dict[str, Optional[str]] = {}
+        self._texts: Dict[str, str] = {}  # 表示用（正規化済み）
+        self._folded: Dict[str, str] = {}  # 照合用（小文字化済み）
+        self._total_length = 0
+        self._loaded = False
+        self._unsaved_changes = 0
+
+    @property
+    def loaded(self) -> bool:
+        """保存済みの索引を読み込んだか"""
+        return self._loaded
+
+    @property
+    def unsaved_changes(self) -> int:
+        """ファイルに保存していない変更の件数"""
+        return self._unsaved_changes
+
+    def apply(self, date: str, record_data: Optional[dict]):
+        """記録の保存・削除（record_dataがNone）を索引に反映（未読み込みなら次回の同期で反映）"""
+        if not self._loaded:
+            return
+        self._remove(date)
+        if record_data is not None:
+            self._add(date, record_data.get("updated_at"), record_document(record_data))
+        self._unsaved_changes += 1
+
+    def _add(self, date: str, version: Optional[str], text: str):
+        """索引に記録を追加"""
+        folded = text.lower()
+        self._versions[date] = version
+        self._texts[date] = text
+        self._folded[date] = folded
+        self._total_length += len(folded)
+        for token in tokenize(folded):
+            dates = self._postings.get(token)
+            if dates is None:
+                dates = self._postings[token] = set()
+                if token.isascii():
+                    insort(self._ascii_words, token)
+            dates.add(date)
+
+    def _remove(self, date: str):
+        """索引から記録を削除"""
+        folded = self._folded.pop(date, None)
+        if folded is None:
+            return
+        del self._versions[date]
+        del self._texts[date]
+        self._total_length -= len(folded)
+        for token in tokenize(folded):
+            dates = self._postings.get(token)
+            if dates is not None:
+                dates.discard(date)
+                if not dates:
+                    del self._postings[token]
+                    if token.isascii():
+                        del self._ascii_words[bisect_left(self._ascii_words, token)]
+
+    def sync(self, versions: Mapping[str, Optional[str]],
+             fetch: Callable[[List[str]], Mapping[str, dict]]):
+        """
+        ストレージの記録と索引を一致させる（初回は保存済みの索引を読み込む）
+
+        Args:
+            versions: {日付: updated_at}（ストレージ上の全記録）
+            fetch: 日付のリストから記録の辞書を取得する関数
+        """
+        if not self._loaded:
+            self._load(versions, fetch)
+
+        removed = [date for date in self._versions if date not in versions]
+        changed = [date for date, version in versions.items() if self._versions.get(date, ()) != version]
+        if not removed and not changed:
+            return
+
+        for date in removed:
+            self._remove(date)
+        records = fetch(changed)
+        for date in changed:
+            self._remove(date)
+            record_data = records.get(date)
+            if record_data is not None:
+                self._add(date, record_data.get("updated_at"), record_document(record_data))
+        self._unsaved_changes += len(removed) + len(changed)
+
+    def _load(self, versions: Mapping[str, Optional[str]],
+              fetch: Callable[[List[str]], Mapping[str, dict]]):
+        """
+        保存済みの索引を読み込み（なければ空の索引から始める）
+
+        保存後に変更・削除された記録は転置索引から除き、残りの記録の本文はストレージから読み込む。
+        """
+        self._postings = {}
+        self._ascii_words = []
+        self._versions = {}
+        self._texts = {}
+        self._folded = {}
+        self._total_length = 0
+        dates, stored_versions, postings = [], {}, {}
+        if self.index_file is not None:
+            try:
+                stored = serialization.load_file(self.index_file)
+                dates = stored["dates"]
+                stored_versions = dict(zip(dates, stored["versions"]))
+                postings = stored["postings"]
+            except (OSError, ValueError, KeyError, TypeError):
+                dates, stored_versions, postings = [], {}, {}
+
+        current = [date for date, version in stored_versions.items() if versions.get(date, ()) == version]
+        records = fetch(current)
+        for date in current:
+            record_data = records.get(date)
+            if record_data is None:
+                continue
+            text = record_document(record_data)
+            folded = text.lower()
+            self._versions[date] = stored_versions[date]
+            self._texts[date] = text
+            self._folded[date] = folded
+            self._total_length += len(folded)
+
+        stale = set(stored_versions) - set(self._versions)
+        for token, deltas in postings.items():
+            token_dates = set(map(dates.__getitem__, accumulate(deltas)))
+            if stale:
+                token_dates -= stale
+            if token_dates:
+                self._postings[token] = token_dates
+        self._ascii_words = sorted(token for token in self._postings if token.isascii())
+        self._loaded = True
+        self._unsaved_changes = len(stale)
+
+    def save(self):
+        """索引をファイルに保存"""
+        if not self._loaded:
+            return
+        if self.index_file is None:
+            self._unsaved_changes = 0
+            return
+        # 転置索引の日付は日付リストでの位置の差分で保存する（日付の文字列を繰り返さない）
+        dates = sorted(self._versions)
+        positions = {date: i for i, date in enumerate(dates)}
+        postings = {}
+        for token, token_dates in self._postings.items():
+            indexes = sorted(map(positions.__getitem__, token_dates))
+            postings[token] = [indexes[0]] + [b - a for a, b in zip(indexes, indexes[1:])]
+        try:
+            serialization.dump_file(self.index_file, {
+                "dates": dates,
+                "versions": [self._versions[date] for date in dates],
+                "postings": postings
+            }, "compact", atomic=True)
+            self._unsaved_changes = 0
+        except OSError as e:
+            print(f"検索索引書き込み警告: {e}")
+
+    def _match_term(self, term: str) -> Dict[str, int]:
+        """検索語を含む記録の日付と、その記録での出現回数を取得"""
+        candidates: Optional[Set[str]] = None
+        for token in _query_tokens(term):
+            if token.isascii():
+                # 英数字は入力途中でも一致するよう前方一致の単語をまとめる
+                dates: Set[str] = set()
+                index = bisect_left(self._ascii_words, token)
+                while index < len(self._ascii_words) and self._ascii_words[index].startswith(token):
+                    dates |= self._postings[self._ascii_words[index]]
+                    index += 1
+            else:
+                dates = self._postings.get(token, set())
+            candidates = set(dates) if candidates is None else candidates & dates
+            if not candidates:
+                return {}
+
+        if candidates is None:
+            # 記号のみの語は全件を照合
+            candidates = self._folded.keys()
+        folded = self._folded
+        counts = {date: folded[date].count(term) for date in candidates}
+        return {date: count for date, count in counts.items() if count}
+
+    def search(self, query: str, limit: Optional[int] = None) -> List[SearchResult]:
+        """
+        全文検索
+
+        Args:
+            query: 検索文字列（parse_query の書式）
+            limit: 最大件数（Noneなら全件）
+
+        Returns:
+            スコアの高い順（同点は新しい順）の検索結果
+        """
+        groups = parse_query(query)
+        if not groups or not self._folded:
+            return []
+
+        term_matches: Dict[str, Dict[str, int]] = {}
+        matched: Optional[Set[str]] = None
+        for group in groups:
+            group_dates: Set[str] = set()
+            for term in group:
+                if term not in term_matches:
+                    term_matches[term] = self._match_term(term)
+                group_dates.update(term_matches[term])
+            matched = group_dates if matched is None else matched & group_dates
+            if not matched:
+                return []
+
+        total = len(self._folded)
+        folded = self._folded
+        k1 = self.BM25_K1
+        # 文書長による正規化: norm = k1 * (1 - b + b * 文書長 / 平均文書長)
+        base_norm = k1 * (1 - self.BM25_B)
+        length_norm = k1 * self.BM25_B * total / self._total_length
+        scores: Dict[str, float] = dict.fromkeys(matched, 0.0)
+        for term, counts in term_matches.items():
+            idf = math.log(1 + (total - len(counts) + 0.5) / (len(counts) + 0.5))
+            weight = idf * (k1 + 1)
+            for date in (matched.intersection(counts) if len(counts) > len(matched) else
+                         [date for date in counts if date in matched]):
+                tf = counts[date]
+                scores[date] += weight * tf / (tf + base_norm + length_norm * len(folded[date]))
+
+        # (スコア, 日付) のタプルをそのまま比較して順位付けする（keyの呼び出しを省く）
+        pairs = zip(scores.values(), scores.keys())
+        ranked = heapq.nlargest(limit, pairs) if limit is not None else sorted(pairs, reverse=True)
+        terms = list(term_matches)
+        texts = self._texts
+        return [SearchResult(date, score, texts[date], folded[date], terms) for score, date in ranked]
+
+    @classmethod
+    def _snippet(cls, text: str, folded: str, terms: List[str]) -> str:
+        """最初に一致した検索語の前後を抜き出す"""
+        positions = [(folded.find(term), term) for term in terms]
+        positions = [(pos, term) for pos, term in positions if pos >= 0]
+        if not positions or len(folded) != len(text):
+            return text[:cls.SNIPPET_RADIUS * 2] + ("…" if len(text) > cls.SNIPPET_RADIUS * 2 else "")
+
+        pos, term = min(positions)
+        start = max(0, pos - cls.SNIPPET_RADIUS)
+        end = min(len(text), pos + len(term) + cls.SNIPPET_RADIUS)
+        return ("…" if start > 0 else "") + text[start:end] + ("…" if end < len(text) else "")
@@ -0,0 +1,212 @@
+"""JSONのシリアライズ形式（プロファイル）"""
+import json
+import os
+import re
+import threading
+from typing import Dict, Iterator, Tuple
+
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+
+_WHITESPACE = re.compile(r'[ \t\n\r]*')
+
+# pretty: 従来通りのインデント付き（人が読みやすい）
+# compact: インデントなし・最小の区切り文字
+# fast: orjsonが使える場合はorjson、使えない場合はcompactと同じ出力
+PROFILES = ("pretty", "compact", "fast")
+DEFAULT_PROFILE = "pretty"
+
+
+def validate_profile(profile: str) -> str:
+    """プロファイル名を検証"""
+    if profile not in PROFILES:
+        raise ValueError(f"不明なシリアライズ形式です: {profile}（{', '.join(PROFILES)} のいずれか）")
+    return profile
+
+
+def dumps(data, profile: str = DEFAULT_PROFILE) -> bytes:
+    """データをUTF-8のJSONバイト列に変換"""
+    if profile == "fast" and orjson is not None:
+        return orjson.dumps(data)
+    if profile == "pretty":
+        return json.dumps(data, ensure_ascii=False, indent=2).encode('utf-8')
+    return json.dumps(data, ensure_ascii=False, separators=(",", ":")).encode('utf-8')
+
+
+def dumps_document(data: dict, profile: str = DEFAULT_PROFILE) -> Tuple[bytes, Dict[str, Tuple[int, int]]]:
+    """
+    records.json 形式のデータをバイト列に変換し、各記録の位置も返す
+
+    記録は1件ずつエンコードして連結するため、出力中の各記録のバイト範囲が分かる。
+    出力は dumps() と同じ形式のJSONになる。
+
+    Returns:
+        (JSONバイト列, {日付: (開始位置, 終了位置)})
+    """
+    pretty = profile == "pretty"
+    separator = b": " if pretty else b":"
+
+    def encode(value, level: int) -> bytes:
+        content = dumps(value, profile)
+        if pretty:
+            content = content.replace(b"\n", b"\n" + b"  " * level)
+        return content
+
+    out = bytearray(b"{")
+    spans: Dict[str, Tuple[int, int]] = {}
+    for i, (key, value) in enumerate(data.items()):
+        if i:
+            out += b","
+        if pretty:
+            out += b"\n  "
+        out += encode(key, 1) + separator
+
+        if key == "records" and value:
+            out += b"{"
+            for j, (date, record_data) in enumerate(value.items()):
+                if j:
+                    out += b","
+                if pretty:
+                    out += b"\n    "
+                out += encode(date, 2) + separator
+                start = len(out)
+                out += encode(record_data, 2)
+                spans[date] = (start, len(out))
+            if pretty:
+                out += b"\n  "
+            out += b"}"
+        else:
+            out += encode(value, 1)
+    if pretty and data:
+        out += b"\n"
+    out += b"}"
+    return bytes(out), spans
+
+
+def loads(content):
+    """JSONを読み込み（どのプロファイルで書かれていても読める）"""
+    if orjson is not None:
+        # orjson.JSONDecodeError は json.JSONDecodeError のサブクラス
+        return orjson.loads(content)
+    if isinstance(content, bytes):
+        content = content.decode('utf-8')
+    return json.loads(content)
+
+
+def load_file(path: str):
+    """JSONファイルを読み込み"""
+    with open(path, 'rb') as f:
+        return loads(f.read())
+
+
+def dump_file(path: str, data, profile: str = DEFAULT_PROFILE, atomic: bool = False):
+    """
+    JSONファイルを書き込み
+
+    Args:
+        path: 出力先パス
+        data: 書き込むデータ
+        profile: シリアライズ形式
+        atomic: Trueの場合は一時ファイル経由でアトミックに置き換える
+            （一時ファイル名はプロセス・スレッドごとに異なるため、同じファイルを同時に置き換えても衝突しない）
+    """
+    content = dumps(data, profile)
+    target = f"{path}.{os.getpid()}-{threading.get_ident()}.tmp" if atomic else path
+    try:
+        with open(target, 'wb') as f:
+            f.write(content)
+            if atomic:
+                f.flush()
+                os.fsync(f.fileno())
+        if atomic:
+            os.replace(target, path)
+    except BaseException:
+        if atomic and os.path.exists(target):
+            os.remove(target)
+        raise
+
+
+def _scan_records(text: str) -> Iterator[Tuple[str, dict, int, int]]:
+    """
+    records.json の "records" を先頭から1件ずつデコード
+
+    Yields:
+        (日付, 記録の辞書, 開始位置, 終了位置)  ※位置は文字単位
+    """
+    decoder = json.JSONDecoder()
+
+    def skip(pos: int) -> int:
+        return _WHITESPACE.match(text, pos).end()
+
+    def expect(pos: int, char: str) -> int:
+        pos = skip(pos)
+        if text[pos:pos + 1] != char:
+            raise ValueError(f"'{char}' が必要です（位置 {pos}）")
+        return pos + 1
+
+    pos = expect(0, '{')
+    while True:
+        pos = skip(pos)
+        if text[pos:pos + 1] == '}':
+            return
+        key, pos = decoder.raw_decode(text, pos)
+        pos = expect(pos, ':')
+        pos = skip(pos)
+
+        if key == "records":
+            pos = expect(pos, '{')
+            while True:
+                pos = skip(pos)
+                if text[pos:pos + 1] == '}':
+                    pos += 1
+                    break
+                date, pos = decoder.raw_decode(text, pos)
+                pos = expect(pos, ':')
+                start = skip(pos)
+                record_data, pos = decoder.raw_decode(text, start)
+                yield date, record_data, start, pos
+                pos = skip(pos)
+                if text[pos:pos + 1] == ',':
+                    pos += 1
+        else:
+            _, pos = decoder.raw_decode(text, pos)
+
+        pos = skip(pos)
+        if text[pos:pos + 1] == ',':
+            pos += 1
+
+
+def iter_raw_records(path: str) -> Iterator[Tuple[str, dict]]:
+    """
+    records.json の "records" を1件ずつ読み出す
+
+    ドキュメント全体のオブジェクトツリーを構築せず、記録単位でデコードする。
+
+    Yields:
+        (日付, 記録の辞書)
+    """
+    with open(path, 'r', encoding='utf-8') as f:
+        text = f.read()
+    for date, record_data, _, _ in _scan_records(text):
+        yield date, record_data
+
+
+def scan_record_spans(path: str) -> Dict[str, Tuple[int, int]]:
+    """records.json 内の各記録のバイト範囲を求める"""
+    with open(path, 'r', encoding='utf-8') as f:
+        text = f.read()
+
+    spans: Dict[str, Tuple[int, int]] = {}
+    char_pos = 0
+    byte_pos = 0
+    for date, _, start, end in _scan_records(text):
+        # 文字位置をUTF-8のバイト位置に変換（前回位置からの差分だけエンコード）
+        byte_pos += len(text[char_pos:start].encode('utf-8'))
+        byte_start = byte_pos
+        byte_pos += len(text[start:end].encode('utf-8'))
+        char_pos = end
+        spans[date] = (byte_start, byte_pos)
+    return spans
@@ -0,0 +1,473 @@
+"""月単位に分割したJSONファイルによるデータ永続化"""
+import json
+import os
+import threading
+from contextlib import contextmanager
+from typing import Dict, Optional, List, Iterator, Tuple, Mapping, Set
+from datetime import datetime
+from .record import Record
+from .record_map import LazyRecordMap
+from .field_index import RecordFieldIndex
+from .search_index import RecordSearchIndex, SearchResult
+from .events import ChangeEvent, ChangeEventBus, RECORD_CREATED, RECORD_UPDATED, RECORD_DELETED
+from .storage import Storage, RecordConflictError
+from .snapshot import RecordSnapshot
+from .file_lock import InterProcessLock
+from . import serialization
+
+
+class ShardedStorage:
+    """
+    記録を月ごとのファイルに分けて保存・読み込みを管理（Storageと同じインターフェース）
+
+    data/records/manifest.json にメタデータと記録のある月の一覧を、
+    data/records/YYYY/MM.json にその月の記録を保存する。
+    """
+
+    def __init__(self, data_dir: str = "data", serialization_profile: str = serialization.DEFAULT_PROFILE):
+        self.data_dir = data_dir
+        self.serialization_profile = serialization.validate_profile(serialization_profile)
+        self.records_dir = os.path.join(data_dir, "records")
+        self.manifest_file = os.path.join(self.records_dir, "manifest.json")
+        self.records_file = os.path.join(data_dir, "records.json")
+        self._lock = threading.RLock()
+        # 複数プロセスからの変更は manifest.lock の排他ロックで順番に行う
+        self._process_lock = InterProcessLock(os.path.join(self.records_dir, "manifest.lock"))
+
+        # 月ファイルのキャッシュ: {"YYYY-MM": (ファイル識別情報, 記録の辞書)}
+        self._shard_cache: Dict[str, Tuple[Optional[tuple], dict]] = {}
+        self._manifest_cache: Optional[Tuple[Optional[tuple], dict]] = None
+
+        # タグ・気分の転置索引（マニフェストと同時に更新）
+        self.field_index = RecordFieldIndex(os.path.join(self.records_dir, "index.json"))
+
+        # 全文検索索引（初回の検索時に読み込み、以降は保存・削除のたびに更新）
+        self.search_index = RecordSearchIndex(os.path.join(self.records_dir, "search.json"))
+
+        # 変更イベントの通知（トランザクション中の変更は確定時にまとめて通知）
+        self.events = ChangeEventBus()
+        # このインスタンスが書き込んだ世代番号（他のプロセスの書き込みと区別するため）
+        self.written_generations: Set[int] = set()
+
+        # トランザクション中に変更された月: {"YYYY-MM": 変更後の記録の辞書}
+        self._pending: Optional[Dict[str, dict]] = None
+
+        self._ensure_data_structure()
+
+    def _ensure_data_structure(self):
+        """ディレクトリとマニフェストを初期化（初回はrecords.jsonから移行）"""
+        os.makedirs(self.records_dir, exist_ok=True)
+
+        with self._process_lock.exclusive():
+            if not os.path.exists(self.manifest_file):
+                if os.path.exists(self.records_file):
+                    count = migrate_to_sharded(self.data_dir, self.serialization_profile)
+                    print(f"records.json から {count} 件の記録を月別ファイルへ移行しました")
+                else:
+                    self._write_manifest(_empty_manifest())
+
+    def _shard_path(self, month: str) -> str:
+        """月ファイルのパスを取得（month: YYYY-MM）"""
+        year, month_num = month.split("-")
+        return os.path.join(self.records_dir, year, f"{month_num}.json")
+
+    @staticmethod
+    def _signature(path: str) -> Optional[tuple]:
+        """キャッシュ検証用のファイル識別情報を取得"""
+        try:
+            stat = os.stat(path)
+        except OSError:
+            return None
+        return (stat.st_mtime_ns, stat.st_size, stat.st_ino)
+
+    def _read_manifest(self) -> dict:
+        """マニフェストを読み込み"""
+        signature = self._signature(self.manifest_file)
+        if self._manifest_cache and signature is not None and self._manifest_cache[0] == signature:
+            return self._manifest_cache[1]
+        try:
+            manifest = serialization.load_file(self.manifest_file)
+        except (json.JSONDecodeError, FileNotFoundError) as e:
+            print(f"マニフェスト読み込みエラー: {e}")
+            manifest = _empty_manifest()
+        self._manifest_cache = (signature, manifest)
+        return manifest
+
+    def _write_manifest(self, manifest: dict):
+        """マニフェストを書き込み"""
+        _write_json_atomic(self.manifest_file, manifest, self.serialization_profile)
+        self._manifest_cache = (self._signature(self.manifest_file), manifest)
+
+    def _read_shard(self, month: str) -> dict:
+        """月ファイルの記録を読み込み（トランザクション中は未確定の変更を反映）"""
+        if self._pending is not None and month in self._pending:
+            return self._pending[month]
+
+        path = self._shard_path(month)
+        signature = self._signature(path)
+        cached = self._shard_cache.get(month)
+        if cached and signature is not None and cached[0] == signature:
+            return cached[1]
+        if signature is None:
+            return {}
+        try:
+            records = serialization.load_file(path).get("records", {})
+        except json.JSONDecodeError as e:
+            print(f"データ読み込みエラー ({month}): {e}")
+            records = {}
+        self._shard_cache[month] = (signature, records)
+        return records
+
+    def _write_shard(self, month: str, records: dict):
+        """月ファイルを書き込み（空になった月はファイルを削除）"""
+        path = self._shard_path(month)
+        if records:
+            _write_json_atomic(path, {"records": records}, self.serialization_profile)
+            self._shard_cache[month] = (self._signature(path), records)
+        else:
+            if os.path.exists(path):
+                os.remove(path)
+            self._shard_cache.pop(month, None)
+
+    def _months(self) -> List[str]:
+        """記録のある月の一覧を取得（トランザクション中は未確定の変更を反映）"""
+        months = set(self._read_manifest().get("months", []))
+        if self._pending:
+            for month, records in self._pending.items():
+                if records:
+                    months.add(month)
+                else:
+                    months.discard(month)
+        return sorted(months)
+
+    @contextmanager
+    def transaction(self):
+        """
+        複数の変更をまとめて書き込むトランザクション
+
+        変更のあった月ファイルを1回ずつ書き込み、マニフェストは最後に1回だけ更新する。
+        例外が発生した場合は全ての変更を破棄する。入れ子にした場合は最も外側でのみ確定する。
+        ブロックの間は他のプロセスからの変更を待たせる。
+        """
+        with self._lock, self._process_lock.exclusive(), self.events.hold():
+            if self._pending is not None:
+                yield self
+                return
+
+            self._pending = {}
+            try:
+                yield self
+            except BaseException:
+                self._pending = None
+                raise
+
+            pending, self._pending = self._pending, None
+            if pending:
+                self._commit_shards(pending)
+
+    def _commit_shards(self, changed: Dict[str, dict]):
+        """変更された月ファイルを書き込み、マニフェストを更新"""
+        manifest = self._read_manifest()
+        metadata = manifest.get("metadata", {})
+        total_records = metadata.get("total_records", 0)
+        months = set(manifest.get("months", []))
+        index_current = self.field_index.load_if_current(self._signature(self.manifest_file))
+
+        for month, records in changed.items():
+            old_records = self._read_shard(month)
+            total_records += len(records) - len(old_records)
+            if index_current:
+                for date in set(old_records) | set(records):
+                    if old_records.get(date) is not records.get(date):
+                        self.field_index.apply(date, old_records.get(date), records.get(date))
+            self._write_shard(month, records)
+            if records:
+                months.add(month)
+            else:
+                months.discard(month)
+
+        months = sorted(months)
+        self._write_manifest({
+            "version": manifest.get("version", "1.0"),
+            "layout": "sharded",
+            "months": months,
+            "metadata": {
+                "total_records": total_records,
+                "first_record_date": min(self._read_shard(months[0])) if months else None,
+                "last_updated": datetime.now().isoformat(),
+                "generation": metadata.get("generation", 0) + 1
+            }
+        })
+        self.written_generations.add(metadata.get("generation", 0) + 1)
+        if index_current:
+            self.field_index.save(self._signature(self.manifest_file))
+
+    def _get_field_index(self) -> RecordFieldIndex:
+        """タグ・気分索引を取得（マニフェストと一致しなければ全ての月ファイルから再構築）"""
+        with self._lock:
+            if self._pending is None and self.field_index.load_if_current(self._signature(self.manifest_file)):
+                return self.field_index
+            raw_records = {}
+            for _, records in self.iter_shards():
+                raw_records.update(records)
+            self.field_index.rebuild(raw_records)
+            if self._pending is None:
+                self.field_index.save(self._signature(self.manifest_file))
+            return self.field_index
+
+    def _lookup_records_data(self, dates: List[str]) -> Dict[str, dict]:
+        """指定した日付の記録の辞書を、該当する月ファイルだけを読んで取得"""
+        result = {}
+        for date in dates:
+            record_data = self._read_shard(date[:7]).get(date)
+            if record_data is not None:
+                result[date] = record_data
+        return result
+
+    def iter_shards(self) -> Iterator[Tuple[str, dict]]:
+        """月ファイルを古い順に1つずつ読み出す"""
+        for month in self._months():
+            yield month, self._read_shard(month)
+
+    def get_record(self, date: str) -> Optional[Record]:
+        """指定日の記録を取得"""
+        record_data = self._read_shard(date[:7]).get(date)
+        if record_data:
+            return Record.from_dict(record_data)
+        return None
+
+    def iter_all_records(self) -> Iterator[Record]:
+        """全ての記録を月ファイル単位で順に読み出す"""
+        return self.iter_records()
+
+    def iter_records(self, start: Optional[str] = None, end: Optional[str] = None,
+                     reverse: bool = False) -> Iterator[Record]:
+        """
+        記録を日付順に1件ずつ取得（範囲外の月ファイルは読まない）
+
+        Args:
+            start: 開始日（YYYY-MM-DD、含む）。Noneなら最初から
+            end: 終了日（YYYY-MM-DD、含む）。Noneなら最後まで
+            reverse: Trueなら新しい順
+        """
+        months = [
+            month for month in self._months()
+            if (not start or month >= start[:7]) and (not end or month <= end[:7])
+        ]
+        if reverse:
+            months.reverse()
+        for month in months:
+            records = self._read_shard(month)
+            for date in sorted(records, reverse=reverse):
+                if (not start or date >= start) and (not end or date <= end):
+                    yield Record.from_dict(records[date])
+
+    def get_all_records(self) -> Mapping[str, Record]:
+        """全ての記録を取得（月ファイル単位で読み込み、Recordはアクセス時に生成）"""
+        raw_records = {}
+        for _, records in self.iter_shards():
+            raw_records.update(records)
+        return LazyRecordMap(raw_records)
+
+    def get_dates_in_range(self, start_date: Optional[str] = None, end_date: Optional[str] = None) -> List[str]:
+        """日付範囲（両端を含む）にある記録の日付を取得（範囲外の月ファイルは読まない）"""
+        dates = []
+        for month in self._months():
+            if (start_date and month < start_date[:7]) or (end_date and month > end_date[:7]):
+                continue
+            dates.extend(
+                date for date in sorted(self._read_shard(month))
+                if (not start_date or date >= start_date) and (not end_date or date <= end_date)
+            )
+        return dates
+
+    def get_records_by_dates(self, dates: List[str]) -> Mapping[str, Record]:
+        """指定した日付の記録をまとめて取得（存在しない日付は含まれない）"""
+        return LazyRecordMap(self._lookup_records_data(dates))
+
+    def get_records_by_month(self, year: int, month: int) -> Mapping[str, Record]:
+        """指定月の記録を取得（Recordはアクセス時に生成）"""
+        return LazyRecordMap(dict(self._read_shard(f"{year:04d}-{month:02d}")))
+
+    def get_records_in_range(self, start_date: str, end_date: str) -> Mapping[str, Record]:
+        """日付範囲（両端を含む）の記録を取得（Recordはアクセス時に生成）"""
+        raw_records = {}
+        for month in self._months():
+            if not start_date[:7] <= month <= end_date[:7]:
+                continue
+            for date, record_data in self._read_shard(month).items():
+                if start_date <= date <= end_date:
+                    raw_records[date] = record_data
+        return LazyRecordMap(raw_records)
+
+    def get_records_by_tag(self, tag: str) -> Mapping[str, Record]:
+        """指定タグを持つ記録を取得（索引を使用、Recordはアクセス時に生成）"""
+        return LazyRecordMap(self._lookup_records_data(self.get_dates_by_tag(tag)))
+
+    def get_records_by_mood(self, mood: str) -> Mapping[str, Record]:
+        """指定した気分の記録を取得（索引を使用、Recordはアクセス時に生成）"""
+        return LazyRecordMap(self._lookup_records_data(self.get_dates_by_mood(mood)))
+
+    def get_dates_by_tag(self, tag: str) -> List[str]:
+        """指定タグを持つ記録の日付を取得（昇順）"""
+        return self._get_field_index().get_dates_by_tag(tag)
+
+    def get_dates_by_mood(self, mood: str) -> List[str]:
+        """指定した気分の記録の日付を取得（昇順）"""
+        return self._get_field_index().get_dates_by_mood(mood)
+
+    def get_tag_counts(self) -> Dict[str, int]:
+        """タグごとの記録数を取得"""
+        return self._get_field_index().get_tag_counts()
+
+    def search_records(self, query: str, limit: Optional[int] = None) -> List[SearchResult]:
+        """本文・タグ・画像キャプションを全文検索（スコアの高い順）"""
+        with self._lock:
+            self.search_index.sync(
+                {
+                    date: record_data.get("updated_at")
+                    for _, records in self.iter_shards()
+                    for date, record_data in records.items()
+                },
+                self._lookup_records_data
+            )
+            return self.search_index.search(query, limit)
+
+    def get_dates_with_records(self) -> List[str]:
+        """記録が存在する日付のリストを取得"""
+        return [date for _, records in self.iter_shards() for date in records]
+
+    def save_record(self, record: Record, expected_updated_at: Optional[str] = None):
+        """
+        記録を保存（新規作成または更新）。書き込むのは該当月のファイルとマニフェストのみ
+
+        Args:
+            record: 保存する記録
+            expected_updated_at: 指定した場合、保存済みの記録の更新日時がこれと異なれば
+                RecordConflictError を送出する
+        """
+        month = record.date[:7]
+        with self.transaction():
+            records = dict(self._read_shard(month))
+            if expected_updated_at is not None and (records.get(record.date) or {}).get("updated_at") != expected_updated_at:
+                raise RecordConflictError(record.date)
+            record_data = record.to_dict()
+            created = record.date not in records
+            records[record.date] = record_data
+            self._pending[month] = records
+            self.search_index.apply(record.date, record_data)
+            self.events.publish(ChangeEvent(RECORD_CREATED if created else RECORD_UPDATED, record.date))
+
+    def delete_record(self, date: str) -> bool:
+        """記録を削除"""
+        month = date[:7]
+        with self.transaction():
+            records = dict(self._read_shard(month))
+            if date not in records:
+                return False
+            del records[date]
+            self._pending[month] = records
+            self.search_index.apply(date, None)
+            self.events.publish(ChangeEvent(RECORD_DELETED, date))
+            return True
+
+    def flush(self, timeout: Optional[float] = None) -> bool:
+        """未保存の検索索引を書き込む（記録は保存時に書き込み済み）"""
+        with self._lock:
+            if self.search_index.unsaved_changes:
+                self.search_index.save()
+        return True
+
+    def record_exists(self, date: str) -> bool:
+        """指定日に記録が存在するか確認"""
+        return date in self._read_shard(date[:7])
+
+    def get_metadata(self) -> dict:
+        """メタデータを取得"""
+        return dict(self._read_manifest().get("metadata", {}))
+
+    def snapshot(self) -> RecordSnapshot:
+        """現時点の記録の読み取り専用ビューを取得（月ファイルの辞書は変更せず置き換えるため、そのまま共有する）"""
+        with self._lock:
+            records = {}
+            for _, shard in self.iter_shards():
+                records.update(shard)
+            return RecordSnapshot(records, self.get_metadata())
+
+
+def _empty_manifest() -> dict:
+    """空のマニフェストを生成"""
+    return {
+        "version": "1.0",
+        "layout": "sharded",
+        "months": [],
+        "metadata": {
+            "total_records": 0,
+            "first_record_date": None,
+            "last_updated": datetime.now().isoformat(),
+            "generation": 0
+        }
+    }
+
+
+def _write_json_atomic(path: str, data: dict, profile: str = serialization.DEFAULT_PROFILE):
+    """一時ファイル経由でJSONファイルをアトミックに置き換え"""
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    serialization.dump_file(path, data, profile, atomic=True)
+
+
+def migrate_to_sharded(data_dir: str = "data", serialization_profile: str = serialization.DEFAULT_PROFILE) -> int:
+    """
+    records.json を月別ファイル形式へ移行（records.json はそのまま残す）
+
+    記録は Storage を通して読み込むため、ジャーナルの未反映の変更とアーカイブ済みの年も移行する。
+    移行が終わるまで records.lock を排他ロックし、他のプロセスに records.json を書き換えさせない。
+
+    Returns:
+        移行した記録数
+    """
+    records_dir = os.path.join(data_dir, "records")
+
+    # ジャーナルモードで開くと records.json を書き換えずにジャーナルを適用して読み込める
+    with Storage(data_dir, use_journal=True).exclusive_snapshot() as snapshot:
+        shards: Dict[str, dict] = {}
+        for date, record_data in snapshot.iter_raw_records():
+            shards.setdefault(date[:7], {})[date] = record_data
+
+        count = 0
+        for month, records in shards.items():
+            year, month_num = month.split("-")
+            _write_json_atomic(os.path.join(records_dir, year, f"{month_num}.json"), {"records": records},
+                               serialization_profile)
+            count += len(records)
+
+        all_dates = [date for records in shards.values() for date in records]
+        _write_json_atomic(os.path.join(records_dir, "manifest.json"), {
+            "version": "1.0",
+            "layout": "sharded",
+            "months": sorted(shards),
+            "metadata": {
+                "total_records": count,
+                "first_record_date": min(all_dates) if all_dates else None,
+                "last_updated": datetime.now().isoformat()
+            }
+        }, serialization_profile)
+    return count
+
+
+def migrate_to_single(data_dir: str = "data", serialization_profile: str = serialization.DEFAULT_PROFILE) -> int:
+    """
+    月別ファイル形式を records.json へ書き戻す（月別ファイルはそのまま残す）
+
+    Returns:
+        移行した記録数
+    """
+    sharded = ShardedStorage(data_dir)
+    storage = Storage(data_dir, serialization_profile=serialization_profile)
+
+    data = storage._empty_data()
+    for _, records in sharded.iter_shards():
+        data["records"].update(records)
+    storage._update_metadata(data)
+    storage._write_data(data)
+    return len(data["records"])
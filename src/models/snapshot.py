@@ -0,0 +1,118 @@
+"""ある時点の記録の読み取り専用ビュー"""
+from bisect import bisect_left, bisect_right
+from types import MappingProxyType
+from typing import Dict, Iterator, List, Mapping, Optional, Tuple
+from .record import Record
+from .record_map import LazyRecordMap
+
+
+class RecordSnapshot:
+    """
+    ある時点の記録の読み取り専用ビュー
+
+    ストレージの記録辞書を複製せずにそのまま共有し、ストレージ側は次に変更する時に
+    辞書を複製する（コピーオンライト）。記録の辞書自体は保存のたびに新しく作られるため、
+    作成後にストレージが変更されても内容は変わらない。
+    読み込みのメソッドはストレージと同じで、QueryPlanner にもそのまま渡せる。
+    """
+
+    def __init__(self, records: Dict[str, dict], metadata: Optional[dict] = None):
+        self._records = MappingProxyType(records)
+        self._metadata = dict(metadata or {})
+        self._sorted_dates: Optional[List[str]] = None
+
+    def __len__(self) -> int:
+        return len(self._records)
+
+    def _dates(self) -> List[str]:
+        """ソート済みの日付リスト（初回のみ作成）"""
+        if self._sorted_dates is None:
+            self._sorted_dates = sorted(self._records)
+        return self._sorted_dates
+
+    def get_record(self, date: str) -> Optional[Record]:
+        """指定日の記録を取得"""
+        record_data = self._records.get(date)
+        return Record.from_dict(record_data) if record_data else None
+
+    def record_exists(self, date: str) -> bool:
+        """指定日に記録が存在するか確認"""
+        return date in self._records
+
+    def get_all_records(self) -> Mapping[str, Record]:
+        """全ての記録を取得（Recordはアクセス時に生成）"""
+        return LazyRecordMap(self._records)
+
+    def get_dates_with_records(self) -> List[str]:
+        """記録が存在する日付のリストを取得（昇順）"""
+        return list(self._dates())
+
+    def get_dates_in_range(self, start_date: Optional[str] = None, end_date: Optional[str] = None) -> List[str]:
+        """日付範囲（両端を含む）にある記録の日付を取得（昇順）"""
+        dates = self._dates()
+        lo = bisect_left(dates, start_date) if start_date else 0
+        hi = bisect_right(dates, end_date) if end_date else len(dates)
+        return dates[lo:hi]
+
+    def iter_records(self, start: Optional[str] = None, end: Optional[str] = None,
+                     reverse: bool = False) -> Iterator[Record]:
+        """記録を日付順に1件ずつ取得（start/endは両端を含む）"""
+        dates = self.get_dates_in_range(start, end)
+        if reverse:
+            dates.reverse()
+        for date in dates:
+            yield Record.from_dict(self._records[date])
+
+    def iter_raw_records(self) -> Iterator[Tuple[str, dict]]:
+        """保存形式の辞書 (日付, 辞書) を日付順に1件ずつ取得（Recordを生成しない。変更しないこと）"""
+        for date in self._dates():
+            yield date, self._records[date]
+
+    def get_records_by_dates(self, dates: List[str]) -> Mapping[str, Record]:
+        """指定した日付の記録をまとめて取得（存在しない日付は含まれない）"""
+        return LazyRecordMap({date: self._records[date] for date in dates if date in self._records})
+
+    def get_records_in_range(self, start_date: str, end_date: str) -> Mapping[str, Record]:
+        """日付範囲（両端を含む）の記録を取得"""
+        return self.get_records_by_dates(self.get_dates_in_range(start_date, end_date))
+
+    def get_records_by_month(self, year: int, month: int) -> Mapping[str, Record]:
+        """指定月の記録を取得"""
+        month_prefix = f"{year:04d}-{month:02d}"
+        return self.get_records_in_range(f"{month_prefix}-00", f"{month_prefix}-99")
+
+    def get_dates_by_tag(self, tag: str) -> List[str]:
+        """指定タグを持つ記録の日付を取得（昇順、全件走査）"""
+        return [date for date in self._dates() if tag in self._records[date].get("tags", ())]
+
+    def get_dates_by_mood(self, mood: str) -> List[str]:
+        """指定した気分の記録の日付を取得（昇順、全件走査）"""
+        return [date for date in self._dates() if self._records[date].get("mood") == mood]
+
+    def get_records_by_tag(self, tag: str) -> Mapping[str, Record]:
+        """指定タグを持つ記録を取得"""
+        return self.get_records_by_dates(self.get_dates_by_tag(tag))
+
+    def get_records_by_mood(self, mood: str) -> Mapping[str, Record]:
+        """指定した気分の記録を取得"""
+        return self.get_records_by_dates(self.get_dates_by_mood(mood))
+
+    def get_versions(self) -> Dict[str, str]:
+        """全ての記録の更新日時 {日付: updated_at}（Recordを生成しない）"""
+        return {date: record_data.get("updated_at") for date, record_data in self._records.items()}
+
+    def get_tag_counts(self) -> Dict[str, int]:
+        """タグごとの記録数を取得"""
+        counts: Dict[str, int] = {}
+        for record_data in self._records.values():
+            for tag in record_data.get("tags", ()):
+                counts[tag] = counts.get(tag, 0) + 1
+        return counts
+
+    def get_metadata(self) -> dict:
+        """作成時点のメタデータを取得"""
+        dates = self._dates()
+        metadata = dict(self._metadata)
+        metadata["total_records"] = len(dates)
+        metadata["first_record_date"] = dates[0] if dates else None
+        return metadata
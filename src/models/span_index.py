@@ -0,0 +1,106 @@
+"""records.json 内の記録位置の索引（単一記録の部分読み込み用）"""
+import mmap
+import os
+from typing import Dict, Optional, Tuple
+from . import serialization
+
+
+class RecordSpanIndex:
+    """
+    日付 → records.json 内のバイト範囲 の索引
+
+    records.json.idx に保存し、記録ファイルのmtime/サイズ/inodeが変わっていれば作り直す。
+    1件の記録はファイル全体をパースせず、mmapで該当範囲だけをデコードして読む。
+    """
+
+    def __init__(self, records_file: str):
+        self.records_file = records_file
+        self.index_file = records_file + ".idx"
+        self._spans: Optional[Dict[str, Tuple[int, int]]] = None
+        self._signature: Optional[list] = None
+
+    def _current_signature(self) -> Optional[list]:
+        """記録ファイルの識別情報（mtime, サイズ, inode）を取得"""
+        try:
+            stat = os.stat(self.records_file)
+        except OSError:
+            return None
+        return [stat.st_mtime_ns, stat.st_size, stat.st_ino]
+
+    def update(self, spans: Dict[str, Tuple[int, int]]):
+        """書き込み直後の記録ファイルに合わせて索引を更新・保存"""
+        self._spans = spans
+        self._signature = self._current_signature()
+        self._save()
+
+    def _save(self):
+        """索引をサイドカーファイルに保存"""
+        try:
+            serialization.dump_file(
+                self.index_file,
+                {"signature": self._signature, "spans": self._spans},
+                "compact",
+                atomic=True
+            )
+        except OSError as e:
+            print(f"索引書き込み警告: {e}")
+
+    def _ensure_fresh(self, signature: list) -> bool:
+        """索引が記録ファイルと一致する状態にする（必要なら再構築）"""
+        if self._spans is not None and self._signature == signature:
+            return True
+
+        # サイドカーファイルが最新ならそれを使う
+        try:
+            stored = serialization.load_file(self.index_file)
+            if stored.get("signature") == signature:
+                self._spans = {date: tuple(span) for date, span in stored["spans"].items()}
+                self._signature = signature
+                return True
+        except (OSError, ValueError, KeyError):
+            pass
+
+        # 記録ファイルを走査して再構築
+        try:
+            self._spans = serialization.scan_record_spans(self.records_file)
+        except (OSError, ValueError) as e:
+            print(f"索引再構築エラー: {e}")
+            self._spans = None
+            return False
+        self._signature = signature
+        self._save()
+        return True
+
+    def read(self, date: str) -> Tuple[bool, Optional[dict]]:
+        """
+        索引を使って1件の記録を読み込み
+
+        Returns:
+            (索引を使えたか, 記録の辞書（存在しなければNone）)
+        """
+        signature = self._current_signature()
+        if signature is None or not self._ensure_fresh(signature):
+            return False, None
+
+        span = self._spans.get(date)
+        if span is None:
+            return True, None
+
+        start, end = span
+        try:
+            with open(self.records_file, 'rb') as f:
+                with mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as mapped:
+                    record_data = serialization.loads(mapped[start:end])
+        except (OSError, ValueError) as e:
+            print(f"部分読み込みエラー: {e}")
+            return False, None
+
+        # 読み込み中にファイルが差し替えられた場合に備えて内容を確認
+        if not isinstance(record_data, dict) or record_data.get("date") != date:
+            return False, None
+        return True, record_data
+
+    def invalidate(self):
+        """メモリ上の索引を破棄"""
+        self._spans = None
+        self._signature = None
@@ -0,0 +1,443 @@
+"""SQLiteによるデータ永続化"""
+import os
+import sqlite3
+import threading
+from contextlib import contextmanager
+from typing import Dict, Optional, List, Iterable, Iterator, Set, Tuple
+from datetime import datetime
+from .record import Record, ImageAttachment
+from .search_index import RecordSearchIndex, SearchResult
+from .events import ChangeEvent, ChangeEventBus, RECORD_CREATED, RECORD_UPDATED, RECORD_DELETED
+from .storage import Storage, RecordConflictError
+from .snapshot import RecordSnapshot
+
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS records (
+    date TEXT PRIMARY KEY,
+    id TEXT NOT NULL,
+    created_at TEXT NOT NULL,
+    updated_at TEXT NOT NULL,
+    text TEXT NOT NULL DEFAULT '',
+    mood TEXT
+);
+CREATE TABLE IF NOT EXISTS images (
+    record_date TEXT NOT NULL REFERENCES records(date) ON DELETE CASCADE,
+    position INTEGER NOT NULL,
+    id TEXT NOT NULL,
+    filename TEXT NOT NULL,
+    path TEXT NOT NULL,
+    thumbnail_path TEXT NOT NULL,
+    uploaded_at TEXT NOT NULL,
+    size_bytes INTEGER NOT NULL,
+    caption TEXT,
+    PRIMARY KEY (record_date, position)
+);
+CREATE TABLE IF NOT EXISTS tags (
+    record_date TEXT NOT NULL REFERENCES records(date) ON DELETE CASCADE,
+    position INTEGER NOT NULL,
+    tag TEXT NOT NULL,
+    PRIMARY KEY (record_date, position)
+);
+CREATE TABLE IF NOT EXISTS metadata (
+    key TEXT PRIMARY KEY,
+    value TEXT
+);
+CREATE INDEX IF NOT EXISTS idx_records_mood ON records(mood, date);
+CREATE INDEX IF NOT EXISTS idx_tags_tag ON tags(tag, record_date);
+"""
+
+
+class SQLiteStorage:
+    """SQLite形式でのデータ保存・読み込みを管理（Storageと同じインターフェース）"""
+
+    def __init__(self, data_dir: str = "data"):
+        self.data_dir = data_dir
+        self.db_file = os.path.join(data_dir, "records.db")
+        self.records_file = os.path.join(data_dir, "records.json")
+        self._lock = threading.RLock()
+        self._in_transaction = False
+
+        # 全文検索索引（初回の検索時に読み込み、以降は保存・削除のたびに更新）
+        self.search_index = RecordSearchIndex(os.path.join(data_dir, "records.db.search.json"))
+
+        # 変更イベントの通知（トランザクション中の変更はコミット時にまとめて通知）
+        self.events = ChangeEventBus()
+        # このインスタンスが書き込んだ世代番号（他のプロセスの書き込みと区別するため）
+        self.written_generations: Set[int] = set()
+        self._ensure_data_structure()
+
+    def _ensure_data_structure(self):
+        """データベースとスキーマを初期化（初回はrecords.jsonから移行）"""
+        os.makedirs(self.data_dir, exist_ok=True)
+        if not os.path.exists(self.db_file) and os.path.exists(self.records_file):
+            self._migrate_from_json()
+
+        self.conn = sqlite3.connect(self.db_file, check_same_thread=False)
+        self.conn.row_factory = sqlite3.Row
+        self.conn.execute("PRAGMA journal_mode=WAL")
+        self.conn.execute("PRAGMA synchronous=NORMAL")
+        self.conn.execute("PRAGMA foreign_keys=ON")
+        self.conn.executescript(SCHEMA)
+
+    def _migrate_from_json(self):
+        """
+        records.json から移行したデータベースを作成
+
+        記録は Storage を通して読み込むため、ジャーナルの未反映の変更とアーカイブ済みの年も移行する。
+        別のファイルに移行してから records.db へ名前を変えるため、途中で中断しても
+        移行途中のデータベースが残らず、次回の起動時に最初から移行し直す。
+        移行中は records.json の書き込みと、他のプロセスの移行を待たせる。
+        """
+        migrating_file = self.db_file + ".migrating"
+        # ジャーナルモードで開くと records.json を書き換えずにジャーナルを適用して読み込める
+        source = Storage(self.data_dir, use_journal=True)
+        with source.exclusive_snapshot() as snapshot:
+            if os.path.exists(self.db_file):
+                # 他のプロセスが移行を終えていた
+                return
+            for path in (migrating_file, migrating_file + "-journal"):
+                if os.path.exists(path):
+                    os.remove(path)
+
+            conn = sqlite3.connect(migrating_file)
+            try:
+                conn.executescript(SCHEMA)
+                count = migrate_json_to_sqlite(snapshot.iter_raw_records(), conn)
+            finally:
+                conn.close()
+            os.replace(migrating_file, self.db_file)
+        print(f"records.json から {count} 件の記録を移行しました")
+
+    def flush(self, timeout: Optional[float] = None) -> bool:
+        """未保存の検索索引を書き込む（記録は保存時に書き込み済み）"""
+        with self._lock:
+            if self.search_index.unsaved_changes:
+                self.search_index.save()
+        return True
+
+    def close(self):
+        """データベース接続を閉じる"""
+        self.conn.close()
+
+    @contextmanager
+    def transaction(self):
+        """
+        複数の変更を1回のコミットにまとめるトランザクション
+
+        例外が発生した場合はロールバックする。入れ子にした場合は最も外側でのみコミットする。
+        """
+        with self._lock, self.events.hold():
+            if self._in_transaction:
+                yield self
+                return
+
+            self._in_transaction = True
+            changes_before = self.conn.total_changes
+            try:
+                # 最初に書き込みロックを取り、読み込んでから書き込むまでに他のプロセスが割り込まないようにする
+                self.conn.execute("BEGIN IMMEDIATE")
+                yield self
+                generation = None
+                if self.conn.total_changes != changes_before:
+                    generation = self._touch(self.conn)
+                self.conn.commit()
+                if generation is not None:
+                    self.written_generations.add(generation)
+            except BaseException:
+                self.conn.rollback()
+                raise
+            finally:
+                self._in_transaction = False
+
+    def _fetch_records(self, condition: str = "1", params: tuple = ()) -> Dict[str, Record]:
+        """条件に一致する記録をタグ・画像と合わせて取得"""
+        with self._lock:
+            rows = self.conn.execute(
+                f"SELECT * FROM records WHERE {condition} ORDER BY date", params
+            ).fetchall()
+            if not rows:
+                return {}
+
+            tags: Dict[str, List[str]] = {}
+            for row in self.conn.execute(
+                f"SELECT record_date, tag FROM tags WHERE record_date IN "
+                f"(SELECT date FROM records WHERE {condition}) ORDER BY record_date, position",
+                params
+            ):
+                tags.setdefault(row["record_date"], []).append(row["tag"])
+
+            images: Dict[str, List[ImageAttachment]] = {}
+            for row in self.conn.execute(
+                f"SELECT * FROM images WHERE record_date IN "
+                f"(SELECT date FROM records WHERE {condition}) ORDER BY record_date, position",
+                params
+            ):
+                images.setdefault(row["record_date"], []).append(ImageAttachment(
+                    id=row["id"],
+                    filename=row["filename"],
+                    path=row["path"],
+                    thumbnail_path=row["thumbnail_path"],
+                    uploaded_at=row["uploaded_at"],
+                    size_bytes=row["size_bytes"],
+                    caption=row["caption"]
+                ))
+
+        records = {}
+        for row in rows:
+            date = row["date"]
+            records[date] = Record(
+                id=row["id"],
+                date=date,
+                created_at=row["created_at"],
+                updated_at=row["updated_at"],
+                text=row["text"],
+                images=images.get(date, []),
+                tags=tags.get(date, []),
+                mood=row["mood"]
+            )
+        return records
+
+    def get_record(self, date: str) -> Optional[Record]:
+        """指定日の記録を取得"""
+        return self._fetch_records("date = ?", (date,)).get(date)
+
+    def get_all_records(self) -> Dict[str, Record]:
+        """全ての記録を取得"""
+        return self._fetch_records()
+
+    def get_records_by_month(self, year: int, month: int) -> Dict[str, Record]:
+        """指定月の記録を取得"""
+        month_prefix = f"{year:04d}-{month:02d}"
+        return self._fetch_records("date BETWEEN ? AND ?", (f"{month_prefix}-00", f"{month_prefix}-99"))
+
+    def get_records_in_range(self, start_date: str, end_date: str) -> Dict[str, Record]:
+        """日付範囲（両端を含む）の記録を取得"""
+        return self._fetch_records("date BETWEEN ? AND ?", (start_date, end_date))
+
+    def iter_records(self, start: Optional[str] = None, end: Optional[str] = None,
+                     reverse: bool = False, page_size: int = 200) -> Iterator[Record]:
+        """
+        記録を日付順に1件ずつ取得（page_size件ずつ読み込む）
+
+        Args:
+            start: 開始日（YYYY-MM-DD、含む）。Noneなら最初から
+            end: 終了日（YYYY-MM-DD、含む）。Noneなら最後まで
+            reverse: Trueなら新しい順
+        """
+        condition = "date BETWEEN ? AND ?"
+        params = [start or "", end or "\uffff"]
+        order = "DESC" if reverse else "ASC"
+        last_date = None
+        while True:
+            # キーセット方式: 直前のページの最後の日付より先だけを取得
+            page_condition = condition
+            page_params = list(params)
+            if last_date is not None:
+                page_condition += " AND date < ?" if reverse else " AND date > ?"
+                page_params.append(last_date)
+
+            with self._lock:
+                dates = [row[0] for row in self.conn.execute(
+                    f"SELECT date FROM records WHERE {page_condition} ORDER BY date {order} LIMIT ?",
+                    page_params + [page_size]
+                )]
+            if not dates:
+                return
+
+            page = self._fetch_records("date BETWEEN ? AND ?", (min(dates), max(dates)))
+            for date in dates:
+                if date in page:
+                    yield page[date]
+
+            if len(dates) < page_size:
+                return
+            last_date = dates[-1]
+
+    def get_dates_in_range(self, start_date: Optional[str] = None, end_date: Optional[str] = None) -> List[str]:
+        """日付範囲（両端を含む）にある記録の日付を取得（昇順）"""
+        with self._lock:
+            return [row[0] for row in self.conn.execute(
+                "SELECT date FROM records WHERE date BETWEEN ? AND ? ORDER BY date",
+                (start_date or "", end_date or "\uffff")
+            )]
+
+    def get_records_by_dates(self, dates: List[str], chunk_size: int = 500) -> Dict[str, Record]:
+        """指定した日付の記録をまとめて取得（存在しない日付は含まれない）"""
+        records = {}
+        for i in range(0, len(dates), chunk_size):
+            chunk = dates[i:i + chunk_size]
+            placeholders = ", ".join("?" * len(chunk))
+            records.update(self._fetch_records(f"date IN ({placeholders})", tuple(chunk)))
+        return records
+
+    def get_records_by_tag(self, tag: str) -> Dict[str, Record]:
+        """指定タグを持つ記録を取得"""
+        return self._fetch_records("date IN (SELECT record_date FROM tags WHERE tag = ?)", (tag,))
+
+    def get_records_by_mood(self, mood: str) -> Dict[str, Record]:
+        """指定した気分の記録を取得"""
+        return self._fetch_records("mood = ?", (mood,))
+
+    def get_dates_by_tag(self, tag: str) -> List[str]:
+        """指定タグを持つ記録の日付を取得（昇順）"""
+        with self._lock:
+            return [row[0] for row in self.conn.execute(
+                "SELECT DISTINCT record_date FROM tags WHERE tag = ? ORDER BY record_date", (tag,)
+            )]
+
+    def get_dates_by_mood(self, mood: str) -> List[str]:
+        """指定した気分の記録の日付を取得（昇順）"""
+        with self._lock:
+            return [row[0] for row in self.conn.execute(
+                "SELECT date FROM records WHERE mood = ? ORDER BY date", (mood,)
+            )]
+
+    def get_tag_counts(self) -> Dict[str, int]:
+        """タグごとの記録数を取得"""
+        with self._lock:
+            return {row[0]: row[1] for row in self.conn.execute(
+                "SELECT tag, COUNT(DISTINCT record_date) FROM tags GROUP BY tag"
+            )}
+
+    def search_records(self, query: str, limit: Optional[int] = None) -> List[SearchResult]:
+        """本文・タグ・画像キャプションを全文検索（スコアの高い順）"""
+        with self._lock:
+            versions = dict(self.conn.execute("SELECT date, updated_at FROM records").fetchall())
+            self.search_index.sync(
+                versions,
+                lambda dates: {date: record.to_dict() for date, record in self.get_records_by_dates(dates).items()}
+            )
+            return self.search_index.search(query, limit)
+
+    def get_dates_with_records(self) -> List[str]:
+        """記録が存在する日付のリストを取得"""
+        with self._lock:
+            return [row[0] for row in self.conn.execute("SELECT date FROM records ORDER BY date")]
+
+    def save_record(self, record: Record, expected_updated_at: Optional[str] = None):
+        """
+        記録を保存（新規作成または更新）
+
+        Args:
+            record: 保存する記録
+            expected_updated_at: 指定した場合、保存済みの記録の更新日時がこれと異なれば
+                RecordConflictError を送出する
+        """
+        record_data = record.to_dict()
+        with self.transaction():
+            row = self.conn.execute("SELECT updated_at FROM records WHERE date = ?", (record.date,)).fetchone()
+            if expected_updated_at is not None and (row is None or row[0] != expected_updated_at):
+                raise RecordConflictError(record.date)
+            _insert_record(self.conn, record_data)
+            self.search_index.apply(record.date, record_data)
+            self.events.publish(ChangeEvent(RECORD_CREATED if row is None else RECORD_UPDATED, record.date))
+
+    def delete_record(self, date: str) -> bool:
+        """記録を削除"""
+        with self.transaction():
+            cursor = self.conn.execute("DELETE FROM records WHERE date = ?", (date,))
+            if cursor.rowcount > 0:
+                self.search_index.apply(date, None)
+                self.events.publish(ChangeEvent(RECORD_DELETED, date))
+                return True
+            return False
+
+    def record_exists(self, date: str) -> bool:
+        """指定日に記録が存在するか確認"""
+        with self._lock:
+            row = self.conn.execute("SELECT 1 FROM records WHERE date = ?", (date,)).fetchone()
+        return row is not None
+
+    def get_metadata(self) -> dict:
+        """メタデータを取得"""
+        with self._lock:
+            total, first = self.conn.execute("SELECT COUNT(*), MIN(date) FROM records").fetchone()
+            values = dict(self.conn.execute(
+                "SELECT key, value FROM metadata WHERE key IN ('last_updated', 'generation')"
+            ).fetchall())
+        return {
+            "total_records": total,
+            "first_record_date": first,
+            "last_updated": values.get("last_updated"),
+            "generation": int(values.get("generation", 0))
+        }
+
+    def snapshot(self) -> RecordSnapshot:
+        """現時点の記録の読み取り専用ビューを取得（全件を1回の読み込みで取り出す）"""
+        with self._lock:
+            records = {date: record.to_dict() for date, record in self._fetch_records().items()}
+            return RecordSnapshot(records, self.get_metadata())
+
+    @staticmethod
+    def _touch(conn: sqlite3.Connection) -> int:
+        """最終更新日時を記録し、世代番号を進める（進めた後の世代番号を返す）"""
+        conn.execute(
+            "INSERT INTO metadata (key, value) VALUES ('last_updated', ?) "
+            "ON CONFLICT(key) DO UPDATE SET value = excluded.value",
+            (datetime.now().isoformat(),)
+        )
+        conn.execute(
+            "INSERT INTO metadata (key, value) VALUES ('generation', '1') "
+            "ON CONFLICT(key) DO UPDATE SET value = CAST(value AS INTEGER) + 1"
+        )
+        return int(conn.execute("SELECT value FROM metadata WHERE key = 'generation'").fetchone()[0])
+
+
+def _insert_record(conn: sqlite3.Connection, record_data: dict):
+    """記録の辞書を正規化してテーブルに書き込む（既存の記録は置き換え）"""
+    date = record_data["date"]
+    conn.execute(
+        "INSERT INTO records (date, id, created_at, updated_at, text, mood) VALUES (?, ?, ?, ?, ?, ?) "
+        "ON CONFLICT(date) DO UPDATE SET id = excluded.id, created_at = excluded.created_at, "
+        "updated_at = excluded.updated_at, text = excluded.text, mood = excluded.mood",
+        (date, record_data["id"], record_data["created_at"], record_data["updated_at"],
+         record_data.get("text", ""), record_data.get("mood"))
+    )
+    conn.execute("DELETE FROM tags WHERE record_date = ?", (date,))
+    conn.execute("DELETE FROM images WHERE record_date = ?", (date,))
+    conn.executemany(
+        "INSERT INTO tags (record_date, position, tag) VALUES (?, ?, ?)",
+        [(date, position, tag) for position, tag in enumerate(record_data.get("tags", []))]
+    )
+    conn.executemany(
+        "INSERT INTO images (record_date, position, id, filename, path, thumbnail_path, "
+        "uploaded_at, size_bytes, caption) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)",
+        [
+            (date, position, img["id"], img["filename"], img["path"], img["thumbnail_path"],
+             img["uploaded_at"], img["size_bytes"], img.get("caption"))
+            for position, img in enumerate(record_data.get("images", []))
+        ]
+    )
+
+
+def migrate_json_to_sqlite(records: Iterable[Tuple[str, dict]], conn: sqlite3.Connection,
+                           batch_size: int = 500) -> int:
+    """
+    JSON形式の記録をSQLiteデータベースへ移行
+
+    記録は batch_size件ごとにコミットする。
+
+    Args:
+        records: 移行元の (日付, 記録の辞書)（Storage.exclusive_snapshot() の iter_raw_records() など）
+        conn: 移行先のデータベース接続（スキーマ作成済み）
+        batch_size: 1トランザクションあたりの記録数
+
+    Returns:
+        移行した記録数
+    """
+    count = 0
+    conn.execute("BEGIN")
+    try:
+        for _, record_data in records:
+            _insert_record(conn, record_data)
+            count += 1
+            if count % batch_size == 0:
+                conn.execute("COMMIT")
+                conn.execute("BEGIN")
+        SQLiteStorage._touch(conn)
+        conn.execute("COMMIT")
+    except Exception:
+        conn.execute("ROLLBACK")
+        raise
+    return count
@@ -0,0 +1,250 @@
+"""継続の統計（連続記録日数・月ごとの記録数・気分の内訳・タグの使用回数）"""
+import threading
+from bisect import bisect_right, insort
+from datetime import date as Date
+from typing import Dict, Iterable, List, Optional, Tuple
+from . import serialization
+
+STATISTICS_VERSION = 1
+# 気分なしの集計キー
+NO_MOOD_KEY = "none"
+
+
+class RecordStatistics:
+    """
+    継続の統計を集計済みの値として保持し、記録の保存・削除のたびに差分だけを反映
+
+    連続して記録した日は (開始日, 終了日) の区間として持ち、1日の追加・削除では
+    前後の区間の結合・分割だけを行う。差分を求めるため、各日の気分とタグも保持する。
+    stats_file に保存し、保存時のストレージの世代番号が一致すれば次回はそのまま使う。
+    stats_file がNoneならファイルには保存せず、メモリ上だけで使う。
+    """
+
+    def __init__(self, stats_file: Optional[str]):
+        self.stats_file = stats_file
+        self._lock = threading.RLock()
+        self._clear()
+        # 保存した時点のストレージの世代番号と、その後に変更があったか
+        self.generation: Optional[int] = None
+        self._dirty = False
+
+    def _clear(self):
+        """全ての集計を空にする"""
+        # 日付 → (気分, タグ)
+        self._entries: Dict[str, Tuple[Optional[str], List[str]]] = {}
+        self._months: Dict[str, int] = {}
+        self._moods: Dict[str, int] = {}
+        self._tags: Dict[str, int] = {}
+        # 連続して記録した区間（通日）: 開始日の昇順リスト、開始日 → 終了日、区間の長さ → 区間の数
+        self._run_starts: List[int] = []
+        self._run_ends: Dict[int, int] = {}
+        self._run_lengths: Dict[int, int] = {}
+
+    @property
+    def dirty(self) -> bool:
+        """保存していない変更があるか"""
+        return self._dirty
+
+    # --- 読み込み・保存 ---
+
+    def load(self, generation: Optional[int]) -> bool:
+        """
+        保存した集計を読み込み
+
+        Args:
+            generation: 現在のストレージの世代番号
+
+        Returns:
+            読み込めたか（ファイルがない・壊れている・世代番号が異なる場合はFalse）
+        """
+        if self.stats_file is None:
+            return False
+        try:
+            data = serialization.load_file(self.stats_file)
+        except FileNotFoundError:
+            return False
+        except Exception as e:
+            print(f"統計読み込みエラー: {e}")
+            return False
+        if data.get("version") != STATISTICS_VERSION or generation is None or data.get("generation") != generation:
+            return False
+
+        with self._lock:
+            self._clear()
+            self._entries = {date: (entry[0], entry[1]) for date, entry in data["entries"].items()}
+            self._months = data["months"]
+            self._moods = data["moods"]
+            self._tags = data["tags"]
+            for start, end in data["runs"]:
+                self._add_run(start, end)
+            self.generation = generation
+            self._dirty = False
+        return True
+
+    def save(self, generation: Optional[int]):
+        """集計をファイルに保存（世代番号は次回の読み込み時の照合用）"""
+        with self._lock:
+            self.generation = generation
+            self._dirty = False
+            if self.stats_file is None:
+                return
+            data = {
+                "version": STATISTICS_VERSION,
+                "generation": generation,
+                "entries": {date: [mood, tags] for date, (mood, tags) in self._entries.items()},
+                "months": self._months,
+                "moods": self._moods,
+                "tags": self._tags,
+                "runs": [[start, self._run_ends[start]] for start in self._run_starts]
+            }
+        try:
+            serialization.dump_file(self.stats_file, data, atomic=True)
+        except Exception as e:
+            print(f"統計保存エラー: {e}")
+
+    # --- 更新 ---
+
+    def rebuild(self, raw_records: Iterable[Tuple[str, dict]], generation: Optional[int] = None):
+        """保存形式の記録 (日付, 辞書) から全ての集計を作り直す"""
+        with self._lock:
+            self._clear()
+            for date, record_data in raw_records:
+                self._add(date, record_data.get("mood"), list(record_data.get("tags", ())))
+            self.generation = generation
+            self._dirty = True
+
+    def apply(self, date: str, record_data: Optional[dict]):
+        """
+        1件の記録の変更を反映
+
+        Args:
+            date: 記録の日付
+            record_data: 保存形式の辞書（Noneなら削除）
+        """
+        with self._lock:
+            if date in self._entries:
+                self._remove(date)
+            if record_data is not None:
+                self._add(date, record_data.get("mood"), list(record_data.get("tags", ())))
+            self._dirty = True
+
+    @staticmethod
+    def _count(counts: Dict[str, int], key: str, delta: int):
+        """件数を増減（0になったキーは削除）"""
+        value = counts.get(key, 0) + delta
+        if value:
+            counts[key] = value
+        else:
+            counts.pop(key, None)
+
+    def _add(self, date: str, mood: Optional[str], tags: List[str]):
+        """1日分の記録を集計に加える"""
+        self._entries[date] = (mood, tags)
+        self._count(self._months, date[:7], 1)
+        self._count(self._moods, mood or NO_MOOD_KEY, 1)
+        for tag in tags:
+            self._count(self._tags, tag, 1)
+
+        ordinal = Date.fromisoformat(date).toordinal()
+        start, end = ordinal, ordinal
+        index = bisect_right(self._run_starts, ordinal - 1) - 1
+        if index >= 0 and self._run_ends[self._run_starts[index]] == ordinal - 1:
+            start = self._run_starts[index]
+            self._remove_run(start)
+        if ordinal + 1 in self._run_ends:
+            end = self._run_ends[ordinal + 1]
+            self._remove_run(ordinal + 1)
+        self._add_run(start, end)
+
+    def _remove(self, date: str):
+        """1日分の記録を集計から除く"""
+        mood, tags = self._entries.pop(date)
+        self._count(self._months, date[:7], -1)
+        self._count(self._moods, mood or NO_MOOD_KEY, -1)
+        for tag in tags:
+            self._count(self._tags, tag, -1)
+
+        ordinal = Date.fromisoformat(date).toordinal()
+        start = self._run_starts[bisect_right(self._run_starts, ordinal) - 1]
+        end = self._run_ends[start]
+        self._remove_run(start)
+        if start < ordinal:
+            self._add_run(start, ordinal - 1)
+        if ordinal < end:
+            self._add_run(ordinal + 1, end)
+
+    def _add_run(self, start: int, end: int):
+        """連続区間を追加"""
+        insort(self._run_starts, start)
+        self._run_ends[start] = end
+        self._count(self._run_lengths, end - start + 1, 1)
+
+    def _remove_run(self, start: int):
+        """連続区間を削除"""
+        end = self._run_ends.pop(start)
+        self._run_starts.pop(bisect_right(self._run_starts, start) - 1)
+        self._count(self._run_lengths, end - start + 1, -1)
+
+    # --- 集計値 ---
+
+    @property
+    def total_records(self) -> int:
+        """記録の数"""
+        return len(self._entries)
+
+    def current_streak(self, today: Optional[Date] = None) -> int:
+        """今日まで連続して記録した日数（今日がまだなら昨日まで）"""
+        ordinal = (today or Date.today()).toordinal()
+        with self._lock:
+            for day in (ordinal, ordinal - 1):
+                index = bisect_right(self._run_starts, day) - 1
+                if index >= 0:
+                    start = self._run_starts[index]
+                    if self._run_ends[start] >= day:
+                        return day - start + 1
+            return 0
+
+    def longest_streak(self) -> int:
+        """最も長く連続して記録した日数"""
+        with self._lock:
+            return max(self._run_lengths, default=0)
+
+    def entries_by_month(self) -> Dict[str, int]:
+        """月ごとの記録の数 {"YYYY-MM": 件数}（昇順）"""
+        with self._lock:
+            return dict(sorted(self._months.items()))
+
+    def mood_counts(self) -> Dict[Optional[str], int]:
+        """気分ごとの記録の数（気分なしはキーNone）"""
+        with self._lock:
+            return {None if mood == NO_MOOD_KEY else mood: count for mood, count in self._moods.items()}
+
+    def tag_counts(self, limit: Optional[int] = None) -> Dict[str, int]:
+        """タグごとの使用回数（多い順）"""
+        with self._lock:
+            pairs = sorted(self._tags.items(), key=lambda pair: (-pair[1], pair[0]))
+        return dict(pairs[:limit] if limit is not None else pairs)
+
+    def snapshot_state(self) -> dict:
+        """比較用に全ての集計値を取得"""
+        with self._lock:
+            return {
+                "entries": {date: [mood, list(tags)] for date, (mood, tags) in self._entries.items()},
+                "months": dict(self._months),
+                "moods": dict(self._moods),
+                "tags": dict(self._tags),
+                "runs": [[start, self._run_ends[start]] for start in self._run_starts]
+            }
+
+    def verify(self, raw_records: Iterable[Tuple[str, dict]]) -> List[str]:
+        """
+        記録から作り直した集計と比べる
+
+        Returns:
+            一致しなかった集計の名前（一致すれば空）
+        """
+        fresh = RecordStatistics(None)
+        fresh.rebuild(raw_records)
+        expected = fresh.snapshot_state()
+        actual = self.snapshot_state()
+        return [name for name in expected if expected[name] != actual[name]]
@@ -2,64 +2,345 @@
 import json
 import os
 import shutil
-from typing import Dict, Optional, List
+import threading
+from bisect import bisect_left, bisect_right
+from contextlib import contextmanager
+from typing import Callable, Dict, Iterable, Optional, List, Mapping, Iterator, Set, Tuple
 from datetime import datetime
 from .record import Record
+from .record_map import LazyRecordMap
+from .journal import RecordJournal
+from .span_index import RecordSpanIndex
+from .field_index import RecordFieldIndex
+from .search_index import RecordSearchIndex, SearchResult
+from .events import ChangeEvent, ChangeEventBus, RECORD_CREATED, RECORD_UPDATED, RECORD_DELETED
+from .file_lock import InterProcessLock, read_generation, write_generation
+from .snapshot import RecordSnapshot
+from .archive import ARCHIVE_FORMATS, archive_filename, read_archive, validate_format, write_archive
+from . import serialization
+
+
+class RecordConflictError(Exception):
+    """保存しようとした記録が、読み込んだ後に別の処理で更新されていた"""
+
+    def __init__(self, date: str):
+        super().__init__(f"{date} の記録は別の処理で更新されています")
+        self.date = date
 
 
 class Storage:
     """JSON形式でのデータ保存・読み込みを管理"""
 
-    def __init__(self, data_dir: str = "data"):
+    # ジャーナルをrecords.jsonへ畳み込む閾値
+    JOURNAL_MAX_BYTES = 1024 * 1024  # 1MB
+    JOURNAL_MAX_ENTRIES = 500
+
+    def __init__(self, data_dir: str = "data", use_journal: bool = False,
+                 serialization_profile: str = serialization.DEFAULT_PROFILE,
+                 write_behind: bool = False,
+                 on_write_error: Optional[Callable[[Exception], None]] = None,
+                 archive_format: Optional[str] = None, archive_keep_years: int = 1):
+        """
+        Args:
+            data_dir: データディレクトリ
+            use_journal: ジャーナルモードを使用するか
+            serialization_profile: records.json の書き込み形式（"pretty", "compact", "fast"）。
+                読み込み時はどの形式でも自動的に読める
+            write_behind: 遅延書き込みモードを使用するか。変更はメモリ上に反映してすぐに戻り、
+                書き込みスレッドがまとめてファイルに書き込む。終了前に flush() を呼ぶこと
+            on_write_error: 遅延書き込みが失敗した時、または未書き込みの変更が他のプロセスの変更と
+                衝突して破棄された時（RecordConflictError）に呼ばれる関数（書き込みスレッドから呼ばれることがある）
+            archive_format: 過去の年を圧縮アーカイブへ移す形式（"xz", "gz"）。Noneならアーカイブしない
+            archive_keep_years: records.json に残す年数（今年を含む）
+        """
         self.data_dir = data_dir
+        self.serialization_profile = serialization.validate_profile(serialization_profile)
         self.records_file = os.path.join(data_dir, "records.json")
         self.backup_file = self.records_file + ".bak"
+
+        # 複数プロセスからの同時アクセス対策: 読み込み・変更・書き込みの間はロックファイルをロックし、
+        # 書き込みのたびに世代番号を進める（他のプロセスは世代番号を比べるだけでキャッシュを検証できる）
+        self.lock_file = os.path.join(data_dir, "records.lock")
+        self.generation_file = os.path.join(data_dir, "records.generation")
+        self._process_lock = InterProcessLock(self.lock_file)
+
+        # ジャーナルモード: 変更は records.journal に1行ずつ追記し、
+        # 閾値を超えたらバックグラウンドでスナップショットへ圧縮する
+        self.use_journal = use_journal
+        self.journal = RecordJournal(os.path.join(data_dir, "records.journal"))
+        self._lock = threading.RLock()
+        self._compaction_thread: Optional[threading.Thread] = None
+
+        # 実行中のトランザクション（作業用データと未確定の変更）
+        self._transaction: Optional[dict] = None
+
+        # 遅延書き込みモード: 未書き込みの間はメモリ上のデータが最新
+        self.write_behind = write_behind
+        self.on_write_error = on_write_error
+        self._writer_thread: Optional[threading.Thread] = None
+        self._write_requested = threading.Event()
+        self._write_idle = threading.Condition(self._lock)
+        self._write_pending = False
+        self._writing = False
+        self._write_error: Optional[Exception] = None
+        # ジャーナルへ追記待ちの変更（日付ごとに最新の1件）と、条件付きの保存で照合する記録の更新日時
+        # （書き込みスレッドがロックファイルの排他ロック中にファイルの内容と照合する）
+        self._pending_entries: Dict[str, dict] = {}
+        self._pending_bases: Dict[str, Optional[str]] = {}
+        # 書き込みスレッドが書き込み中の変更（失敗したら未書き込みの変更に戻す）
+        self._inflight_entries: Dict[str, dict] = {}
+        self._inflight_bases: Dict[str, Optional[str]] = {}
+        self.queued_changes = 0
+        self.background_writes = 0
+
+        # パース済みデータのキャッシュ（ファイルのmtime/サイズ/inodeで無効化）
+        self._cache: Optional[dict] = None
+        self._cache_signature: Optional[tuple] = None
+        # このプロセスが最後に読み込んだ・書き込んだ時点のファイル識別情報
+        self._disk_signature: Optional[tuple] = None
+        self.cache_hits = 0
+        self.cache_misses = 0
+
+        # 単一記録の部分読み込み用索引（キャッシュが無効な時に使用）
+        self.span_index = RecordSpanIndex(self.records_file)
+        self.index_reads = 0
+
+        # タグ・気分の転置索引（records.json と同時に records.index.json へ保存）
+        self.field_index = RecordFieldIndex(os.path.join(data_dir, "records.index.json"))
+
+        # 全文検索索引（初回の検索時に読み込み、以降は保存・削除のたびに更新）
+        self.search_index = RecordSearchIndex(os.path.join(data_dir, "records.search.json"))
+        # 最後に索引と同期した時の記録辞書と変更回数
+        self._search_synced: Optional[tuple] = None
+
+        # 変更イベントの通知（トランザクション中の変更は確定時にまとめて通知）
+        self.events = ChangeEventBus()
+
+        # スナップショット・書き込みスレッドと共有中の記録辞書（次の変更の前に複製する）
+        self._shared_records: Optional[dict] = None
+
+        # 範囲検索用のソート済み日付リスト（元の記録辞書と変更回数で有効性を判定）
+        self._sorted_dates: List[str] = []
+        self._sorted_dates_source: Optional[dict] = None
+        self._sorted_dates_version = -1
+        self._change_count = 0
+        # このインスタンスが書き込んだ世代番号（他のプロセスの書き込みと区別するため）
+        self.written_generations: Set[int] = set()
+
+        # 過去の年のアーカイブ: 閉じた年は archive/YYYY.json.xz などへ移し、
+        # その年を含む範囲を読む時だけメモリ上の記録辞書へ読み込む
+        self.archive_format = validate_format(archive_format) if archive_format else None
+        self.archive_keep_years = archive_keep_years
+        self.archive_dir = os.path.join(data_dir, "archive")
+        self._loaded_archive_source: Optional[dict] = None
+        self._loaded_archive_years: Set[str] = set()
+        self.archive_loads = 0
+
         self._ensure_data_structure()
+        if self.archive_format:
+            self.archive_closed_years()
 
     def _ensure_data_structure(self):
         """データディレクトリとファイルの存在を確認・初期化"""
         os.makedirs(self.data_dir, exist_ok=True)
 
-        if not os.path.exists(self.records_file):
-            self._write_data({
-                "version": "1.0",
-                "records": {},
-                "metadata": {
-                    "total_records": 0,
-                    "first_record_date": None,
-                    "last_updated": datetime.now().isoformat()
-                }
-            })
+        with self._process_lock.exclusive():
+            if not os.path.exists(self.records_file):
+                if self.use_journal:
+                    self._write_snapshot(self._empty_data())
+                else:
+                    self._write_data(self._empty_data())
+            elif not self.use_journal and self.journal.exists():
+                # ジャーナルモードで残された変更を通常形式へ取り込む
+                data = self._load_data()
+                self._write_data(data)
+                self.journal.clear()
+                self.clear_cache()
+
+    @staticmethod
+    def _empty_data() -> dict:
+        """空のデータ構造を生成"""
+        return {
+            "version": "1.0",
+            "records": {},
+            "metadata": {
+                "total_records": 0,
+                "first_record_date": None,
+                "last_updated": datetime.now().isoformat(),
+                "generation": 0
+            }
+        }
+
+    def _file_signature(self) -> Optional[tuple]:
+        """キャッシュ検証用のファイル識別情報（mtime, サイズ, inode と世代番号）を取得"""
+        paths = [self.records_file]
+        if self.use_journal:
+            paths += [self.journal.path, self.journal.rotated_path]
+
+        signature = []
+        for path in paths:
+            try:
+                stat = os.stat(path)
+            except OSError:
+                if path == self.records_file:
+                    return None
+                signature.append(None)
+                continue
+            signature.append((stat.st_mtime_ns, stat.st_size, stat.st_ino))
+        # 同じサイズの書き込みがmtimeの分解能内に重なっても世代番号で区別できる
+        signature.append(read_generation(self.generation_file))
+        return tuple(signature)
+
+    def _next_generation(self, data: dict) -> int:
+        """次の世代番号をメタデータに記録して返す（排他ロック中に呼ぶ）"""
+        metadata = data.setdefault("metadata", {})
+        current = read_generation(self.generation_file)
+        if current is None:
+            current = metadata.get("generation", 0)
+        metadata["generation"] = current + 1
+        return current + 1
+
+    def _store_generation(self, generation: int):
+        """書き込みを終えた世代番号を保存（排他ロック中に呼ぶ）"""
+        write_generation(self.generation_file, generation)
+        self.written_generations.add(generation)
+
+    @contextmanager
+    def _mutation_lock(self):
+        """
+        変更用のロック
+
+        他のプロセスの書き込みと重ならないようロックファイルも排他ロックする。
+        遅延書き込みモードではロックファイルは取らない（他のプロセスの変更との照合・取り込みは
+        書き込みスレッドがファイルへ書き込む直前に行う）。
+        """
+        if self.write_behind:
+            with self._lock:
+                yield
+            return
+        with self._lock, self._process_lock.exclusive():
+            yield
+
+    def _merge_disk_changes(self):
+        """
+        他のプロセスが書き込んだ内容に未書き込みの変更を重ねてキャッシュにする（書き込みスレッドから呼ぶ）
+
+        ファイルは共有ロック中に読み込み、このスレッドのロックは重ねる間だけ取る。
+        条件付きの保存のうち、照合する版より新しい版を他のプロセスが書き込んでいた日付は、
+        上書きせずに他のプロセスの内容を残し、RecordConflictError として on_write_error に通知する。
+        """
+        with self._process_lock.shared():
+            signature = self._file_signature()
+            merged = self._load_data()
+
+        with self._lock:
+            records = merged.setdefault("records", {})
+            conflicts = []
+            # 書き込み中の変更（書き込み済みならファイルの内容と一致する）、未書き込みの変更の順に重ねる
+            for entries, bases in ((self._inflight_entries, self._inflight_bases),
+                                   (self._pending_entries, self._pending_bases)):
+                for date, entry in list(entries.items()):
+                    current = (records.get(date) or {}).get("updated_at")
+                    target = entry["record"].get("updated_at") if entry["op"] == "save" else None
+                    if current == target:
+                        continue
+                    if date in bases and current != bases[date]:
+                        conflicts.append(date)
+                        del entries[date]
+                        del bases[date]
+                        continue
+                    RecordJournal.apply_entry(merged, entry)
+            if not self._pending_entries:
+                self._write_pending = False
+            self._update_metadata(merged)
+            self._cache = merged
+            self._disk_signature = signature
+            self._change_count += 1
+            for date in conflicts:
+                self.search_index.apply(date, records.get(date))
+
+        for date in conflicts:
+            error = RecordConflictError(date)
+            print(f"書き込み競合エラー: {error}")
+            if self.on_write_error:
+                self.on_write_error(error)
+            self.events.publish(ChangeEvent(RECORD_UPDATED if records.get(date) else RECORD_DELETED, date))
 
     def _read_data(self) -> dict:
-        """JSONファイルからデータを読み込み"""
+        """データを取得（ファイルが変更されていなければキャッシュを返す）"""
+        with self._lock:
+            if self._transaction is not None:
+                return self._transaction["data"]
+            if self._has_unwritten_changes():
+                self.cache_hits += 1
+                return self._cache
+
+            signature = self._file_signature()
+            if self._cache is not None and signature is not None and signature == self._cache_signature:
+                self.cache_hits += 1
+                return self._cache
+
+            self.cache_misses += 1
+            # 他のプロセスの書き込み途中のファイルを読まないよう共有ロックを取る
+            with self._process_lock.shared():
+                signature = self._file_signature()
+                data = self._load_data()
+            if signature is not None:
+                self._cache = data
+                self._cache_signature = signature
+                self._disk_signature = signature
+                self.field_index.attach(data.get("records", {}), signature)
+            return data
+
+    def _cache_is_valid(self) -> bool:
+        """キャッシュがファイルの現在の内容と一致しているか確認"""
+        if self._has_unwritten_changes():
+            return True
+        return self._cache is not None and self._file_signature() == self._cache_signature
+
+    def _has_unwritten_changes(self) -> bool:
+        """遅延書き込み待ち・書き込み中の変更があるか確認"""
+        return self._write_pending or self._writing
+
+    def _load_data(self) -> dict:
+        """JSONファイルからデータを読み込み（未反映のジャーナルがあれば再適用）"""
+        if self.use_journal or self.journal.exists():
+            return self._load_journaled_data()
+
         try:
-            with open(self.records_file, 'r', encoding='utf-8') as f:
-                return json.load(f)
+            return serialization.load_file(self.records_file)
         except (json.JSONDecodeError, FileNotFoundError) as e:
             print(f"データ読み込みエラー: {e}")
             # バックアップから復元を試みる
             if os.path.exists(self.backup_file):
                 print("バックアップから復元を試みます...")
                 try:
-                    with open(self.backup_file, 'r', encoding='utf-8') as f:
-                        return json.load(f)
+                    return serialization.load_file(self.backup_file)
                 except Exception as backup_error:
                     print(f"バックアップ復元失敗: {backup_error}")
 
             # 初期化データを返す
-            return {
-                "version": "1.0",
-                "records": {},
-                "metadata": {
-                    "total_records": 0,
-                    "first_record_date": None,
-                    "last_updated": datetime.now().isoformat()
-                }
-            }
+            return self._empty_data()
 
-    def _write_data(self, data: dict):
-        """データをJSONファイルに書き込み（バックアップ作成）"""
+    def _load_journaled_data(self) -> dict:
+        """スナップショットを読み込み、ジャーナルを順に適用"""
+        try:
+            data = serialization.load_file(self.records_file)
+        except (json.JSONDecodeError, FileNotFoundError) as e:
+            # スナップショットはアトミックに置き換えるため通常は発生しない
+            print(f"データ読み込みエラー: {e}")
+            data = self._empty_data()
+
+        last_timestamp = self.journal.replay(data)
+        if last_timestamp is not None:
+            self._update_metadata(data, last_timestamp)
+        generation = read_generation(self.generation_file)
+        if generation is not None:
+            data["metadata"]["generation"] = generation
+        return data
+
+    def _write_file(self, data: dict) -> Dict[str, Tuple[int, int]]:
+        """records.json を書き込み（バックアップ作成）、各記録のバイト範囲を返す"""
         # 既存ファイルをバックアップ
         if os.path.exists(self.records_file):
             try:
@@ -69,79 +350,819 @@ class Storage:
 
         # データを書き込み
         try:
-            with open(self.records_file, 'w', encoding='utf-8') as f:
-                json.dump(data, f, ensure_ascii=False, indent=2)
+            content, spans = serialization.dumps_document(self._hot_document(data), self.serialization_profile)
+            with open(self.records_file, 'wb') as f:
+                f.write(content)
         except Exception as e:
             print(f"データ書き込みエラー: {e}")
             # バックアップから復元
             if os.path.exists(self.backup_file):
                 shutil.copy2(self.backup_file, self.records_file)
             raise
+        return spans
+
+    def _write_data(self, data: dict):
+        """データをJSONファイルに書き込み（バックアップ作成、排他ロック中に呼ぶ）"""
+        generation = self._next_generation(data)
+        try:
+            spans = self._write_file(data)
+        except Exception:
+            self.clear_cache()
+            raise
+        self._store_generation(generation)
+
+        # 書き込んだ内容をそのままキャッシュとして保持
+        self._cache = data
+        self._cache_signature = self._file_signature()
+        self._disk_signature = self._cache_signature
+        self.span_index.update(spans)
+        if self.field_index.is_built_for(data.get("records", {})):
+            self.field_index.save(self._cache_signature)
+
+    def _write_snapshot(self, data: dict):
+        """一時ファイル経由でrecords.jsonをアトミックに置き換え"""
+        serialization.dump_file(self.records_file, self._hot_document(data), self.serialization_profile, atomic=True)
+
+    def _hot_document(self, data: dict) -> dict:
+        """records.json に書き込む内容（読み込み済みのアーカイブの記録で変更のないものは除く）"""
+        archives = self._archives(data)
+        records = data.get("records", {})
+        if not archives or not any(date[:4] in archives for date in records):
+            return data
+        hot = {}
+        for date, record_data in records.items():
+            archived = archives.get(date[:4])
+            if archived is not None and archived["versions"].get(date, ()) == record_data.get("updated_at"):
+                continue
+            hot[date] = record_data
+        document = dict(data)
+        document["records"] = hot
+        return document
+
+    @staticmethod
+    def _archives(data: dict) -> dict:
+        """アーカイブ済みの年 {年: {"file": パス, "versions": {日付: updated_at}}}"""
+        return data.get("metadata", {}).get("archives") or {}
+
+    def _archive_file_exists(self, year: str) -> bool:
+        """指定年のアーカイブファイルがあるか確認"""
+        return any(
+            os.path.exists(os.path.join(self.archive_dir, archive_filename(year, archive_format)))
+            for archive_format in ARCHIVE_FORMATS
+        )
+
+    def _load_archived_years(self, data: dict, years: Iterable[str]):
+        """アーカイブ済みの年の記録をメモリ上の記録辞書へ読み込む（読み込み済みの年は除く）"""
+        archives = self._archives(data)
+        if not archives:
+            return
+        records = data["records"]
+        if self._loaded_archive_source is not records:
+            self._loaded_archive_source = records
+            self._loaded_archive_years = set()
+
+        for year in years:
+            if year not in archives or year in self._loaded_archive_years:
+                continue
+            records = self._writable_records(data)
+            path = os.path.join(self.data_dir, archives[year]["file"])
+            try:
+                archived = read_archive(path)
+            except Exception as e:
+                print(f"アーカイブ読み込みエラー: {e}")
+                raise
+            # records.json 側に同じ日付があればそちらが新しい（タグ・気分索引はアーカイブ済みの記録も含む）
+            for date, record_data in archived.items():
+                records.setdefault(date, record_data)
+            self._loaded_archive_years.add(year)
+            self._change_count += 1
+            self.archive_loads += 1
+
+    def _load_archives_in_range(self, data: dict, start_date: Optional[str], end_date: Optional[str]):
+        """日付範囲に含まれるアーカイブ済みの年を読み込む"""
+        archives = self._archives(data)
+        if archives:
+            self._load_archived_years(data, [
+                year for year in archives
+                if (not start_date or year >= start_date[:4]) and (not end_date or year <= end_date[:4])
+            ])
+
+    def _rewrite_all(self, data: dict):
+        """records.json 全体を書き直す（ジャーナルモードではジャーナルも空にする。排他ロック中に呼ぶ）"""
+        if not self.use_journal:
+            self._write_data(data)
+            return
+        generation = self._next_generation(data)
+        self._write_snapshot(data)
+        self.journal.clear()
+        self._store_generation(generation)
+        self._cache = data
+        self._cache_signature = self._file_signature()
+        self._disk_signature = self._cache_signature
+
+    def archive_closed_years(self, keep_years: Optional[int] = None) -> List[str]:
+        """
+        閉じた年の記録を圧縮アーカイブへ移す
+
+        Args:
+            keep_years: records.json に残す年数（今年を含む）。Noneなら archive_keep_years
+
+        Returns:
+            アーカイブした年のリスト
+        """
+        if not self.archive_format:
+            raise ValueError("archive_format が指定されていません")
+        keep = self.archive_keep_years if keep_years is None else keep_years
+        cutoff = str(datetime.now().year - max(keep, 1) + 1)
+
+        with self._lock:
+            # 対象がなければファイルを読み直さない（読み込んだデータはキャッシュとして使われる）
+            current = self._read_data()
+            if not any(date[:4] < cutoff and date[:4] not in self._archives(current) for date in current["records"]):
+                return []
+            if self.write_behind:
+                self.flush()
+
+            with self._process_lock.exclusive():
+                data = self._load_data()
+                archives = dict(self._archives(data))
+                by_year: Dict[str, Dict[str, dict]] = {}
+                for date in [date for date in data["records"] if date[:4] < cutoff]:
+                    by_year.setdefault(date[:4], {})[date] = data["records"].pop(date)
+
+                for year, records in sorted(by_year.items()):
+                    if year in archives:
+                        # 前回の書き込みが中断して records.json に残っていた記録を既存のアーカイブへ重ねる
+                        previous = read_archive(os.path.join(self.data_dir, archives[year]["file"]))
+                        previous.update(records)
+                        records = previous
+                    relative_path = os.path.join("archive", archive_filename(year, self.archive_format))
+                    write_archive(os.path.join(self.data_dir, relative_path), dict(sorted(records.items())))
+                    archives[year] = {
+                        "file": relative_path.replace(os.sep, "/"),
+                        "versions": {date: record_data.get("updated_at") for date, record_data in records.items()}
+                    }
+
+                data["metadata"]["archives"] = archives
+                self._update_metadata(data)
+                self._keep_field_index(data)
+                self._rewrite_all(data)
+            return sorted(by_year)
+
+    def unarchive_year(self, year: str) -> bool:
+        """アーカイブした年の記録を records.json へ戻す（アーカイブがなければFalse）"""
+        with self._lock:
+            if self.write_behind:
+                self.flush()
+
+            with self._process_lock.exclusive():
+                data = self._load_data()
+                archives = dict(self._archives(data))
+                entry = archives.pop(year, None)
+                if entry is None:
+                    return False
+                path = os.path.join(self.data_dir, entry["file"])
+                archived = read_archive(path)
+                for date, record_data in archived.items():
+                    data["records"].setdefault(date, record_data)
+                data["metadata"]["archives"] = archives
+                self._update_metadata(data)
+                self._keep_field_index(data)
+                self._rewrite_all(data)
+                os.remove(path)
+
+            if self._transaction is not None:
+                # 作業用データにも反映する（メタデータは確定済みのデータと共有しているため複製する）
+                working = self._transaction["data"]
+                working_records = self._writable_records(working)
+                for date, record_data in archived.items():
+                    working_records.setdefault(date, record_data)
+                working["metadata"] = dict(working.get("metadata", {}))
+                working["metadata"]["archives"] = archives
+                self._change_count += 1
+            return True
+
+    def _keep_field_index(self, data: dict):
+        """アーカイブの移動前後で内容の変わらない記録辞書へタグ・気分索引を対応付け直す"""
+        if self._cache is not None and self.field_index.is_built_for(self._cache.get("records", {})):
+            self.field_index.rebind(data["records"])
+
+    @contextmanager
+    def transaction(self):
+        """
+        複数の変更を1回の書き込みにまとめるトランザクション
+
+        ブロック内の読み込みは未確定の変更を反映し、正常終了時にまとめて書き込む。
+        例外が発生した場合は全ての変更を破棄する。入れ子にした場合は最も外側でのみ確定する。
+        ブロックの間は他のプロセスからの変更を待たせる（遅延書き込みモードでは書き込み時に照合する）。
+        """
+        with self._mutation_lock(), self.events.hold():
+            if self._transaction is not None:
+                yield self
+                return
+
+            data = self._read_data()
+            working = dict(data)
+            working["records"] = dict(data.get("records", {}))
+            if self._loaded_archive_source is data.get("records"):
+                self._loaded_archive_source = working["records"]
+            self._transaction = {"data": working, "entries": [], "bases": {}, "dates": set()}
+            try:
+                yield self
+            except BaseException:
+                self._transaction = None
+                raise
+
+            transaction = self._transaction
+            entries = transaction["entries"]
+            self._transaction = None
+            if entries:
+                # 確定した変更の差分だけを索引に反映し、作業用データに対応付け直す
+                original = data.get("records", {})
+                if self.field_index.is_built_for(original):
+                    for date in {entry["date"] for entry in entries}:
+                        self.field_index.apply(date, original.get(date), working["records"].get(date))
+                    self.field_index.rebind(working["records"])
+                self._update_metadata(working)
+                self._persist_changes(working, entries, transaction["bases"])
 
-    def _update_metadata(self, data: dict):
+    @staticmethod
+    def _track_base(bases: Dict[str, Optional[str]], date: str, base: Optional[str], checked: bool, pending: bool):
+        """
+        変更した日付の照合内容を更新
+
+        Args:
+            bases: {日付: 照合する記録の更新日時}（照合しない日付は含まない）
+            checked: 条件付きの保存か
+            pending: その日付にすでに未確定・未書き込みの変更があるか（あれば最初の変更の照合を引き継ぐ）
+        """
+        if not checked:
+            bases.pop(date, None)
+        elif not pending:
+            bases[date] = base
+
+    def _commit_change(self, data: dict, entry: dict, base: Optional[str] = None, checked: bool = False):
+        """
+        変更を確定（トランザクション中は終了時までまとめて保留）
+
+        Args:
+            base: 条件付きの保存で照合する記録の更新日時（記録がなければNone）
+            checked: 条件付きの保存か（遅延書き込みモードでは書き込み直前にファイルの内容と照合する）
+        """
+        if self._transaction is not None:
+            dates = self._transaction["dates"]
+            self._track_base(self._transaction["bases"], entry["date"], base, checked, entry["date"] in dates)
+            dates.add(entry["date"])
+            self._transaction["entries"].append(entry)
+            return
+        self._update_metadata(data)
+        self._persist_changes(data, [entry], {entry["date"]: base} if checked else {})
+
+    def _persist_changes(self, data: dict, entries: List[dict], bases: Dict[str, Optional[str]]):
+        """変更を永続化（ジャーナルモードでは追記、通常はファイル全体を書き込み）"""
+        if self.write_behind:
+            self._queue_write(data, entries, bases)
+            return
+
+        if not self.use_journal:
+            self._write_data(data)
+            return
+
+        generation = self._next_generation(data)
+        for entry in entries:
+            entry["ts"] = data["metadata"]["last_updated"]
+        try:
+            self.journal.append(*entries)
+        except Exception as e:
+            print(f"ジャーナル書き込みエラー: {e}")
+            self.clear_cache()
+            raise
+        self._store_generation(generation)
+
+        self._cache = data
+        self._cache_signature = self._file_signature()
+        self._disk_signature = self._cache_signature
+        self._maybe_compact()
+
+    def _queue_write(self, data: dict, entries: List[dict], bases: Dict[str, Optional[str]]):
+        """変更をメモリ上で確定し、書き込みスレッドに書き込みを依頼"""
+        pending = set(self._pending_entries)
+        for entry in entries:
+            date = entry["date"]
+            entry["ts"] = data["metadata"]["last_updated"]
+            # 同じ日付への連続した変更は最後の1件だけを書き込む
+            self._pending_entries.pop(date, None)
+            self._pending_entries[date] = entry
+        for date in {entry["date"] for entry in entries}:
+            self._track_base(self._pending_bases, date, bases.get(date), date in bases, date in pending)
+
+        self._cache = data
+        self._write_pending = True
+        self.queued_changes += len(entries)
+        if self._writer_thread is None or not self._writer_thread.is_alive():
+            self._writer_thread = threading.Thread(target=self._writer_loop, daemon=True)
+            self._writer_thread.start()
+        self._write_requested.set()
+
+    def _writer_loop(self):
+        """書き込みスレッド: 依頼のたびに、それまでの変更を1回の書き込みにまとめる"""
+        while True:
+            self._write_requested.wait()
+            with self._lock:
+                self._write_requested.clear()
+                if not self._write_pending:
+                    continue
+                self._inflight_entries, self._inflight_bases = self._pending_entries, self._pending_bases
+                self._pending_entries = {}
+                self._pending_bases = {}
+                self._write_pending = False
+                self._writing = True
+
+            # ファイルへの書き込み中も他のスレッドは読み書きできる
+            try:
+                written = self._write_inflight_changes()
+            except Exception as e:
+                with self._lock:
+                    # 失敗した変更は次回の書き込みで再試行（その後の変更を優先し、照合は先の変更のものを引き継ぐ）
+                    bases = dict(self._inflight_bases)
+                    for date in self._pending_entries:
+                        self._track_base(bases, date, self._pending_bases.get(date),
+                                         date in self._pending_bases, date in self._inflight_entries)
+                    self._pending_entries = {**self._inflight_entries, **self._pending_entries}
+                    self._pending_bases = bases
+                    self._inflight_entries = {}
+                    self._inflight_bases = {}
+                    self._write_pending = bool(self._pending_entries)
+                    self._writing = False
+                    self._write_error = e
+                    self._write_idle.notify_all()
+                print(f"バックグラウンド書き込みエラー: {e}")
+                if self.on_write_error:
+                    self.on_write_error(e)
+                continue
+
+            with self._lock:
+                self._writing = False
+                self._write_error = None
+                self._inflight_entries = {}
+                self._inflight_bases = {}
+                if written:
+                    self.background_writes += 1
+                    if self.use_journal:
+                        self._maybe_compact()
+                self._write_idle.notify_all()
+
+    def _write_inflight_changes(self) -> bool:
+        """
+        書き込み中の変更をファイルに書き込む（書き込みスレッドから呼ぶ）
+
+        変換と一時ファイルへの書き込みはロックなしで済ませ、ロックファイルの排他ロックは
+        ファイルの置き換え（ジャーナルモードでは追記）の間だけ取る。
+        他のプロセスが先に書き込んでいれば、その内容を取り込んで照合し直してからやり直す。
+
+        Returns:
+            書き込んだか（全ての変更が他のプロセスの変更と衝突して破棄された場合はFalse）
+        """
+        while True:
+            with self._lock:
+                stale = self._file_signature() != self._disk_signature
+            if stale:
+                self._merge_disk_changes()
+
+            with self._lock:
+                if not self._inflight_entries:
+                    return False
+                data = self._cache
+                expected = self._disk_signature
+                generation = self._next_generation(data)
+                # 記録辞書は複製せずに共有し、書き込み中の変更は複製した辞書に対して行う
+                snapshot = dict(data)
+                snapshot["metadata"] = dict(data["metadata"])
+                self._shared_records = data["records"]
+                entries = list(self._inflight_entries.values())
+
+            temp_path = None
+            try:
+                if not self.use_journal:
+                    content, spans = serialization.dumps_document(
+                        self._hot_document(snapshot), self.serialization_profile
+                    )
+                    temp_path = f"{self.records_file}.{os.getpid()}-{threading.get_ident()}.tmp"
+                    with open(temp_path, 'wb') as f:
+                        f.write(content)
+                        f.flush()
+                        os.fsync(f.fileno())
+
+                with self._lock:
+                    with self._process_lock.exclusive():
+                        if self._file_signature() != expected:
+                            # 変換中に他のプロセスが書き込んだ
+                            continue
+                        if self.use_journal:
+                            self.journal.append(*entries)
+                        else:
+                            self._replace_records_file(temp_path)
+                            temp_path = None
+                            self.span_index.update(spans)
+                        self._store_generation(generation)
+                        signature = self._file_signature()
+
+                    self._disk_signature = signature
+                    if not self._write_pending and self._cache is data:
+                        # メモリ上の内容とファイルが一致した
+                        self._cache_signature = signature
+                        if not self.use_journal and self.field_index.is_built_for(data.get("records", {})):
+                            self.field_index.save(signature)
+                    return True
+            finally:
+                if temp_path is not None and os.path.exists(temp_path):
+                    os.remove(temp_path)
+
+    def _replace_records_file(self, temp_path: str):
+        """一時ファイルで records.json を置き換え、置き換え前の内容を .bak に残す（排他ロック中に呼ぶ）"""
+        if os.path.exists(self.records_file):
+            backup_temp = f"{self.backup_file}.{os.getpid()}.tmp"
+            try:
+                # 置き換え前のファイルはハードリンクで残す（内容を複製しない）
+                if os.path.exists(backup_temp):
+                    os.remove(backup_temp)
+                os.link(self.records_file, backup_temp)
+                os.replace(backup_temp, self.backup_file)
+            except OSError:
+                try:
+                    shutil.copy2(self.records_file, self.backup_file)
+                except Exception as e:
+                    print(f"バックアップ作成警告: {e}")
+        os.replace(temp_path, self.records_file)
+
+    def flush(self, timeout: Optional[float] = None) -> bool:
+        """
+        未書き込みの変更が全てファイルに書き込まれるまで待つ
+
+        Args:
+            timeout: 最大待ち時間（秒）。Noneなら完了まで待つ
+
+        Returns:
+            全て書き込めたか（書き込みエラーやタイムアウトの場合はFalse）
+        """
+        with self._write_idle:
+            if self._has_unwritten_changes():
+                # 前回失敗した変更も再試行する
+                self._write_error = None
+                self._write_requested.set()
+                self._write_idle.wait_for(
+                    lambda: not self._writing and (not self._write_pending or self._write_error is not None),
+                    timeout
+                )
+            flushed = not self._has_unwritten_changes()
+            # 全文検索索引は保存・削除のたびには書き込まず、ここでまとめて保存する
+            if self.search_index.unsaved_changes:
+                self.search_index.save()
+        return flushed
+
+    def _maybe_compact(self):
+        """ジャーナルが閾値を超えていればバックグラウンドで圧縮"""
+        if (self.journal.entry_count < self.JOURNAL_MAX_ENTRIES
+                and self.journal.size_bytes() < self.JOURNAL_MAX_BYTES):
+            return
+        if self._compaction_thread and self._compaction_thread.is_alive():
+            return
+
+        self._compaction_thread = threading.Thread(target=self.compact, daemon=True)
+        self._compaction_thread.start()
+
+    def compact(self):
+        """ジャーナルをrecords.jsonへ畳み込む"""
+        # 他のプロセスの追記も含めるため、メモリ上のデータではなくファイルの内容から作る
+        with self._process_lock.exclusive():
+            before = self._file_signature()
+            snapshot = self._load_journaled_data()
+            self.journal.rotate()
+            try:
+                self._write_snapshot(snapshot)
+                self.journal.discard_rotated()
+            except Exception as e:
+                print(f"ジャーナル圧縮エラー: {e}")
+                return
+            after = self._file_signature()
+
+        with self._lock:
+            # 圧縮前のファイルと一致していたキャッシュは、圧縮後のファイルとも一致している
+            if self._disk_signature == before:
+                self._disk_signature = after
+            if self._cache_signature == before:
+                self._cache_signature = after
+
+    def wait_for_compaction(self):
+        """実行中のジャーナル圧縮の完了を待つ"""
+        thread = self._compaction_thread
+        if thread and thread.is_alive():
+            thread.join()
+
+    def clear_cache(self):
+        """キャッシュを破棄（次回アクセス時にファイルから再読み込み。未書き込みの変更がある場合は保持）"""
+        if self._has_unwritten_changes():
+            return
+        self._cache = None
+        self._cache_signature = None
+
+    def get_cache_stats(self) -> dict:
+        """キャッシュのヒット/ミス回数を取得"""
+        return {
+            "hits": self.cache_hits,
+            "misses": self.cache_misses,
+            "index_reads": self.index_reads,
+            "queued_changes": self.queued_changes,
+            "background_writes": self.background_writes
+        }
+
+    def _update_metadata(self, data: dict, updated_at: Optional[str] = None):
         """メタデータを更新"""
         records = data.get("records", {})
+        archives = self._archives(data)
+        total_records = len(records)
+        first_record_date = min(records.keys()) if records else None
+        for entry in archives.values():
+            # 読み込んでいないアーカイブの記録も数える
+            archived_dates = [date for date in entry["versions"] if date not in records]
+            total_records += len(archived_dates)
+            if archived_dates:
+                first_archived = min(archived_dates)
+                if first_record_date is None or first_archived < first_record_date:
+                    first_record_date = first_archived
         data["metadata"] = {
-            "total_records": len(records),
-            "first_record_date": min(records.keys()) if records else None,
-            "last_updated": datetime.now().isoformat()
+            "total_records": total_records,
+            "first_record_date": first_record_date,
+            "last_updated": updated_at or datetime.now().isoformat(),
+            "generation": data.get("metadata", {}).get("generation", 0)
         }
+        if archives:
+            data["metadata"]["archives"] = archives
+
+    def _lookup_records_data(self, dates: List[str]) -> Dict[str, dict]:
+        """
+        指定した日付の記録の辞書を取得
+
+        キャッシュが無効な場合は、ファイル全体をパースせず索引から該当範囲だけを読む。
+        他のプロセスが records.json を書き込んでいる途中に読まないよう、読む間は共有ロックを取る。
+        """
+        with self._lock:
+            if not self._cache_is_valid() and not self.use_journal and self._transaction is None:
+                result = {}
+                with self._process_lock.shared():
+                    for date in dates:
+                        found, record_data = self.span_index.read(date)
+                        if not found or (record_data is None and self._archive_file_exists(date[:4])):
+                            break
+                        if record_data is not None:
+                            result[date] = record_data
+                    else:
+                        self.index_reads += len(dates)
+                        return result
+
+            data = self._read_data()
+            self._load_archived_years(data, {date[:4] for date in dates})
+            records = data.get("records", {})
+            return {date: records[date] for date in dates if date in records}
+
+    def _lookup_record_data(self, date: str) -> Optional[dict]:
+        """指定日の記録の辞書を取得"""
+        return self._lookup_records_data([date]).get(date)
+
+    def _get_field_index(self) -> RecordFieldIndex:
+        """現在のデータに対応したタグ・気分索引を取得（必要なら読み込み・再構築）"""
+        with self._lock:
+            if self._transaction is None and not self._cache_is_valid():
+                # 保存済みの索引がファイルと一致していれば記録をパースせずに使う
+                if self.field_index.load_if_current(self._file_signature()):
+                    return self.field_index
+            data = self._read_data()
+            records = data.get("records", {})
+            if not self.field_index.is_built_for(records):
+                self._load_archived_years(data, self._archives(data))
+                self.field_index.rebuild(records)
+            return self.field_index
+
+    def _writable_records(self, data: dict) -> dict:
+        """変更してよい記録辞書を取得（スナップショットと共有していれば複製して置き換える）"""
+        records = data["records"]
+        if records is not self._shared_records:
+            return records
+        copied = dict(records)
+        if self.field_index.is_built_for(records):
+            self.field_index.rebind(copied)
+        if self._loaded_archive_source is records:
+            self._loaded_archive_source = copied
+        data["records"] = copied
+        self._shared_records = None
+        return copied
+
+    def snapshot(self) -> RecordSnapshot:
+        """
+        現時点の記録の読み取り専用ビューを取得
+
+        記録辞書を複製せずに共有するため、件数によらずすぐに返る（アーカイブ済みの年は読み込む）。
+        その後の保存・削除はスナップショットに影響しない。エクスポートなど時間のかかる読み込みに使う。
+        """
+        with self._lock:
+            data = self._read_data()
+            self._load_archived_years(data, self._archives(data))
+            self._shared_records = data["records"]
+            metadata = dict(data.get("metadata", {}))
+            metadata.pop("archives", None)
+            return RecordSnapshot(data["records"], metadata)
+
+    @contextmanager
+    def exclusive_snapshot(self) -> Iterator[RecordSnapshot]:
+        """
+        他のプロセスの変更を待たせたまま、全ての記録の読み取り専用ビューを取得（別の保存形式への移行用）
+
+        ジャーナルの未反映の変更とアーカイブ済みの年も含む。ブロックを抜けるまで記録は変更されない。
+        """
+        if self.write_behind:
+            self.flush()
+        with self._lock, self._process_lock.exclusive():
+            yield self.snapshot()
 
     def get_record(self, date: str) -> Optional[Record]:
         """指定日の記録を取得"""
-        data = self._read_data()
-        record_data = data.get("records", {}).get(date)
+        record_data = self._lookup_record_data(date)
         if record_data:
             return Record.from_dict(record_data)
         return None
 
-    def get_all_records(self) -> Dict[str, Record]:
-        """全ての記録を取得"""
-        data = self._read_data()
-        records = {}
-        for date, record_data in data.get("records", {}).items():
-            records[date] = Record.from_dict(record_data)
-        return records
+    def get_all_records(self) -> Mapping[str, Record]:
+        """全ての記録を取得（Recordはアクセス時に生成。アーカイブ済みの年も含む）"""
+        with self._lock:
+            data = self._read_data()
+            self._load_archived_years(data, self._archives(data))
+            return LazyRecordMap(dict(data.get("records", {})))
 
-    def get_records_by_month(self, year: int, month: int) -> Dict[str, Record]:
-        """指定月の記録を取得"""
-        data = self._read_data()
-        records = {}
+    def _dates_between(self, records: dict, start_date: Optional[str], end_date: Optional[str]) -> List[str]:
+        """ソート済み日付リストを二分探索して範囲内（両端を含む）の日付を取得"""
+        if self._sorted_dates_source is not records or self._sorted_dates_version != self._change_count:
+            self._sorted_dates = sorted(records)
+            self._sorted_dates_source = records
+            self._sorted_dates_version = self._change_count
+
+        dates = self._sorted_dates
+        lo = bisect_left(dates, start_date) if start_date else 0
+        hi = bisect_right(dates, end_date) if end_date else len(dates)
+        return dates[lo:hi]
+
+    def iter_records(self, start: Optional[str] = None, end: Optional[str] = None,
+                     reverse: bool = False) -> Iterator[Record]:
+        """
+        記録を日付順に1件ずつ取得
+
+        Args:
+            start: 開始日（YYYY-MM-DD、含む）。Noneなら最初から
+            end: 終了日（YYYY-MM-DD、含む）。Noneなら最後まで
+            reverse: Trueなら新しい順
+        """
+        with self._lock:
+            data = self._read_data()
+            self._load_archives_in_range(data, start, end)
+            records = data.get("records", {})
+            dates = self._dates_between(records, start, end)
+        if reverse:
+            dates.reverse()
+        for date in dates:
+            record_data = records.get(date)
+            if record_data is not None:
+                yield Record.from_dict(record_data)
+
+    def get_dates_in_range(self, start_date: Optional[str] = None, end_date: Optional[str] = None) -> List[str]:
+        """日付範囲（両端を含む）にある記録の日付を取得（昇順）"""
+        with self._lock:
+            data = self._read_data()
+            self._load_archives_in_range(data, start_date, end_date)
+            return self._dates_between(data.get("records", {}), start_date, end_date)
+
+    def get_records_by_dates(self, dates: List[str]) -> Mapping[str, Record]:
+        """指定した日付の記録をまとめて取得（存在しない日付は含まれない）"""
+        return LazyRecordMap(self._lookup_records_data(dates))
+
+    def get_records_by_month(self, year: int, month: int) -> Mapping[str, Record]:
+        """指定月の記録を取得（Recordはアクセス時に生成）"""
         month_prefix = f"{year:04d}-{month:02d}"
+        return self.get_records_in_range(f"{month_prefix}-00", f"{month_prefix}-99")
+
+    def get_records_in_range(self, start_date: str, end_date: str) -> Mapping[str, Record]:
+        """日付範囲（両端を含む）の記録を取得（Recordはアクセス時に生成）"""
+        with self._lock:
+            data = self._read_data()
+            self._load_archives_in_range(data, start_date, end_date)
+            records = data.get("records", {})
+            return LazyRecordMap({
+                date: records[date]
+                for date in self._dates_between(records, start_date, end_date)
+            })
+
+    def get_records_by_tag(self, tag: str) -> Mapping[str, Record]:
+        """指定タグを持つ記録を取得（索引を使用、Recordはアクセス時に生成）"""
+        return LazyRecordMap(self._lookup_records_data(self.get_dates_by_tag(tag)))
+
+    def get_records_by_mood(self, mood: str) -> Mapping[str, Record]:
+        """指定した気分の記録を取得（索引を使用、Recordはアクセス時に生成）"""
+        return LazyRecordMap(self._lookup_records_data(self.get_dates_by_mood(mood)))
+
+    def get_dates_by_tag(self, tag: str) -> List[str]:
+        """指定タグを持つ記録の日付を取得（昇順）"""
+        return self._get_field_index().get_dates_by_tag(tag)
+
+    def get_dates_by_mood(self, mood: str) -> List[str]:
+        """指定した気分の記録の日付を取得（昇順）"""
+        return self._get_field_index().get_dates_by_mood(mood)
 
-        for date, record_data in data.get("records", {}).items():
-            if date.startswith(month_prefix):
-                records[date] = Record.from_dict(record_data)
-        return records
+    def get_tag_counts(self) -> Dict[str, int]:
+        """タグごとの記録数を取得"""
+        return self._get_field_index().get_tag_counts()
+
+    def search_records(self, query: str, limit: Optional[int] = None) -> List[SearchResult]:
+        """本文・タグ・画像キャプションを全文検索（スコアの高い順）"""
+        with self._lock:
+            data = self._read_data()
+            # 前回の同期から記録辞書が置き換わらず変更もなければ、索引は保存・削除のたびに更新済み
+            synced = (data.get("records"), self._change_count)
+            if self._search_synced is None or self._search_synced[0] is not synced[0] \
+                    or self._search_synced[1] != synced[1]:
+                # アーカイブ済みの年はメタデータの updated_at で比べ、変わった記録だけを読み込む
+                versions = {}
+                for entry in self._archives(data).values():
+                    versions.update(entry["versions"])
+                versions.update(
+                    (date, record_data.get("updated_at")) for date, record_data in data.get("records", {}).items()
+                )
+                self.search_index.sync(versions, self._lookup_records_data)
+                self._search_synced = synced
+            return self.search_index.search(query, limit)
 
     def get_dates_with_records(self) -> List[str]:
-        """記録が存在する日付のリストを取得"""
+        """記録が存在する日付のリストを取得（アーカイブ済みの年はファイルを読まずに含める）"""
         data = self._read_data()
-        return list(data.get("records", {}).keys())
+        records = data.get("records", {})
+        dates = list(records)
+        for entry in self._archives(data).values():
+            dates.extend(date for date in entry["versions"] if date not in records)
+        return dates
 
-    def save_record(self, record: Record):
-        """記録を保存（新規作成または更新）"""
-        data = self._read_data()
-        data["records"][record.date] = record.to_dict()
-        self._update_metadata(data)
-        self._write_data(data)
+    def save_record(self, record: Record, expected_updated_at: Optional[str] = None):
+        """
+        記録を保存（新規作成または更新）
+
+        Args:
+            record: 保存する記録
+            expected_updated_at: 指定した場合、保存済みの記録の更新日時がこれと異なれば
+                （読み込んだ後に別の処理で更新・削除されていれば）RecordConflictError を送出する。
+                遅延書き込みモードでは、書き込み直前にファイルの内容とも照合し、
+                他のプロセスが更新していれば変更を破棄して on_write_error に RecordConflictError を渡す
+        """
+        with self._mutation_lock():
+            if record.date[:4] in self._archives(self._read_data()):
+                self.unarchive_year(record.date[:4])
+            data = self._read_data()
+            old_data = data["records"].get(record.date)
+            if expected_updated_at is not None and (old_data or {}).get("updated_at") != expected_updated_at:
+                raise RecordConflictError(record.date)
+            record_data = record.to_dict()
+            self._writable_records(data)[record.date] = record_data
+            if self.field_index.is_built_for(data["records"]):
+                self.field_index.apply(record.date, old_data, record_data)
+            self.search_index.apply(record.date, record_data)
+            self._change_count += 1
+            self._commit_change(
+                data, {"op": "save", "date": record.date, "record": record_data},
+                expected_updated_at, checked=expected_updated_at is not None
+            )
+            self.events.publish(ChangeEvent(RECORD_CREATED if old_data is None else RECORD_UPDATED, record.date))
 
     def delete_record(self, date: str) -> bool:
         """記録を削除"""
-        data = self._read_data()
-        if date in data.get("records", {}):
-            del data["records"][date]
-            self._update_metadata(data)
-            self._write_data(data)
-            return True
-        return False
+        with self._mutation_lock():
+            if date[:4] in self._archives(self._read_data()):
+                self.unarchive_year(date[:4])
+            data = self._read_data()
+            if date in data.get("records", {}):
+                old_data = self._writable_records(data).pop(date)
+                if self.field_index.is_built_for(data["records"]):
+                    self.field_index.apply(date, old_data, None)
+                self.search_index.apply(date, None)
+                self._change_count += 1
+                self._commit_change(data, {"op": "delete", "date": date})
+                self.events.publish(ChangeEvent(RECORD_DELETED, date))
+                return True
+            return False
 
     def record_exists(self, date: str) -> bool:
         """指定日に記録が存在するか確認"""
-        data = self._read_data()
-        return date in data.get("records", {})
+        return self._lookup_record_data(date) is not None
 
     def get_metadata(self) -> dict:
         """メタデータを取得"""
         data = self._read_data()
-        return data.get("metadata", {})
+        metadata = dict(data.get("metadata", {}))
+        archives = metadata.pop("archives", None)
+        if archives:
+            metadata["archived_years"] = sorted(archives)
+        return metadata
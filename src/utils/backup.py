@@ -0,0 +1,328 @@
+"""データディレクトリの重複排除スナップショットバックアップ"""
+import os
+import shutil
+import sqlite3
+import time
+from contextlib import ExitStack
+from dataclasses import dataclass
+from datetime import datetime
+from typing import Callable, Dict, List, Optional, Tuple
+from ..models import serialization
+from ..models.file_lock import InterProcessLock
+
+MANIFEST_FILENAME = "backup.json"
+# 作成途中のスナップショット（完了時に名前を変える）
+PARTIAL_SUFFIX = ".partial"
+NAME_FORMAT = "%Y-%m-%dT%H-%M-%S"
+# バックアップしないファイル（ロックファイル・書き込み途中の一時ファイル・SQLiteの作業ファイル）
+EXCLUDED_SUFFIXES = (".lock", ".tmp", ".db-journal", ".db-wal", ".db-shm")
+# 書き込み中に読むと壊れるため、sqlite3 のバックアップ機能で複製するファイル
+# （WALモードでは確定した変更が -wal ファイルに残り、.db のサイズ・更新日時が変わらないため、共有せず毎回複製する）
+SQLITE_SUFFIXES = (".db",)
+# データディレクトリを読む間に共有ロックを取るロックファイル（Storage, ShardedStorage）
+LOCK_FILES = ("records.lock", os.path.join("records", "manifest.lock"))
+# 画像のディレクトリ（画像は一意な名前で追加・削除されるだけで書き換えられないため、ロックの外で共有・複製する）
+IMAGES_DIR = "images"
+
+
+@dataclass
+class BackupInfo:
+    """スナップショットの情報"""
+    name: str
+    path: str
+    created_at: datetime
+    file_count: int
+    total_bytes: int
+    copied_bytes: int  # 以前のスナップショットと共有できずに複製したバイト数
+
+
+@dataclass
+class RetentionPolicy:
+    """
+    スナップショットの保持方針（いずれかの条件に当てはまるものを残す）
+
+    keep_daily などは、新しい方からその数の日・週・月について、それぞれの最新のスナップショットを残す。
+    """
+    keep_last: int = 0
+    keep_daily: int = 0
+    keep_weekly: int = 0
+    keep_monthly: int = 0
+
+    def select(self, backups: List[BackupInfo]) -> List[BackupInfo]:
+        """残すスナップショットを選ぶ（backups は古い順）"""
+        newest_first = sorted(backups, key=lambda b: b.created_at, reverse=True)
+        keep = {b.name for b in newest_first[:self.keep_last]}
+        periods: List[Tuple[int, Callable[[datetime], tuple]]] = [
+            (self.keep_daily, lambda t: (t.year, t.month, t.day)),
+            (self.keep_weekly, lambda t: tuple(t.isocalendar()[:2])),
+            (self.keep_monthly, lambda t: (t.year, t.month)),
+        ]
+        for count, period_of in periods:
+            seen = set()
+            for backup in newest_first:
+                if len(seen) >= count:
+                    break
+                period = period_of(backup.created_at)
+                if period not in seen:
+                    seen.add(period)
+                    keep.add(backup.name)
+        return [b for b in backups if b.name in keep]
+
+
+class BackupManager:
+    """
+    データディレクトリのスナップショットを backup_root/<日時>/ に作成・一覧・復元・整理
+
+    前回のスナップショットとサイズ・更新日時が同じファイルはハードリンクで共有するため、
+    画像や月ファイルが多くても、2回目以降は変わったファイルの分の容量と時間しかかからない。
+    SQLiteのデータベースは -wal ファイルの内容を含めるため、毎回 sqlite3 のバックアップ機能で複製する。
+    ハードリンクを作れないファイルシステムでは複製する。
+    スナップショット内のファイルは共有されているため、変更せずに読むだけにすること。
+    """
+
+    def __init__(self, data_dir: str = "data", backup_root: str = "backups"):
+        self.data_dir = data_dir
+        self.backup_root = backup_root
+
+    def _scan(self, images: bool) -> Dict[str, Tuple[int, int]]:
+        """
+        データディレクトリのファイル {相対パス: (サイズ, 更新日時ns)}
+
+        Args:
+            images: Trueなら画像のディレクトリだけ、Falseなら画像以外を走査する
+        """
+        files = {}
+        data_dir = os.path.abspath(self.data_dir)
+        backup_root = os.path.abspath(self.backup_root)
+        images_dir = os.path.join(data_dir, IMAGES_DIR)
+        for dir_path, dir_names, file_names in os.walk(images_dir if images else data_dir):
+            # バックアップ先がデータディレクトリの中にある場合は除く（画像以外の走査では画像のディレクトリも除く）
+            dir_names[:] = sorted(
+                name for name in dir_names
+                if os.path.join(dir_path, name) not in (backup_root, images_dir)
+            )
+            for file_name in file_names:
+                if file_name.endswith(EXCLUDED_SUFFIXES):
+                    continue
+                path = os.path.join(dir_path, file_name)
+                stat = os.stat(path)
+                relative_path = os.path.relpath(path, data_dir).replace(os.sep, "/")
+                files[relative_path] = (stat.st_size, stat.st_mtime_ns)
+        return files
+
+    def _read_manifest(self, snapshot_path: str) -> dict:
+        """スナップショットの目録を読み込み"""
+        return serialization.load_file(os.path.join(snapshot_path, MANIFEST_FILENAME))
+
+    def list_backups(self) -> List[BackupInfo]:
+        """完了したスナップショットの一覧（古い順）"""
+        if not os.path.isdir(self.backup_root):
+            return []
+        backups = []
+        for name in sorted(os.listdir(self.backup_root)):
+            path = os.path.join(self.backup_root, name)
+            if name.endswith(PARTIAL_SUFFIX) or not os.path.isdir(path):
+                continue
+            try:
+                manifest = self._read_manifest(path)
+            except Exception as e:
+                print(f"バックアップ目録読み込みエラー: {e}")
+                continue
+            backups.append(BackupInfo(
+                name=name,
+                path=path,
+                created_at=datetime.fromisoformat(manifest["created_at"]),
+                file_count=len(manifest["files"]),
+                total_bytes=sum(size for size, _ in manifest["files"].values()),
+                copied_bytes=manifest.get("copied_bytes", 0)
+            ))
+        return backups
+
+    def create_backup(self) -> BackupInfo:
+        """
+        スナップショットを作成
+
+        画像以外のファイル（記録・ジャーナル・索引など）を複製する間だけデータディレクトリの共有ロックを取り、
+        アプリの保存を待たせる。画像はロックを解放してから共有・複製し、その間に削除された画像は含めない。
+        途中で失敗した場合は作成途中のディレクトリを削除する。
+        """
+        os.makedirs(self.backup_root, exist_ok=True)
+        self._remove_partial()
+        previous = self.list_backups()
+        previous_path = previous[-1].path if previous else None
+        previous_files = self._read_manifest(previous_path)["files"] if previous_path else {}
+
+        created_at = datetime.now()
+        name = created_at.strftime(NAME_FORMAT)
+        while os.path.exists(os.path.join(self.backup_root, name)):
+            # 同じ秒に2回作成した場合
+            time.sleep(1)
+            created_at = datetime.now()
+            name = created_at.strftime(NAME_FORMAT)
+        final_path = os.path.join(self.backup_root, name)
+        partial_path = final_path + PARTIAL_SUFFIX
+
+        try:
+            with ExitStack() as stack:
+                for lock_file in LOCK_FILES:
+                    if os.path.exists(os.path.join(self.data_dir, lock_file)):
+                        stack.enter_context(InterProcessLock(os.path.join(self.data_dir, lock_file)).shared())
+                files = self._scan(images=False)
+                copied_bytes = self._store(files, partial_path, previous_path, previous_files)
+            images = self._scan(images=True)
+            copied_bytes += self._store(images, partial_path, previous_path, previous_files)
+            files.update(images)
+
+            serialization.dump_file(os.path.join(partial_path, MANIFEST_FILENAME), {
+                "created_at": created_at.isoformat(),
+                "source": os.path.abspath(self.data_dir),
+                "copied_bytes": copied_bytes,
+                "files": files
+            }, atomic=True)
+            os.rename(partial_path, final_path)
+        except BaseException:
+            shutil.rmtree(partial_path, ignore_errors=True)
+            raise
+
+        return BackupInfo(name, final_path, created_at, len(files), sum(size for size, _ in files.values()), copied_bytes)
+
+    def _store(self, files: Dict[str, Tuple[int, int]], partial_path: str, previous_path: Optional[str],
+               previous_files: dict) -> int:
+        """
+        ファイルをスナップショットに入れる（前回と同じものはハードリンクで共有し、それ以外は複製）
+
+        走査の後に削除されていたファイルは files から除く。
+
+        Returns:
+            複製したバイト数
+        """
+        copied_bytes = 0
+        for relative_path, stat in list(files.items()):
+            source = os.path.join(self.data_dir, *relative_path.split("/"))
+            target = os.path.join(partial_path, *relative_path.split("/"))
+            os.makedirs(os.path.dirname(target), exist_ok=True)
+            if previous_path and not relative_path.endswith(SQLITE_SUFFIXES) \
+                    and previous_files.get(relative_path) == list(stat) \
+                    and self._link(os.path.join(previous_path, *relative_path.split("/")), target):
+                continue
+            try:
+                self._copy(source, target)
+            except FileNotFoundError:
+                del files[relative_path]
+                continue
+            copied_bytes += stat[0]
+        return copied_bytes
+
+    @staticmethod
+    def _link(source: str, target: str) -> bool:
+        """前回のスナップショットのファイルをハードリンクで共有（できなければFalse）"""
+        try:
+            os.link(source, target)
+            return True
+        except OSError:
+            return False
+
+    @staticmethod
+    def _copy(source: str, target: str):
+        """ファイルを複製（SQLiteのデータベースは書き込み中でも壊れないように複製する）"""
+        if source.endswith(SQLITE_SUFFIXES):
+            source_conn = sqlite3.connect(source)
+            target_conn = sqlite3.connect(target)
+            try:
+                source_conn.backup(target_conn)
+            finally:
+                target_conn.close()
+                source_conn.close()
+            shutil.copystat(source, target)
+        else:
+            shutil.copy2(source, target)
+
+    def _remove_partial(self):
+        """中断して残った作成途中のスナップショットを削除"""
+        for name in os.listdir(self.backup_root):
+            if name.endswith(PARTIAL_SUFFIX):
+                shutil.rmtree(os.path.join(self.backup_root, name), ignore_errors=True)
+
+    def _find(self, name: str) -> BackupInfo:
+        """名前でスナップショットを探す（"latest" は最新）"""
+        backups = self.list_backups()
+        if name == "latest" and backups:
+            return backups[-1]
+        for backup in backups:
+            if backup.name == name:
+                return backup
+        raise ValueError(f"バックアップが見つかりません: {name}")
+
+    def restore(self, name: str, target_dir: Optional[str] = None) -> Optional[str]:
+        """
+        スナップショットを復元（アプリを終了してから実行すること）
+
+        スナップショットのファイルは共有されているため、ハードリンクではなく複製して復元する。
+        別の場所に作ってから置き換え、元のディレクトリは <ディレクトリ名>.before-restore-<日時> に残す。
+
+        Args:
+            name: スナップショット名（"latest" なら最新）
+            target_dir: 復元先（Noneならデータディレクトリ）
+
+        Returns:
+            置き換え前のディレクトリの退避先（復元先がなかった場合はNone）
+        """
+        backup = self._find(name)
+        target_dir = os.path.normpath(target_dir or self.data_dir)
+        restoring_path = target_dir + ".restoring"
+        shutil.rmtree(restoring_path, ignore_errors=True)
+        try:
+            for relative_path in self._read_manifest(backup.path)["files"]:
+                source = os.path.join(backup.path, *relative_path.split("/"))
+                target = os.path.join(restoring_path, *relative_path.split("/"))
+                os.makedirs(os.path.dirname(target), exist_ok=True)
+                shutil.copy2(source, target)
+        except BaseException:
+            shutil.rmtree(restoring_path, ignore_errors=True)
+            raise
+
+        moved_to = None
+        if os.path.exists(target_dir):
+            moved_to = f"{target_dir}.before-restore-{datetime.now().strftime(NAME_FORMAT)}"
+            os.rename(target_dir, moved_to)
+        os.rename(restoring_path, target_dir)
+        return moved_to
+
+    def prune(self, policy: RetentionPolicy, dry_run: bool = False) -> List[BackupInfo]:
+        """
+        保持方針に当てはまらないスナップショットを削除（最新のものは常に残す）
+
+        Returns:
+            削除した（dry_run なら削除する）スナップショット
+        """
+        backups = self.list_backups()
+        keep = {b.name for b in policy.select(backups)}
+        if backups:
+            keep.add(backups[-1].name)
+        removed = [b for b in backups if b.name not in keep]
+        if not dry_run:
+            for backup in removed:
+                # 他のスナップショットと共有しているファイルは、最後のリンクが消えるまで残る
+                shutil.rmtree(backup.path)
+        return removed
+
+    def run_scheduled(self, interval_seconds: float, policy: Optional[RetentionPolicy] = None,
+                      should_stop: Callable[[], bool] = lambda: False,
+                      on_backup: Optional[Callable[[BackupInfo], None]] = None):
+        """
+        一定間隔でスナップショットを作成し続ける（作成のたびに保持方針で整理）
+
+        失敗しても次の回で再び作成する。should_stop がTrueを返すと終了する。
+        """
+        while not should_stop():
+            try:
+                backup = self.create_backup()
+                if policy is not None:
+                    self.prune(policy)
+                if on_backup is not None:
+                    on_backup(backup)
+            except Exception as e:
+                print(f"バックアップエラー: {e}")
+            deadline = time.monotonic() + interval_seconds
+            while not should_stop() and time.monotonic() < deadline:
+                time.sleep(min(1.0, max(0.0, deadline - time.monotonic())))
@@ -0,0 +1,138 @@
+"""画像の保存先のインターフェースとメモリ上の実装"""
+import os
+import threading
+import time
+import uuid
+from collections import deque
+from typing import Deque, Dict, Optional, Protocol, Tuple
+from .image_handler import ImageHandler
+
+
+class ImageStore(Protocol):
+    """画像の保存先が実装するインターフェース（ImageHandler, MemoryImageStore）"""
+
+    def save_image(self, source_path: str, date: str) -> Tuple[Optional[str], Optional[str], int, str]:
+        """画像を保存し (保存先パス, サムネイルパス, ファイルサイズ, エラーメッセージ) を返す"""
+        ...
+
+    def delete_image(self, image_path: str, thumbnail_path: str) -> bool:
+        """画像とサムネイルを削除"""
+        ...
+
+
+class MemoryImageStore:
+    """
+    画像をメモリ上に保持する ImageStore（テスト・ベンチマーク用）
+
+    元画像を読み込んでそのまま保持し、サムネイルは生成しない（サムネイルパスも同じ内容を指す）。
+    パスは memory://images/YYYY/MM/<uuid>.<拡張子> の形式になる。
+    """
+
+    MAX_IMAGE_SIZE = ImageHandler.MAX_IMAGE_SIZE
+    SUPPORTED_FORMATS = ImageHandler.SUPPORTED_FORMATS
+
+    def __init__(self):
+        # パス → 画像の内容
+        self.files: Dict[str, bytes] = {}
+
+    def save_image(self, source_path: str, date: str) -> Tuple[Optional[str], Optional[str], int, str]:
+        """
+        画像を保存
+
+        Returns:
+            (保存先パス, サムネイルパス, ファイルサイズ, エラーメッセージ)
+        """
+        ext = os.path.splitext(source_path)[1].lower()
+        if ext not in self.SUPPORTED_FORMATS:
+            return None, None, 0, f"サポートされていない形式です。対応形式: {', '.join(self.SUPPORTED_FORMATS)}"
+        try:
+            with open(source_path, 'rb') as f:
+                content = f.read()
+        except OSError:
+            return None, None, 0, "ファイルが存在しません"
+        if len(content) > self.MAX_IMAGE_SIZE:
+            return None, None, 0, f"ファイルサイズが大きすぎます（最大10MB）。現在: {len(content) / 1024 / 1024:.2f}MB"
+
+        year, month, _ = date.split('-')
+        image_id = str(uuid.uuid4())
+        path = f"memory://images/{year}/{month}/{image_id}{ext}"
+        thumb_path = f"memory://images/{year}/{month}/{image_id}_thumb{ext}"
+        self.files[path] = content
+        self.files[thumb_path] = content
+        return path, thumb_path, len(content), ""
+
+    def delete_image(self, image_path: str, thumbnail_path: str) -> bool:
+        """画像とサムネイルを削除"""
+        self.files.pop(image_path, None)
+        self.files.pop(thumbnail_path, None)
+        return True
+
+    def read(self, path: str) -> Optional[bytes]:
+        """保存した画像の内容を取得"""
+        return self.files.get(path)
+
+
+class ImageDeletionWorker:
+    """
+    画像ファイルの削除をバックグラウンドのスレッドでまとめて行う
+
+    記録の削除を確定した後に enqueue() で渡すと、すぐに戻り、ファイルは順に削除される。
+    終了前には flush() で削除し終えるまで待つこと。
+    """
+
+    def __init__(self, image_store: ImageStore):
+        self.image_store = image_store
+        self._queue: Deque[Tuple[str, str]] = deque()
+        self._condition = threading.Condition()
+        self._thread: Optional[threading.Thread] = None
+        self._in_progress = 0
+
+    @property
+    def pending(self) -> int:
+        """削除待ち（削除中を含む）の画像の数"""
+        with self._condition:
+            return len(self._queue) + self._in_progress
+
+    def enqueue(self, image_path: str, thumbnail_path: str):
+        """画像とサムネイルの削除を予約"""
+        with self._condition:
+            self._queue.append((image_path, thumbnail_path))
+            if self._thread is None or not self._thread.is_alive():
+                self._thread = threading.Thread(target=self._run, name="image-deletion", daemon=True)
+                self._thread.start()
+            self._condition.notify_all()
+
+    def _run(self):
+        """削除待ちがなくなるまで順に削除する（なくなったらスレッドを終える）"""
+        while True:
+            with self._condition:
+                if not self._queue:
+                    self._thread = None
+                    self._condition.notify_all()
+                    return
+                image_path, thumbnail_path = self._queue.popleft()
+                self._in_progress += 1
+            try:
+                self.image_store.delete_image(image_path, thumbnail_path)
+            except Exception as e:
+                print(f"画像削除エラー: {e}")
+            finally:
+                with self._condition:
+                    self._in_progress -= 1
+                    self._condition.notify_all()
+
+    def flush(self, timeout: Optional[float] = None) -> bool:
+        """
+        予約済みの削除が終わるまで待つ
+
+        Returns:
+            全て削除し終えたか（timeout 秒以内に終わらなければFalse）
+        """
+        deadline = None if timeout is None else time.monotonic() + timeout
+        with self._condition:
+            while self._queue or self._in_progress:
+                remaining = None if deadline is None else deadline - time.monotonic()
+                if remaining is not None and remaining <= 0:
+                    return False
+                self._condition.wait(remaining)
+            return True
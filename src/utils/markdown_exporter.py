@@ -3,6 +3,7 @@ import os
 from datetime import datetime
 from typing import Optional
 from ..models.record import Record
+from ..models.query import RecordQuery
 
 
 class MarkdownExporter:
@@ -65,6 +66,25 @@ class MarkdownExporter:
         Returns:
             (成功フラグ, メッセージ, 出力ファイルパス)
         """
+        return self._write_records(records, output_path)
+
+    def export_query(self, records: list[Record], query: RecordQuery, output_path: Optional[str] = None) -> tuple[bool, str, str]:
+        """
+        検索条件に一致した記録をMarkdown形式でエクスポート（条件をヘッダーに記載）
+
+        Args:
+            records: 検索条件に一致した記録のリスト
+            query: 検索条件
+            output_path: 出力先パス（Noneの場合は自動生成）
+
+        Returns:
+            (成功フラグ, メッセージ, 出力ファイルパス)
+        """
+        return self._write_records(records, output_path, conditions=query.describe())
+
+    def _write_records(self, records: list[Record], output_path: Optional[str] = None,
+                       conditions: Optional[str] = None) -> tuple[bool, str, str]:
+        """複数の記録をMarkdownファイルに書き込み"""
         try:
             if not records:
                 return False, "エクスポートする記録がありません", ""
@@ -79,6 +99,8 @@ class MarkdownExporter:
             content_parts = []
             content_parts.append("# 記録エクスポート\n\n")
             content_parts.append(f"**エクスポート日時:** {datetime.now().strftime('%Y-%m-%d %H:%M:%S')}\n\n")
+            if conditions:
+                content_parts.append(f"**条件:** {conditions}\n\n")
             content_parts.append(f"**記録数:** {len(records)}\n\n")
             content_parts.append("---\n\n")
 
@@ -21,13 +21,19 @@ class CalendarView:
         self.current_month = today.month
         self.selected_date = today.strftime("%Y-%m-%d")
 
-        # 画像参照保持用
-        self.calendar_images = []
+        # 画像参照保持用（日付 → サムネイル）
+        self.calendar_images = {}
+        # 表示中の日付セル（日付 → (セル, 日, 行, 列)）と、その月の記録
+        self.cells = {}
+        self.monthly_records = {}
 
         self._create_widgets()
         self._layout_widgets()
         self._draw_calendar()
 
+        # 記録が変更されたら該当する日付のセルだけを描き直す
+        self.record_controller.subscribe(self._on_record_changed)
+
     def _create_widgets(self):
         """ウィジェットを作成"""
         # メインコンテナ
@@ -92,13 +98,14 @@ class CalendarView:
         for widget in self.calendar_frame.winfo_children():
             widget.destroy()
         
-        # 画像参照をクリア
-        self.calendar_images = []
+        # 画像参照・セルをクリア
+        self.calendar_images = {}
+        self.cells = {}
 
-        # 月のレコードを一括取得
-        monthly_records = self.record_controller.get_records_by_month(self.current_year, self.current_month)
-        # 日付判定用にキーのセットも持っておく（念のため）
-        dates_with_records = set(monthly_records.keys())
+        # 月のレコードを一括取得（日付セルの再描画にも使う）
+        self.monthly_records = dict(
+            self.record_controller.get_records_by_month(self.current_year, self.current_month)
+        )
 
         # 曜日ヘッダー
         weekdays = ["日", "月", "火", "水", "木", "金", "土"]
@@ -135,125 +142,157 @@ class CalendarView:
                     label.grid(row=row_idx + 1, column=col_idx, sticky="nsew", padx=1, pady=1)
                     continue
 
-                # 日付情報
-                date_str = f"{self.current_year:04d}-{self.current_month:02d}-{day:02d}"
-                record = monthly_records.get(date_str)
-                has_record = record is not None
-
-                # 今日判定
-                today_dt = datetime.now()
-                is_today = (
-                    self.current_year == today_dt.year and
-                    self.current_month == today_dt.month and
-                    day == today_dt.day
-                )
-
-                # 選択中判定
-                is_selected = date_str == self.selected_date
-
-                # スタイル決定
-                bg_color = AppStyles.COLOR_SURFACE
-                fg_color = AppStyles.COLOR_TEXT
-                border_color = "#E0E0E0" # 薄いグレー
-                border_width = 1
-
-                if is_selected:
-                    bg_color = "#E8EAF6" # 薄いインディゴ背景
-                    border_color = AppStyles.COLOR_PRIMARY
-                    border_width = 2
-                elif is_today:
-                    bg_color = "#E3F2FD" # 薄い青
-                elif has_record:
-                    bg_color = "#F1F8E9" # ごく薄い緑
-                
-                # 土日の文字色
-                date_fg_color = fg_color
-                if col_idx == 0: # 日
-                    date_fg_color = "#E91E63"
-                elif col_idx == 6: # 土
-                    date_fg_color = "#3F51B5"
-
-                # セルコンテナ (Frame)
-                # tk.Frameを使って背景色を細かく制御
-                cell_frame = tk.Frame(
-                    self.calendar_frame,
-                    bg=border_color, # ボーダー色として使用
-                    bd=0
-                )
-                cell_frame.grid(row=row_idx + 1, column=col_idx, sticky="nsew", padx=1, pady=1)
-
-                # コンテンツエリア (内側のFrame)
-                content_frame = tk.Frame(
-                    cell_frame,
-                    bg=bg_color
-                )
-                # ボーダー幅分だけ内側に配置
-                content_frame.pack(fill=tk.BOTH, expand=True, padx=border_width, pady=border_width)
-
-                # クリックイベントのハンドラ
-                def on_click(e, d=date_str):
-                    self._on_date_clicked(d)
-
-                # 全要素にクリックイベントをバインド
-                cell_frame.bind("<Button-1>", on_click)
-                content_frame.bind("<Button-1>", on_click)
-
-                # 日付表示
-                day_label = tk.Label(
-                    content_frame,
-                    text=str(day),
-                    font=("Yu Gothic UI", 9, "bold" if is_today or is_selected else "normal"),
-                    fg=date_fg_color,
-                    bg=bg_color,
-                    anchor="nw"
-                )
-                day_label.pack(side=tk.TOP, anchor="nw", padx=2)
-                day_label.bind("<Button-1>", on_click)
-
-                # --- 記録内容の表示 ---
-                if record:
-                    # 画像があれば表示（サムネイル）
-                    if record.images:
-                        try:
-                            # 最初の画像のサムネイルを使用
-                            thumb_path = record.images[0].thumbnail_path
-                            if os.path.exists(thumb_path):
-                                img = Image.open(thumb_path)
-                                # 小さくリサイズ (アスペクト比維持)
-                                img.thumbnail((50, 50)) 
-                                photo = ImageTk.PhotoImage(img)
-                                self.calendar_images.append(photo) # 参照保持
-
-                                img_label = tk.Label(content_frame, image=photo, bg=bg_color)
-                                img_label.pack(side=tk.TOP, pady=1)
-                                img_label.bind("<Button-1>", on_click)
-                        except Exception:
-                            pass # 画像読み込み失敗時は無視
-
-                    # テキストがあれば表示（省略）
-                    if record.text:
-                        short_text = record.text.strip().replace("\n", " ")
-                        if len(short_text) > 0:
-                            # 文字数制限
-                            limit = 6
-                            if len(short_text) > limit:
-                                short_text = short_text[:limit] + ".."
-                            
-                            text_label = tk.Label(
-                                content_frame,
-                                text=short_text,
-                                font=("Yu Gothic UI", 8),
-                                fg="#555555",
-                                bg=bg_color,
-                                anchor="w"
-                            )
-                            text_label.pack(side=tk.BOTTOM, fill=tk.X, padx=2, pady=1)
-                            text_label.bind("<Button-1>", on_click)
+                self._draw_cell(day, row_idx + 1, col_idx)
+
+    def _draw_cell(self, day: int, row: int, col_idx: int):
+        """日付セルを描画"""
+        # 日付情報
+        date_str = f"{self.current_year:04d}-{self.current_month:02d}-{day:02d}"
+        record = self.monthly_records.get(date_str)
+        has_record = record is not None
+
+        # 今日判定
+        today_dt = datetime.now()
+        is_today = (
+            self.current_year == today_dt.year and
+            self.current_month == today_dt.month and
+            day == today_dt.day
+        )
+
+        # 選択中判定
+        is_selected = date_str == self.selected_date
+
+        # スタイル決定
+        bg_color = AppStyles.COLOR_SURFACE
+        fg_color = AppStyles.COLOR_TEXT
+        border_color = "#E0E0E0" # 薄いグレー
+        border_width = 1
+
+        if is_selected:
+            bg_color = "#E8EAF6" # 薄いインディゴ背景
+            border_color = AppStyles.COLOR_PRIMARY
+            border_width = 2
+        elif is_today:
+            bg_color = "#E3F2FD" # 薄い青
+        elif has_record:
+            bg_color = "#F1F8E9" # ごく薄い緑
+        
+        # 土日の文字色
+        date_fg_color = fg_color
+        if col_idx == 0: # 日
+            date_fg_color = "#E91E63"
+        elif col_idx == 6: # 土
+            date_fg_color = "#3F51B5"
+
+        # セルコンテナ (Frame)
+        # tk.Frameを使って背景色を細かく制御
+        cell_frame = tk.Frame(
+            self.calendar_frame,
+            bg=border_color, # ボーダー色として使用
+            bd=0
+        )
+        cell_frame.grid(row=row, column=col_idx, sticky="nsew", padx=1, pady=1)
+        self.cells[date_str] = (cell_frame, day, row, col_idx)
+
+        # コンテンツエリア (内側のFrame)
+        content_frame = tk.Frame(
+            cell_frame,
+            bg=bg_color
+        )
+        # ボーダー幅分だけ内側に配置
+        content_frame.pack(fill=tk.BOTH, expand=True, padx=border_width, pady=border_width)
+
+        # クリックイベントのハンドラ
+        def on_click(e, d=date_str):
+            self._on_date_clicked(d)
+
+        # 全要素にクリックイベントをバインド
+        cell_frame.bind("<Button-1>", on_click)
+        content_frame.bind("<Button-1>", on_click)
+
+        # 日付表示
+        day_label = tk.Label(
+            content_frame,
+            text=str(day),
+            font=("Yu Gothic UI", 9, "bold" if is_today or is_selected else "normal"),
+            fg=date_fg_color,
+            bg=bg_color,
+            anchor="nw"
+        )
+        day_label.pack(side=tk.TOP, anchor="nw", padx=2)
+        day_label.bind("<Button-1>", on_click)
+
+        # --- 記録内容の表示 ---
+        if record:
+            # 画像があれば表示（サムネイル）
+            if record.images:
+                try:
+                    # 最初の画像のサムネイルを使用
+                    thumb_path = record.images[0].thumbnail_path
+                    if os.path.exists(thumb_path):
+                        img = Image.open(thumb_path)
+                        # 小さくリサイズ (アスペクト比維持)
+                        img.thumbnail((50, 50)) 
+                        photo = ImageTk.PhotoImage(img)
+                        self.calendar_images[date_str] = photo # 参照保持
+
+                        img_label = tk.Label(content_frame, image=photo, bg=bg_color)
+                        img_label.pack(side=tk.TOP, pady=1)
+                        img_label.bind("<Button-1>", on_click)
+                except Exception:
+                    pass # 画像読み込み失敗時は無視
+
+            # テキストがあれば表示（省略）
+            if record.text:
+                short_text = record.text.strip().replace("\n", " ")
+                if len(short_text) > 0:
+                    # 文字数制限
+                    limit = 6
+                    if len(short_text) > limit:
+                        short_text = short_text[:limit] + ".."
+                    
+                    text_label = tk.Label(
+                        content_frame,
+                        text=short_text,
+                        font=("Yu Gothic UI", 8),
+                        fg="#555555",
+                        bg=bg_color,
+                        anchor="w"
+                    )
+                    text_label.pack(side=tk.BOTTOM, fill=tk.X, padx=2, pady=1)
+                    text_label.bind("<Button-1>", on_click)
+
+    def _redraw_cell(self, date: str):
+        """表示中の日付セルを1つだけ描き直す"""
+        cell = self.cells.get(date)
+        if cell is None:
+            return
+        cell_frame, day, row, col_idx = cell
+        cell_frame.destroy()
+        self.calendar_images.pop(date, None)
+        self._draw_cell(day, row, col_idx)
+
+    def update_date(self, date: str):
+        """指定日の記録を読み直してセルを更新（表示中の月でなければ何もしない）"""
+        if date not in self.cells:
+            return
+        record = self.record_controller.get_record(date)
+        if record is None:
+            self.monthly_records.pop(date, None)
+        else:
+            self.monthly_records[date] = record
+        self._redraw_cell(date)
+
+    def _on_record_changed(self, event):
+        """記録・画像の変更イベントを受け取った時"""
+        self.update_date(event.date)
 
     def _on_date_clicked(self, date: str):
-        """日付がクリックされた時"""
+        """日付がクリックされた時（選択が変わったセルだけを描き直す）"""
+        previous = self.selected_date
         self.selected_date = date
-        self._draw_calendar()
+        self._redraw_cell(previous)
+        self._redraw_cell(date)
 
         if self.on_date_select:
             self.on_date_select(date)
@@ -293,7 +332,19 @@ class CalendarView:
         if self.on_date_select:
             self.on_date_select(self.selected_date)
 
+    def show_date(self, date: str):
+        """指定日を含む月を表示して選択"""
+        selected = datetime.strptime(date, "%Y-%m-%d")
+        self.current_year = selected.year
+        self.current_month = selected.month
+        self.selected_date = date
+
+        self.month_label.config(text=self._get_month_label())
+        self.refresh()
+
+        if self.on_date_select:
+            self.on_date_select(date)
+
     def refresh(self):
-        """カレンダーを更新"""
-        self.dates_with_records = set(self.record_controller.get_dates_with_records())
+        """カレンダーを更新（表示中の月を描き直す）"""
         self._draw_calendar()
@@ -5,17 +5,23 @@ from datetime import datetime
 from .calendar_view import CalendarView
 from .record_viewer import RecordViewer
 from .record_editor import RecordEditor
+from .statistics_panel import StatisticsPanel
 from ..controllers.export_controller import ExportController
 
 
 class MainWindow:
     """アプリケーションのメインウィンドウ"""
 
+    # 入力が止まってから検索するまでの待ち時間
+    SEARCH_DELAY_MS = 200
+    SEARCH_RESULT_LIMIT = 100
+
     def __init__(self, root, record_controller):
         self.root = root
         self.record_controller = record_controller
         self.export_controller = ExportController(record_controller)
         self.selected_date = datetime.now().strftime("%Y-%m-%d")
+        self._search_after_id = None
 
         self._create_widgets()
         self._layout_widgets()
@@ -23,6 +29,9 @@ class MainWindow:
         # 初期表示
         self._refresh_viewer()
 
+        # カレンダーと記録ビューアーはそれぞれ変更イベントで更新される。ここでは検索結果だけを更新
+        self.record_controller.subscribe(self._on_record_changed)
+
     def _create_widgets(self):
         """ウィジェットを作成"""
         # メインフレーム（全体）
@@ -42,6 +51,14 @@ class MainWindow:
             foreground="#757575"
         )
 
+        # 全文検索ボックス
+        self.search_frame = ttk.Frame(self.header_frame)
+        self.search_label = ttk.Label(self.search_frame, text="🔍 検索")
+        self.search_var = tk.StringVar()
+        self.search_var.trace_add("write", self._on_search_changed)
+        self.search_entry = ttk.Entry(self.search_frame, textvariable=self.search_var, width=30)
+        self.search_entry.bind("<Escape>", lambda e: self.search_var.set(""))
+
         # --- コンテンツエリア（左右分割）---
         self.content_frame = ttk.Frame(self.main_frame)
 
@@ -62,6 +79,31 @@ class MainWindow:
             on_date_select=self._on_date_selected
         )
 
+        # 継続の統計（カレンダーの下）
+        self.statistics_panel = StatisticsPanel(self.left_panel, self.record_controller)
+
+        # 検索結果（検索中のみカレンダーの下に表示）
+        self.search_result_frame = ttk.Frame(self.left_panel, style="Card.TFrame")
+        self.search_status_label = ttk.Label(self.search_result_frame, text="", style="Card.TLabel")
+        self.search_result_tree = ttk.Treeview(
+            self.search_result_frame,
+            columns=("date", "snippet"),
+            show="headings",
+            height=8,
+            selectmode="browse"
+        )
+        self.search_result_tree.heading("date", text="日付")
+        self.search_result_tree.heading("snippet", text="内容")
+        self.search_result_tree.column("date", width=90, stretch=False)
+        self.search_result_tree.column("snippet", width=250)
+        self.search_result_tree.bind("<<TreeviewSelect>>", self._on_search_result_selected)
+        self.search_scrollbar = ttk.Scrollbar(
+            self.search_result_frame,
+            orient=tk.VERTICAL,
+            command=self.search_result_tree.yview
+        )
+        self.search_result_tree.configure(yscrollcommand=self.search_scrollbar.set)
+
         # 右側: 詳細・表示エリア
         self.right_panel = ttk.Frame(self.content_frame, style="Card.TFrame", padding=20)
         
@@ -101,6 +143,9 @@ class MainWindow:
         self.header_frame.pack(fill=tk.X, pady=(0, 20))
         self.app_title.pack(side=tk.LEFT)
         self.current_date_label.pack(side=tk.RIGHT, anchor=tk.S, pady=(0, 5))
+        self.search_frame.pack(side=tk.RIGHT, padx=(0, 20))
+        self.search_label.pack(side=tk.LEFT, padx=(0, 5))
+        self.search_entry.pack(side=tk.LEFT)
 
         # コンテンツエリア配置
         self.content_frame.pack(fill=tk.BOTH, expand=True)
@@ -109,6 +154,15 @@ class MainWindow:
         self.left_panel.grid(row=0, column=0, sticky="nsew", padx=(0, 15))
         self.calendar_header_label.pack(anchor=tk.W, pady=(0, 15))
         # CalendarView自体は内部でpackする想定だが、ラップが必要ならここで行う
+        self.statistics_panel.frame.pack(
+            side=tk.BOTTOM, fill=tk.X, pady=(15, 0),
+            before=self.calendar_view.container
+        )
+
+        # 検索結果エリア（表示は _show_search_results で切り替え）
+        self.search_status_label.pack(anchor=tk.W, pady=(0, 5))
+        self.search_scrollbar.pack(side=tk.RIGHT, fill=tk.Y)
+        self.search_result_tree.pack(fill=tk.BOTH, expand=True)
 
         # 詳細エリア（右）
         self.right_panel.grid(row=0, column=1, sticky="nsew")
@@ -148,6 +202,48 @@ class MainWindow:
         """記録ビューアーを更新"""
         self.record_viewer.display_record(self.selected_date)
 
+    def _on_search_changed(self, *args):
+        """検索文字列が変更された時（入力が止まるまで待ってから検索）"""
+        if self._search_after_id is not None:
+            self.root.after_cancel(self._search_after_id)
+        self._search_after_id = self.root.after(self.SEARCH_DELAY_MS, self._run_search)
+
+    def _run_search(self):
+        """全文検索を実行して結果一覧を更新"""
+        self._search_after_id = None
+        query = self.search_var.get().strip()
+        if not query:
+            self._show_search_results(False)
+            return
+
+        results = self.record_controller.search(query, limit=self.SEARCH_RESULT_LIMIT)
+        self.search_result_tree.delete(*self.search_result_tree.get_children())
+        for result in results:
+            self.search_result_tree.insert("", tk.END, iid=result.date, values=(result.date, result.snippet))
+
+        if len(results) >= self.SEARCH_RESULT_LIMIT:
+            self.search_status_label.config(text=f"上位 {len(results)} 件を表示")
+        else:
+            self.search_status_label.config(text=f"{len(results)} 件見つかりました")
+        self._show_search_results(True)
+
+    def _show_search_results(self, visible: bool):
+        """検索結果エリアの表示・非表示を切り替え"""
+        if visible:
+            if not self.search_result_frame.winfo_manager():
+                self.search_result_frame.pack(
+                    side=tk.BOTTOM, fill=tk.BOTH, pady=(15, 0),
+                    before=self.calendar_view.container
+                )
+        else:
+            self.search_result_frame.pack_forget()
+
+    def _on_search_result_selected(self, event):
+        """検索結果が選択された時（その日付を表示）"""
+        selection = self.search_result_tree.selection()
+        if selection:
+            self.calendar_view.show_date(selection[0])
+
     def _open_editor(self):
         """記録エディターを開く"""
         editor_window = tk.Toplevel(self.root)
@@ -157,14 +253,13 @@ class MainWindow:
         editor = RecordEditor(
             editor_window,
             self.record_controller,
-            self.selected_date,
-            on_save=self._on_record_saved
+            self.selected_date
         )
 
-    def _on_record_saved(self):
-        """記録が保存された時"""
-        self._refresh_viewer()
-        self.calendar_view.refresh()
+    def _on_record_changed(self, event):
+        """記録が変更された時（検索中なら、連続した変更をまとめて再検索）"""
+        if self.search_var.get().strip():
+            self._on_search_changed()
 
     def _export_markdown(self):
         """Markdown形式でエクスポート"""
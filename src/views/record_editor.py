@@ -4,6 +4,7 @@ from tkinter import ttk, scrolledtext, filedialog, messagebox
 from PIL import Image, ImageTk
 import os
 from .styles import AppStyles
+from ..models.storage import RecordConflictError
 
 
 class RecordEditor:
@@ -279,8 +280,20 @@ class RecordEditor:
         mood = self.mood_var.get() if self.mood_var.get() else None
 
         if self.record:
-            # 更新
-            self.record_controller.update_record(self.date, text, tags, mood)
+            # 更新（編集中に他のウィンドウやプログラムで更新されていれば確認する）
+            try:
+                self.record_controller.update_record(
+                    self.date, text, tags, mood,
+                    expected_updated_at=self.record.updated_at
+                )
+            except RecordConflictError:
+                if not messagebox.askyesno(
+                    "確認",
+                    "この記録は編集中に別の場所で更新されました。\n上書きして保存しますか？"
+                ):
+                    return
+                if not self.record_controller.update_record(self.date, text, tags, mood):
+                    self.record_controller.create_record(self.date, text, tags, mood)
         else:
             # 新規作成
             self.record_controller.create_record(self.date, text, tags, mood)
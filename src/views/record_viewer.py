@@ -18,6 +18,9 @@ class RecordViewer:
         self._create_widgets()
         self._layout_widgets()
 
+        # 表示中の日付の記録が変更されたら表示し直す
+        self.record_controller.subscribe(self._on_record_changed)
+
     def _create_widgets(self):
         """ウィジェットを作成"""
         # メインスクロールエリア設定
@@ -109,6 +112,11 @@ class RecordViewer:
         self.canvas.pack(side=tk.LEFT, fill=tk.BOTH, expand=True)
         self.scrollbar.pack(side=tk.RIGHT, fill=tk.Y)
 
+    def _on_record_changed(self, event):
+        """記録・画像の変更イベントを受け取った時"""
+        if event.date == self.current_date:
+            self.display_record(self.current_date)
+
     def display_record(self, date: str):
         """指定日の記録を表示"""
         self.current_date = date
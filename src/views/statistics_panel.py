@@ -0,0 +1,64 @@
+"""継続の統計パネル"""
+import tkinter as tk
+from datetime import date
+from tkinter import ttk
+
+
+class StatisticsPanel:
+    """連続記録日数・今月の記録数・気分の内訳・よく使うタグの表示"""
+
+    TOP_TAG_COUNT = 5
+    MOOD_ICONS = (("good", "😊"), ("neutral", "😐"), ("bad", "😞"))
+
+    def __init__(self, parent, record_controller):
+        self.parent = parent
+        self.record_controller = record_controller
+
+        self._create_widgets()
+        self._layout_widgets()
+        self.refresh()
+
+        # 記録が変更されたら集計済みの値を表示し直す（統計自体は変更の確定時に更新済み）
+        self.record_controller.subscribe(self._on_record_changed)
+
+    def _create_widgets(self):
+        """ウィジェットを作成"""
+        self.frame = ttk.Frame(self.parent, style="Card.TFrame")
+        self.header_label = ttk.Label(self.frame, text="STATISTICS", style="CardHeader.TLabel")
+        self.streak_label = ttk.Label(self.frame, text="", style="Card.TLabel", font=("Yu Gothic UI", 12, "bold"))
+        self.count_label = ttk.Label(self.frame, text="", style="Card.TLabel")
+        self.mood_label = ttk.Label(self.frame, text="", style="Card.TLabel")
+        self.tag_label = ttk.Label(self.frame, text="", style="Card.TLabel", wraplength=320, justify=tk.LEFT)
+
+    def _layout_widgets(self):
+        """ウィジェットをレイアウト"""
+        self.header_label.pack(anchor=tk.W, pady=(0, 10))
+        self.streak_label.pack(anchor=tk.W)
+        self.count_label.pack(anchor=tk.W, pady=(3, 0))
+        self.mood_label.pack(anchor=tk.W, pady=(3, 0))
+        self.tag_label.pack(anchor=tk.W, pady=(3, 0))
+
+    def refresh(self):
+        """統計を表示"""
+        statistics = self.record_controller.get_statistics()
+        today = date.today()
+
+        self.streak_label.config(
+            text=f"🔥 {statistics.current_streak(today)}日連続（最長 {statistics.longest_streak()}日）"
+        )
+        this_month = statistics.entries_by_month().get(today.strftime("%Y-%m"), 0)
+        self.count_label.config(text=f"今月 {this_month}件 / 合計 {statistics.total_records}件")
+
+        moods = statistics.mood_counts()
+        self.mood_label.config(
+            text="気分: " + "  ".join(f"{icon} {moods.get(mood, 0)}" for mood, icon in self.MOOD_ICONS)
+        )
+
+        tags = statistics.tag_counts(limit=self.TOP_TAG_COUNT)
+        self.tag_label.config(
+            text="よく使うタグ: " + ("、".join(f"{tag}({count})" for tag, count in tags.items()) or "なし")
+        )
+
+    def _on_record_changed(self, event):
+        """記録の変更イベントを受け取った時"""
+        self.refresh()
@@ -0,0 +1,31 @@
+"""毎日の記録ツール - 2つのデータディレクトリを同期"""
+import argparse
+import sys
+import os
+
+# プロジェクトのルートディレクトリをPythonパスに追加
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from src.controllers.sync_controller import SyncController, SYNC_POLICIES
+
+
+def main():
+    """メイン関数"""
+    parser = argparse.ArgumentParser(description="2つのデータディレクトリの記録と画像を差分だけ同期します")
+    parser.add_argument("remote", help="同期先のデータディレクトリ（別の端末の data/ など）")
+    parser.add_argument("--local", default="data", help="ローカルのデータディレクトリ（デフォルト: data）")
+    parser.add_argument("--policy", choices=SYNC_POLICIES, default="newest",
+                        help="同じ日を両方で編集していた場合の解決方法（デフォルト: newest）")
+    parser.add_argument("--dry-run", action="store_true", help="何も書き込まずに結果だけを表示")
+    args = parser.parse_args()
+
+    try:
+        summary = SyncController(args.local, args.remote).sync(args.policy, args.dry_run)
+    except Exception as e:
+        print(f"同期エラー: {e}")
+        sys.exit(1)
+    print(summary.describe())
+
+
+if __name__ == "__main__":
+    main()